@@ -0,0 +1,187 @@
+import csv
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+from src.config import (
+    configure_logging,
+    BATCH_OUTPUT_DIRECTORY,
+    BATCH_RETRIES,
+    BATCH_RETRY_BACKOFF_SECONDS,
+    BATCH_WORKERS,
+)
+
+configure_logging() # Initialize logging
+
+SUMMARY_FILE_NAME = "batch_summary.csv"
+SUMMARY_COLUMNS = ['job', 'transactions_file', 'saving_goal', 'output_directory', 'status', 'attempts', 'seconds', 'error']
+
+
+class BatchJob(NamedTuple):
+    """One transactions file to analyze and the directory its reports are saved to."""
+    name: str
+    transactions_file: str
+    saving_goal: float
+    output_directory: str
+    error: str = "" # Why the manifest row cannot run, the job is reported as failed without running
+
+
+def read_jobs_manifest(manifest_path: str, output_root: str = BATCH_OUTPUT_DIRECTORY) -> list:
+    """
+    Reads the jobs of a batch from a CSV manifest.
+    The manifest has a transactions_file column, and optional saving_goal and output_directory columns.
+    Relative transactions files are found next to the manifest, and a job without an output directory
+    gets its own directory under the output root. A row whose saving goal is not a number becomes a job
+    with an error, so it fails alone instead of stopping the batch.
+
+    Args:
+        manifest_path (str): The path to the manifest file.
+        output_root (str): The directory the jobs' output directories are created in.
+
+    Returns:
+        list: the BatchJob of every row of the manifest.
+    """
+    manifest_directory = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, newline='') as manifest_file:
+        for row_number, row in enumerate(csv.DictReader(manifest_file), start=1):
+            transactions_file = (row.get('transactions_file') or '').strip()
+            if not transactions_file:
+                raise ValueError(f"Row {row_number} of {manifest_path} has no transactions_file.")
+
+            file_stem = re.sub(r'[^\w-]+', '_', os.path.splitext(os.path.basename(transactions_file.rstrip('/')))[0])
+            name = f"{row_number:05d}_{file_stem}"
+            output_directory = (row.get('output_directory') or '').strip() or os.path.join(output_root, name)
+            saving_goal_text = (row.get('saving_goal') or '').strip() or '0'
+            try:
+                saving_goal, error_message = float(saving_goal_text), ""
+            except ValueError:
+                saving_goal, error_message = 0, f"Row {row_number} of {manifest_path} has an invalid saving_goal: {saving_goal_text}."
+            jobs.append(BatchJob(
+                name=name,
+                transactions_file=os.path.join(manifest_directory, transactions_file),
+                saving_goal=saving_goal,
+                output_directory=output_directory,
+                error=error_message,
+            ))
+
+    return jobs
+
+
+def run_batch_job(job: BatchJob, retries: int = BATCH_RETRIES, backoff_seconds: float = BATCH_RETRY_BACKOFF_SECONDS) -> dict:
+    """
+    Runs the smart financial process of one job, trying it again when it fails.
+    A file without valid data is not tried again, since the next attempt would read the same data.
+
+    Args:
+        job (BatchJob): The job to run.
+        retries (int): Extra attempts for a job that failed.
+        backoff_seconds (float): Wait before the first retry, doubled after every failed attempt.
+
+    Returns:
+        dict: the summary row of the job.
+    """
+    from UI.console_ui import run_smart_financial_process
+
+    start_time = time.perf_counter()
+    status = 'failed'
+    error_message = job.error
+    attempt = 0
+    max_attempts = 0 if job.error else retries + 1 # A job with an error in the manifest is not run
+    for attempt in range(1, max_attempts + 1):
+        try:
+            created_reports = run_smart_financial_process(job.transactions_file, job.saving_goal, job.output_directory)
+            if created_reports is None:
+                status = 'no data'
+                error_message = "No valid data to display."
+                break
+
+            failed_reports = [report_name for report_name, created in created_reports.items() if not created]
+            if not failed_reports:
+                status = 'succeeded'
+                error_message = ""
+                break
+
+            error_message = f"Could not create the {', '.join(failed_reports)} reports."
+
+        except Exception as e:
+            error_message = str(e)
+
+        logging.error(f"Job {job.name} attempt {attempt} failed: {error_message}")
+        if attempt <= retries:
+            time.sleep(backoff_seconds * 2 ** (attempt - 1))
+
+    return {
+        'job': job.name,
+        'transactions_file': job.transactions_file,
+        'saving_goal': job.saving_goal,
+        'output_directory': job.output_directory,
+        'status': status,
+        'attempts': attempt,
+        'seconds': round(time.perf_counter() - start_time, 3),
+        'error': error_message,
+    }
+
+
+def run_batch(jobs: list, max_workers: Optional[int] = BATCH_WORKERS, retries: int = BATCH_RETRIES) -> list:
+    """
+    Runs the jobs of a batch in a pool of worker processes.
+
+    Args:
+        jobs (list): BatchJob of every job.
+        max_workers (int): Number of worker processes, all the cores if None.
+        retries (int): Extra attempts for a job that failed.
+
+    Returns:
+        list: the summary row of every job, in the order of the jobs.
+    """
+    if not jobs:
+        return []
+
+    with ProcessPoolExecutor(max_workers=min(len(jobs), max_workers or os.cpu_count() or 1)) as executor:
+        return list(executor.map(run_batch_job, jobs, [retries] * len(jobs)))
+
+
+def write_batch_summary(results: list, summary_path: str) -> None:
+    """
+    Writes the summary rows of a batch to a CSV file.
+    """
+    summary_directory = os.path.dirname(summary_path)
+    if summary_directory:
+        os.makedirs(summary_directory, exist_ok=True)
+    with open(summary_path, 'w', newline='') as summary_file:
+        writer = csv.DictWriter(summary_file, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def start_batch(manifest_path: str, output_root: str = BATCH_OUTPUT_DIRECTORY, max_workers: Optional[int] = BATCH_WORKERS,
+                retries: int = BATCH_RETRIES) -> bool:
+    """
+    Runs every job of a manifest without asking anything, and prints the status and time of each job.
+    The summary is also saved as batch_summary.csv under the output root.
+
+    Args:
+        manifest_path (str): The path to the manifest file.
+        output_root (str): The directory the jobs' output directories are created in.
+        max_workers (int): Number of worker processes, all the cores if None.
+        retries (int): Extra attempts for a job that failed.
+
+    Returns:
+        bool: True if every job succeeded.
+    """
+    logging.info(f"Starting batch of {manifest_path}")
+    start_time = time.perf_counter()
+    results = run_batch(read_jobs_manifest(manifest_path, output_root), max_workers, retries)
+    summary_path = os.path.join(output_root, SUMMARY_FILE_NAME)
+    write_batch_summary(results, summary_path)
+
+    for result in results:
+        line = f"{result['job']}: {result['status']} in {result['seconds']:.2f}s after {result['attempts']} attempt(s)"
+        print(f"{line} - {result['error']}" if result['error'] else line)
+
+    succeeded = sum(result['status'] == 'succeeded' for result in results)
+    print(f"\n{succeeded} of {len(results)} jobs succeeded in {time.perf_counter() - start_time:.2f}s, summary saved to {summary_path}")
+    return succeeded == len(results)
@@ -1,10 +1,23 @@
+import glob
 import os
 import logging
-from src.data_loader import load_transactions_data
-from src.reports_generator import create_expenses_by_categories_graph, create_monthly_summary_graph, create_recommendation_report
-from src.config import configure_logging
-from src.saving_recommendations import find_categories_exceeding_average, calculate_savings_reductions
-from src.currency_exchange_rates import get_exchange_rates
+from typing import Optional
+from src.config import (
+    configure_logging,
+    COMPACT_TRANSACTIONS,
+    DETECT_ANOMALIES,
+    DETECT_RECURRING,
+    INCREMENTAL_LEDGER,
+    INCREMENTAL_LEDGER_DIRECTORY,
+    REPORTS_DIRECTORY,
+    STREAM_TRANSACTIONS,
+    TRANSACTIONS_CHUNK_SIZE,
+    USE_TRANSACTIONS_CACHE,
+)
+from src.instrumentation import export_stage_records, measure_stage
+
+# The src modules import pandas, matplotlib and requests, so they are imported by the menu
+# option that needs them instead of here, to show the menu as fast as possible.
 
 configure_logging() # Initialize logging
 
@@ -88,6 +101,7 @@ def handle_monthly_savings_goal() -> int:
 def get_user_transactions_file_name() -> str:
     """
     Prompts the user to enter the full file name of the transactions file.
+    A directory or a glob pattern (e.g. exports/*.csv) can be entered to analyze several files together.
     Verifies if the file exists within a predefined directory.
     Allows the user to exit by typing 'exit'.
 
@@ -98,14 +112,14 @@ def get_user_transactions_file_name() -> str:
     file_exists = False
     transactions_filepath = None
     while(not file_exists):
-        transactions_filepath = input("\nPlease enter the transactions file full name or exit to quit:\n")
+        transactions_filepath = input("\nPlease enter the transactions file full name, a folder of files or exit to quit:\n")
         if transactions_filepath == 'exit':
             print("See you next time")
             transactions_filepath = None
             break
 
         transactions_filepath = os.path.join(os.getcwd(),"data",transactions_filepath)
-        file_exists = os.path.exists(transactions_filepath)
+        file_exists = os.path.exists(transactions_filepath) or bool(glob.glob(transactions_filepath))
         if not file_exists:
             print("File not found. Please check the file name and try again.")
     
@@ -122,34 +136,154 @@ def start_smart_financial_process(transactions_filepath: str, saving_goal: int)
         transactions_filepath (str): The path to the transactions file.
         saving_goal (int): The target amount for monthly savings.
     """
+    created_reports = run_smart_financial_process(transactions_filepath, saving_goal)
+    if created_reports is None:
+        logging.warning("No valid data to display.")
+
+    elif all(created_reports.values()):
+        print("\nYour reporst have been created under the reports folder.")
+
+    else:
+        for report_name, created in created_reports.items():
+            if not created:
+                print(f"there is a problem with creating the {report_name.replace('_', ' ')} report")
+                logging.error(f"{report_name} report.")
+
+
+def run_smart_financial_process(transactions_filepath: str, saving_goal: int, output_directory: str = REPORTS_DIRECTORY) -> Optional[dict]:
+    """
+    Runs the load, aggregate, recommend and report pipeline without asking or printing anything.
+    When instrumentation is enabled the time of every stage is exported at the end of the run.
+
+    Args:
+        transactions_filepath (str): The path to the transactions file.
+        saving_goal (int): The target amount for monthly savings.
+        output_directory (str): The directory the reports are saved to.
+
+    Returns:
+        dict: True or False by report name for whether the report was created, None if there is no valid data.
+    """
+    from src.category_month_cube import get_monthly_totals
+    from src.reports_generator import create_reports
+    from src.saving_recommendations import find_categories_exceeding_average, calculate_savings_reductions, calculate_savings_goals_curve
+    from src.recurring_transactions import spread_recurring_reductions
+    from src.savings_forecast import forecast_savings
+
     logging.info(f"Transaction file path is: {transactions_filepath}")
     saving_goal_recommendations = None
     reductions = None
-    data = load_transactions_data(transactions_filepath)
-    if data is not None:
-        expenses_dataframe = create_expenses_by_categories_graph(data)
-        monthly_summary_dataframe, created = create_monthly_summary_graph(data)
-        
-        if expenses_dataframe is not None and monthly_summary_dataframe is not None and created:
-            general_recommendations = find_categories_exceeding_average(expenses_dataframe, monthly_summary_dataframe['Amount'][0])
+    savings_curve = None
+    savings_forecast = None
+    monthly_savings_goal = saving_goal
+    try:
+        with measure_stage('analysis'):
+            expenses_dataframe, monthly_summary_dataframe, cube, anomalies, recurring_transactions = load_report_totals(transactions_filepath)
+            if expenses_dataframe is None or monthly_summary_dataframe is None:
+                return None
+            monthly_totals = None if cube is None else get_monthly_totals(cube)
+
+            with measure_stage('recommendations', rows=len(expenses_dataframe)):
+                general_recommendations = find_categories_exceeding_average(expenses_dataframe, monthly_summary_dataframe['Amount'][0])
             saving_goal = saving_goal - (monthly_summary_dataframe['Amount'][0] - monthly_summary_dataframe['Amount'][1]) # the net minus the saving goal
-            
+
             if saving_goal > 0:
-                 saving_goal_recommendations, reductions = calculate_savings_reductions(expenses_dataframe, saving_goal)
-            
-            is_graph_created = create_recommendation_report(general_recommendations, saving_goal_recommendations, reductions)
-            if is_graph_created:
-                print("\nYour reporst have been created under the reports folder.")
-            
-            else:
-                print('there is a problem with creating the recommendation report')
-                logging.error("recommendationr report.")
-        
-        elif not created:
-            print('there is a problem with creating the monthly summary report')
-            logging.error("recommendationr report.")
+                with measure_stage('savings_reductions', rows=len(expenses_dataframe)):
+                    saving_goal_recommendations, reductions = calculate_savings_reductions(
+                        expenses_dataframe, saving_goal, recurring_transactions=recurring_transactions
+                    )
+                    savings_curve = calculate_savings_goals_curve(expenses_dataframe, saving_goal * 2, recurring_transactions=recurring_transactions)
+
+            if cube is not None:
+                with measure_stage('forecast'):
+                    category_reductions = reductions
+                    if reductions is not None and recurring_transactions is not None: # The cube has the categories the charges came from
+                        category_reductions = spread_recurring_reductions(expenses_dataframe, recurring_transactions, reductions)
+                    savings_forecast = forecast_savings(cube, monthly_savings_goal, category_reductions)
+
+            with measure_stage('render_reports'):
+                return create_reports(
+                    expenses_dataframe, monthly_summary_dataframe, general_recommendations, saving_goal_recommendations, reductions,
+                    savings_curve, output_directory=output_directory, monthly_totals=monthly_totals, savings_forecast=savings_forecast,
+                    anomalies=anomalies
+                )
+
+    finally:
+        export_stage_records()
+
+
+def load_report_totals(transactions_filepath: str) -> tuple:
+    """
+    Loads the transactions file and sums the expenses by categories and the monthly summary the reports are built from.
+    A directory or glob pattern is loaded file by file in parallel, and files that fail are reported and skipped.
+    When STREAM_TRANSACTIONS is set a single file is read in chunks and only its totals are kept in memory.
+    When INCREMENTAL_LEDGER is set only the rows a single file gained since the last run are added to the
+    running totals of the ledger, and the reports are built from those totals.
+    Transactions with a Currency column are converted to the reporting currency before they are summed.
+    Loaded transactions are summed once into a category x month cube, and every total is read from it.
+    When DETECT_ANOMALIES is set the unusual transactions are flagged while the transactions are read,
+    except for the ledger, which reads only the new rows.
+    When DETECT_RECURRING is set the recurring charges of loaded transactions are found, which needs every
+    transaction at once, so streamed files and the ledger have none.
+
+    Args:
+        transactions_filepath (str): The path to the transactions file.
+
+    Returns:
+        tuple: expenses by category, monthly summary, the category x month cube, the unusual transactions and
+        the recurring charges, all None if there is no valid data. The cube is None when only the totals of the file are kept.
+    """
+    from src.anomaly_detection import AnomalyDetector, detect_anomalies
+    from src.currency_exchange_rates import convert_transactions_currency
+    from src.data_loader import load_transactions_data, load_transactions_files, is_transactions_directory, stream_transactions_aggregates
+    from src.recurring_transactions import find_recurring_transactions
+    from src.category_month_cube import build_category_month_cube, get_expenses_by_category, get_total_income_and_expenses
+    from src.reports_generator import sort_expenses_by_categories, summarize_income_and_expenses
+
+    if is_transactions_directory(transactions_filepath):
+        with measure_stage('load_files') as stage: # The files are parsed by worker processes, so only the total is recorded
+            data, errors = load_transactions_files(transactions_filepath, USE_TRANSACTIONS_CACHE, compact=COMPACT_TRANSACTIONS)
+            stage.rows = None if data is None else len(data)
+        for file_name, error_message in errors.items():
+            print(f"Skipped {file_name}: {error_message}")
+
+    elif STREAM_TRANSACTIONS or INCREMENTAL_LEDGER:
+        if INCREMENTAL_LEDGER:
+            from src.incremental_ledger import get_source_ledger_directory, update_ledger
+            ledger_directory = get_source_ledger_directory(transactions_filepath, INCREMENTAL_LEDGER_DIRECTORY)
+            aggregates = update_ledger(transactions_filepath, ledger_directory, convert_transactions_currency)
+            anomalies = None
+        else:
+            detector = AnomalyDetector()
+
+            def convert_and_detect(chunk):
+                converted_chunk = convert_transactions_currency(chunk)
+                if converted_chunk is not None and DETECT_ANOMALIES:
+                    detector.update(converted_chunk)
+                return converted_chunk
+
+            aggregates = stream_transactions_aggregates(transactions_filepath, TRANSACTIONS_CHUNK_SIZE, convert_and_detect)
+            anomalies = detector.get_anomalies() if DETECT_ANOMALIES else None
+        if aggregates is None:
+            return None, None, None, None, None
+
+        expenses_dataframe = sort_expenses_by_categories(aggregates.expenses_by_category)
+        return expenses_dataframe, summarize_income_and_expenses(aggregates.total_income, aggregates.total_expenses), None, anomalies, None
+
     else:
-        logging.warning("No valid data to display.")
+        data = load_transactions_data(transactions_filepath, USE_TRANSACTIONS_CACHE, COMPACT_TRANSACTIONS)
+
+    if data is not None:
+        with measure_stage('convert_currency', rows=len(data)):
+            data = convert_transactions_currency(data)
+    if data is None:
+        return None, None, None, None, None
+
+    with measure_stage('aggregate', rows=len(data)):
+        cube = build_category_month_cube(data)
+    anomalies = detect_anomalies(data, TRANSACTIONS_CHUNK_SIZE) if DETECT_ANOMALIES else None
+    recurring_transactions = find_recurring_transactions(data) if DETECT_RECURRING else None
+    expenses_dataframe = sort_expenses_by_categories(get_expenses_by_category(cube))
+    return expenses_dataframe, summarize_income_and_expenses(*get_total_income_and_expenses(cube)), cube, anomalies, recurring_transactions
 
 
 def handle_currency_exchange():
@@ -157,6 +291,8 @@ def handle_currency_exchange():
     Handles currency exchange by prompting the user for input on the current and target currencies,
     and the amount they wish to exchange.
     """
+    from src.currency_exchange_rates import get_exchange_rates
+
     while True:
         try:
             current_currency_name = input("Please enter the current currency name (e.g., NIS, EUR): ").upper()
@@ -0,0 +1,233 @@
+"""Times every stage of the analysis on synthetic ledgers and compares it to a baseline.
+
+Run from the repository root:
+
+    python benchmarks/pipeline_benchmarks.py --sizes 10k,1M --save-baseline benchmarks/results/baseline.json
+    python benchmarks/pipeline_benchmarks.py --sizes 10k,1M --baseline benchmarks/results/baseline.json --max-regression 0.25
+
+Each ledger is made by synthetic_ledger.py, so every run times the same rows. Every
+stage is timed --repeat times and the fastest run is kept, then it is run once more
+under tracemalloc for its peak memory (skipped with --no-memory, it is slow on 10M rows).
+The three report files and the consolidated report are both rendered, with the
+size of their output. The results are saved as JSON. Against a baseline, a stage that got slower by more than
+--max-regression fails the run.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_DIRECTORY)
+
+import numpy
+from synthetic_ledger import parse_size, write_ledger
+from src.anomaly_detection import detect_anomalies
+from src.recurring_transactions import find_recurring_transactions
+from src.data_loader import check_transactions_file, compact_transactions, get_bytes_per_million_rows, load_transactions_data, read_transactions_csv
+from src.reports_generator import (
+    calculate_expenses_by_categories,
+    calculate_monthly_summary,
+    create_consolidated_report,
+    create_expenses_by_categories_graph,
+    create_recommendation_report,
+    create_reports,
+    plot_expenses_by_categories,
+    plot_monthly_summary,
+)
+from src.budget_rules import get_max_reduction_percentages, get_tier_categories, load_budget_rules
+from src.saving_recommendations import (
+    calculate_savings_reductions,
+    find_categories_exceeding_average,
+    reduce_expenses,
+)
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def measure(function, repeat: int, track_memory: bool) -> dict:
+    """Runs a function repeat times and returns its fastest time and its peak traced memory."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    peak_bytes = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_bytes': peak_bytes}
+
+
+def benchmark_size(rows: int, dirty_fraction: float, goals: int, repeat: int, track_memory: bool, work_directory: str) -> dict:
+    """Times every stage on one synthetic ledger.
+
+    Returns:
+        dict: seconds, peak memory and throughput by stage name.
+        dict: memory per million rows of the validated and the compact transactions.
+    """
+    ledger_path = write_ledger(os.path.join(work_directory, f"ledger_{rows}.csv"), rows, dirty_fraction)
+    csv_data = read_transactions_csv(ledger_path)
+    valid_data = check_transactions_file(csv_data)
+    sorted_data = calculate_expenses_by_categories(valid_data)
+    summary_df = calculate_monthly_summary(valid_data)
+    income = summary_df['Amount'][0]
+    savings_goals = numpy.linspace(0, sorted_data.sum(), goals)
+    general_recommendations = find_categories_exceeding_average(sorted_data, income)
+    saving_goal_recommendations, reductions = calculate_savings_reductions(sorted_data, savings_goals[goals // 2])
+    reports_directory = os.path.join(work_directory, "reports")
+    compact_data = compact_transactions(valid_data)
+    memory = {
+        'validated': get_bytes_per_million_rows(valid_data),
+        'compact': get_bytes_per_million_rows(compact_data),
+    }
+    print(f"  memory per million rows: {format_bytes(memory['validated'])} validated, {format_bytes(memory['compact'])} compact")
+
+    budget_rules = load_budget_rules()
+    max_percentages = dict(zip(budget_rules.categories, get_max_reduction_percentages(budget_rules)))
+
+    def reduce_every_goal():
+        for goal in savings_goals:
+            remaining_goal = goal
+            for tier_categories in get_tier_categories(budget_rules):
+                _, remaining_goal = reduce_expenses(sorted_data, tier_categories, remaining_goal, max_percentages)
+
+    def calculate_every_goal():
+        for goal in savings_goals:
+            calculate_savings_reductions(sorted_data, goal)
+
+    report_inputs = (sorted_data, summary_df, general_recommendations, saving_goal_recommendations, reductions)
+    separate_reports_directory = os.path.join(work_directory, "separate_reports")
+    consolidated_report_directory = os.path.join(work_directory, "consolidated_report")
+
+    # (name, function, number of items it processes), the reports skip the cache since a hit would only time a file copy
+    stages = [
+        ('load_transactions_data', lambda: load_transactions_data(ledger_path), rows),
+        ('check_transactions_file', lambda: check_transactions_file(csv_data), rows),
+        ('compact_transactions', lambda: compact_transactions(valid_data), len(valid_data)),
+        ('calculate_expenses_by_categories', lambda: calculate_expenses_by_categories(valid_data), len(valid_data)),
+        ('calculate_expenses_by_categories_compact', lambda: calculate_expenses_by_categories(compact_data), len(valid_data)),
+        ('detect_anomalies', lambda: detect_anomalies(compact_data), len(valid_data)),
+        ('find_recurring_transactions', lambda: find_recurring_transactions(compact_data), len(valid_data)),
+        ('create_expenses_by_categories_graph', lambda: create_expenses_by_categories_graph(valid_data, reports_directory, use_cache=False), len(valid_data)),
+        ('reduce_expenses', reduce_every_goal, goals),
+        ('calculate_savings_reductions', calculate_every_goal, goals),
+        ('plot_expenses_by_categories', lambda: plot_expenses_by_categories(sorted_data, reports_directory, use_cache=False), 1),
+        ('plot_monthly_summary', lambda: plot_monthly_summary(summary_df, reports_directory, use_cache=False), 1),
+        ('create_recommendation_report', lambda: create_recommendation_report(
+            general_recommendations, saving_goal_recommendations, reductions, output_directory=reports_directory, use_cache=False), 1),
+        ('create_reports', lambda: create_reports(*report_inputs, output_directory=separate_reports_directory, use_cache=False), 1),
+        ('create_consolidated_report', lambda: create_consolidated_report(
+            *report_inputs, output_directory=consolidated_report_directory, use_cache=False), 1),
+    ]
+    output_directories = {'create_reports': separate_reports_directory, 'create_consolidated_report': consolidated_report_directory}
+
+    results = {}
+    for name, function, items in stages:
+        result = measure(function, repeat, track_memory)
+        result['items'] = items
+        result['items_per_second'] = items / result['seconds'] if result['seconds'] > 0 else None
+        if name in output_directories:
+            result['output_bytes'] = get_directory_bytes(output_directories[name])
+        results[name] = result
+        print(f"  {name:<38} {result['seconds']:>9.4f}s {format_rate(result['items_per_second']):>14} {format_bytes(result['peak_bytes']):>10}")
+
+    print(f"  report size: {results['create_reports']['output_bytes'] / 1024:.1f} KiB in three files, "
+          f"{results['create_consolidated_report']['output_bytes'] / 1024:.1f} KiB consolidated")
+    os.remove(ledger_path)
+    return results, memory
+
+
+def get_directory_bytes(directory: str) -> int:
+    """Sums the size of the files in a directory."""
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+def format_rate(items_per_second) -> str:
+    return "-" if items_per_second is None else f"{items_per_second:,.0f}/s"
+
+
+def format_bytes(peak_bytes) -> str:
+    return "-" if peak_bytes is None else f"{peak_bytes / 1024 / 1024:.1f} MiB"
+
+
+def compare_with_baseline(results: dict, baseline: dict, max_regression: float) -> list:
+    """Returns a message for every stage that is slower than the baseline by more than max_regression."""
+    regressions = []
+    for size, stages in results['sizes'].items():
+        baseline_stages = baseline.get('sizes', {}).get(size, {})
+        for name, result in stages.items():
+            if name not in baseline_stages or baseline_stages[name]['seconds'] <= 0:
+                continue
+            ratio = result['seconds'] / baseline_stages[name]['seconds']
+            print(f"  {size:>6} {name:<38} {ratio:>6.2f}x the baseline")
+            if ratio > 1 + max_regression:
+                regressions.append(f"{name} on {size} rows took {ratio:.2f}x the baseline time.")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10k,1M,10M', help="comma separated ledger sizes, e.g. 10k,1M,10M")
+    parser.add_argument('--dirty-fraction', type=float, default=0.01, help="share of invalid rows in the ledgers")
+    parser.add_argument('--goals', type=int, default=50, help="number of savings goals in the reductions sweep")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs of every stage, the fastest is kept")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run of every stage")
+    parser.add_argument('--output', help="save the results as JSON to this path")
+    parser.add_argument('--save-baseline', metavar='PATH', help="save the results as the baseline to this path")
+    parser.add_argument('--baseline', metavar='PATH', help="compare the results with this baseline")
+    parser.add_argument('--max-regression', type=float, default=0.25, help="allowed slowdown against the baseline, 0.25 is 25%%")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL) # Every dirty row is logged by the loader
+
+    results = {
+        'version': RESULTS_FORMAT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'sizes': {},
+        'memory_per_million_rows': {},
+    }
+    with tempfile.TemporaryDirectory() as work_directory:
+        for size in args.sizes.split(','):
+            print(f"{size} rows:")
+            results['sizes'][size], results['memory_per_million_rows'][size] = benchmark_size(
+                parse_size(size), args.dirty_fraction, args.goals, args.repeat, not args.no_memory, work_directory
+            )
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'w') as results_file:
+                json.dump(results, results_file, indent=2)
+            print(f"Saved the results to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Compared with {args.baseline}:")
+        regressions = compare_with_baseline(results, baseline, args.max_regression)
+        for message in regressions:
+            print(message)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
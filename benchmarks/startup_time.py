@@ -0,0 +1,79 @@
+"""Measures how long the console app takes to show its first prompt.
+
+Run from the repository root:
+
+    python benchmarks/startup_time.py --runs 5 --max-seconds 1.5
+
+The time is measured from starting a new interpreter on main.py until the menu
+prompt is printed, so it includes the interpreter start and every module imported
+before the menu. The heavy modules loaded by then are listed, they should all be
+loaded later by the menu option that needs them.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_PROMPT = b"Please enter your choice"
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'requests')
+HEAVY_MODULES_CHECK = (
+    "import sys, main; "
+    f"print(','.join(module for module in {HEAVY_MODULES!r} if module in sys.modules))"
+)
+
+
+def time_to_first_prompt() -> float:
+    """Starts main.py and returns the seconds until the first menu prompt is printed."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-u', 'main.py'], cwd=REPOSITORY_DIRECTORY,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        output = b""
+        while FIRST_PROMPT not in output:
+            character = process.stdout.read(1)
+            if not character:
+                raise RuntimeError("main.py exited before showing the menu.")
+            output += character
+        return time.perf_counter() - start
+
+    finally:
+        process.kill()
+        process.wait()
+
+
+def find_heavy_modules() -> list:
+    """Returns the heavy modules already imported once main is imported."""
+    result = subprocess.run(
+        [sys.executable, '-c', HEAVY_MODULES_CHECK], cwd=REPOSITORY_DIRECTORY,
+        capture_output=True, text=True, check=True
+    )
+    return [module for module in result.stdout.strip().split(',') if module]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="number of times the app is started")
+    parser.add_argument('--max-seconds', type=float, help="fail if the median time is above this")
+    args = parser.parse_args()
+
+    timings = [time_to_first_prompt() for _ in range(args.runs)]
+    median = statistics.median(timings)
+    heavy_modules = find_heavy_modules()
+    print(f"Time to first prompt: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s over {args.runs} runs")
+    print(f"Heavy modules loaded before the menu: {', '.join(heavy_modules) or 'none'}")
+
+    if heavy_modules:
+        return 1
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"The median time is above {args.max_seconds}s.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
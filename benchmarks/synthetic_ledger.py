@@ -0,0 +1,119 @@
+"""Generates deterministic synthetic transactions files for the benchmarks.
+
+Run from the repository root:
+
+    python benchmarks/synthetic_ledger.py --rows 1M --dirty-fraction 0.01 --output data/synthetic_1M.csv
+
+The same rows, seed and dirty fraction always give the same file. Expenses are drawn
+from a log-normal distribution around a typical amount of each category, income
+comes from a monthly salary, dates are spread over two years and a fraction of the
+rows get an invalid date, a zero amount or a text amount, like a messy bank export.
+"""
+import argparse
+import os
+import sys
+import numpy
+import pandas
+
+# Share of the rows and typical amount of each category
+CATEGORY_WEIGHTS = {
+    'Groceries': 0.25,
+    'Dining': 0.20,
+    'Transport': 0.18,
+    'Entertainment': 0.12,
+    'Utilities': 0.08,
+    'Healthcare': 0.07,
+    'Rent': 0.05,
+    'Salary': 0.05,
+}
+CATEGORY_MEDIAN_AMOUNTS = {
+    'Groceries': 60,
+    'Dining': 35,
+    'Transport': 15,
+    'Entertainment': 40,
+    'Utilities': 120,
+    'Healthcare': 80,
+    'Rent': 1500,
+    'Salary': 6000,
+}
+INCOME_CATEGORIES = ['Salary']
+AMOUNT_SPREAD = 0.6 # Sigma of the log-normal amounts
+FIRST_DATE = numpy.datetime64('2022-01-01')
+DAYS = 730
+INVALID_DATE = "not-a-date"
+INVALID_AMOUNT = "abc" # Not one of the read_csv NA tokens, so it stays invalid once written to a CSV file
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_size(size: str) -> int:
+    """Converts a number of rows such as 10k, 1M or 2500 to an int."""
+    size = size.strip().lower()
+    if size and size[-1] in SIZE_SUFFIXES:
+        return int(float(size[:-1]) * SIZE_SUFFIXES[size[-1]])
+    return int(size)
+
+
+def generate_ledger(rows: int, dirty_fraction: float = 0.01, seed: int = 0) -> pandas.DataFrame:
+    """Builds a transactions DataFrame with Date, Category and Amount columns.
+
+    Args:
+        rows: number of transactions.
+        dirty_fraction: share of the rows that the loader should reject.
+        seed: seed of the random generator.
+
+    Returns:
+        the transactions, in date order, with dirty rows spread at random.
+    """
+    generator = numpy.random.default_rng(seed)
+    categories = list(CATEGORY_WEIGHTS)
+    weights = numpy.array([CATEGORY_WEIGHTS[category] for category in categories])
+    category_codes = generator.choice(len(categories), size=rows, p=weights / weights.sum())
+
+    medians = numpy.array([CATEGORY_MEDIAN_AMOUNTS[category] for category in categories], dtype=float)
+    signs = numpy.array([1.0 if category in INCOME_CATEGORIES else -1.0 for category in categories])
+    amounts = numpy.round(medians[category_codes] * generator.lognormal(0, AMOUNT_SPREAD, size=rows), 2)
+    amounts = numpy.maximum(amounts, 0.01) * signs[category_codes]
+
+    dates = numpy.sort(FIRST_DATE + generator.integers(0, DAYS, size=rows).astype('timedelta64[D]'))
+    date_strings = numpy.datetime_as_string(dates, unit='D').astype(object)
+    amount_values = amounts
+
+    dirty_rows = generator.choice(rows, size=int(rows * dirty_fraction), replace=False)
+    if len(dirty_rows):
+        dirty_kinds = generator.integers(0, 3, size=len(dirty_rows))
+        amount_values = amounts.astype(object)
+        date_strings[dirty_rows[dirty_kinds == 0]] = INVALID_DATE
+        amount_values[dirty_rows[dirty_kinds == 1]] = 0
+        amount_values[dirty_rows[dirty_kinds == 2]] = INVALID_AMOUNT
+
+    return pandas.DataFrame({
+        'Date': date_strings,
+        'Category': pandas.Categorical.from_codes(category_codes, categories),
+        'Amount': amount_values,
+    })
+
+
+def write_ledger(path: str, rows: int, dirty_fraction: float = 0.01, seed: int = 0) -> str:
+    """Generates a ledger and saves it as a CSV file, returning its path."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    generate_ledger(rows, dirty_fraction, seed).to_csv(path, index=False)
+    return path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10k', help="number of rows, e.g. 10k, 1M or 10M")
+    parser.add_argument('--dirty-fraction', type=float, default=0.01, help="share of invalid rows")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help="path of the CSV file")
+    args = parser.parse_args()
+
+    write_ledger(args.output, parse_size(args.rows), args.dirty_fraction, args.seed)
+    print(f"Wrote {parse_size(args.rows)} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,45 @@
+import argparse
 import logging
 from UI.console_ui import start_app_ui
-from src.config import configure_logging
+from src.config import configure_logging, BATCH_OUTPUT_DIRECTORY, BATCH_RETRIES, BATCH_WORKERS, INCREMENTAL_LEDGER_DIRECTORY
 
 configure_logging() # Initialize logging
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Smart financial management")
+    parser.add_argument('--batch', metavar='MANIFEST', help="run every job of a CSV manifest without the menu")
+    parser.add_argument('--output', default=BATCH_OUTPUT_DIRECTORY, help="directory the batch jobs' reports are saved under")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help="batch jobs run at the same time")
+    parser.add_argument('--retries', type=int, default=BATCH_RETRIES, help="extra attempts for a batch job that failed")
+    parser.add_argument('--verify-ledger', nargs='?', const=INCREMENTAL_LEDGER_DIRECTORY, metavar='LEDGER',
+                        help="recompute the totals of the incremental ledger, or of every ledger under it, from all their transactions and report any drift")
+    parser.add_argument('--rebuild-ledger', action='store_true', help="with --verify-ledger, replace drifted totals with the recomputed ones")
+    args = parser.parse_args()
+
+    if args.verify_ledger:
+        from src.incremental_ledger import list_ledger_directories, rebuild_ledger_aggregates, verify_ledger
+        drifted = False
+        for ledger_directory in list_ledger_directories(args.verify_ledger):
+            differences = verify_ledger(ledger_directory)
+            for message in differences:
+                print(f"{ledger_directory}: {message}")
+            if differences and args.rebuild_ledger:
+                rebuild_ledger_aggregates(ledger_directory)
+                print(f"The totals of {ledger_directory} have been recomputed.")
+            elif not differences:
+                print(f"The totals of {ledger_directory} match its transactions.")
+            drifted = drifted or bool(differences)
+        raise SystemExit(1 if drifted and not args.rebuild_ledger else 0)
+
+    if args.batch:
+        from UI.batch_runner import start_batch
+        logging.info("Strting batch")
+        succeeded = start_batch(args.batch, args.output, args.workers, args.retries)
+        raise SystemExit(0 if succeeded else 1)
+
     logging.info("Strting main function")
     start_app_ui()
 
 
 if __name__ == "__main__":
     main()
-
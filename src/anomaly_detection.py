@@ -0,0 +1,154 @@
+import logging
+import numpy
+import pandas
+from typing import Callable, Optional
+from src.config import (
+    configure_logging,
+    ANOMALY_MIN_HISTORY,
+    ANOMALY_WINDOW,
+    ANOMALY_Z_THRESHOLD,
+    TRANSACTIONS_CHUNK_SIZE,
+)
+from src.data_loader import check_transactions_file, get_amounts, read_transactions_csv
+from src.instrumentation import measure_stage
+
+configure_logging() # Initialize logging
+
+MIN_DEVIATION_FRACTION = 0.01 # Smallest deviation used for a z-score, as a fraction of the average
+ANOMALY_COLUMNS = ['Date', 'Category', 'Amount', 'Expected', 'ZScore']
+
+# A transaction is compared with the previous ANOMALY_WINDOW transactions of its category,
+# in the order of the file. The rows of a chunk are sorted by category once, and the
+# average and deviation of every window come from cumulative sums, so a chunk costs a
+# sort and a few passes over numpy arrays. The last window of every category is carried
+# to the next chunk, so chunks give the same flags as the whole file at once.
+
+
+class AnomalyDetector:
+    """Flags transactions far from the recent transactions of their category, one chunk at a time."""
+
+    def __init__(self, window: int = ANOMALY_WINDOW, z_threshold: float = ANOMALY_Z_THRESHOLD,
+                 min_history: int = ANOMALY_MIN_HISTORY):
+        self.window = window
+        self.z_threshold = z_threshold
+        self.min_history = max(min_history, 2)
+        self.recent_amounts = {} # Last window amounts of every category
+        self.anomalies = []
+        self.rows = 0
+
+    def update(self, chunk: pandas.DataFrame) -> pandas.DataFrame:
+        """Checks the validated transactions of a chunk and carries the recent amounts to the next chunk.
+
+        Args:
+            chunk as pandas.DataFrame with Date, Category and Amount or AmountCents columns
+
+        Returns:
+            pandas.DataFrame of the flagged rows of the chunk with Date, Category, Amount,
+            Expected and ZScore columns, indexed like the chunk.
+        """
+        amounts = get_amounts(chunk).to_numpy(dtype=float)
+        category_codes, categories = pandas.factorize(chunk['Category'])
+        checked = numpy.isfinite(amounts) & (category_codes >= 0) # Missing amounts or categories would spoil the windows
+        checked_positions = numpy.flatnonzero(checked)
+        amounts, category_codes = amounts[checked], category_codes[checked]
+        carried = [self.recent_amounts.get(category, numpy.empty(0)) for category in categories]
+        carried_counts = numpy.array([len(recent) for recent in carried], dtype=numpy.int64)
+
+        # The carried amounts of every category go before its rows, the stable sort keeps them there
+        values = numpy.concatenate(carried + [amounts])
+        codes = numpy.concatenate([numpy.repeat(numpy.arange(len(categories)), carried_counts), category_codes])
+        row_positions = numpy.concatenate([numpy.full(carried_counts.sum(), -1), checked_positions])
+        order = numpy.argsort(codes, kind='stable')
+        values, codes, row_positions = values[order], codes[order], row_positions[order]
+
+        # Window of the previous transactions of the same category, from cumulative sums
+        group_starts = numpy.searchsorted(codes, codes, side='left')
+        positions = numpy.arange(len(values))
+        window_starts = numpy.maximum(group_starts, positions - self.window)
+        history_counts = positions - window_starts
+        cumulative = numpy.concatenate([[0.0], numpy.cumsum(values)])
+        cumulative_squares = numpy.concatenate([[0.0], numpy.cumsum(values * values)])
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            averages = (cumulative[positions] - cumulative[window_starts]) / history_counts
+            variances = (cumulative_squares[positions] - cumulative_squares[window_starts]) / history_counts - averages * averages
+            deviations = numpy.maximum(numpy.sqrt(numpy.maximum(variances, 0)), numpy.abs(averages) * MIN_DEVIATION_FRACTION)
+            z_scores = (values - averages) / deviations
+
+        flagged = (row_positions >= 0) & (history_counts >= self.min_history) & (numpy.abs(z_scores) > self.z_threshold)
+        flagged_rows = chunk.iloc[row_positions[flagged]]
+        anomalies = pandas.DataFrame({
+            'Date': flagged_rows['Date'].to_numpy(),
+            'Category': flagged_rows['Category'].astype(str).to_numpy(),
+            'Amount': values[flagged],
+            'Expected': averages[flagged],
+            'ZScore': z_scores[flagged],
+        }, index=flagged_rows.index).sort_index()
+
+        group_ends = numpy.searchsorted(codes, numpy.arange(len(categories)), side='right')
+        for code, category in enumerate(categories): # Copied, so the arrays of the chunk are not kept alive
+            self.recent_amounts[category] = values[max(group_ends[code] - self.window, 0):group_ends[code]].copy()
+
+        self.rows += len(chunk)
+        self.anomalies.append(anomalies)
+        return anomalies
+
+    def get_anomalies(self) -> pandas.DataFrame:
+        """Returns every row flagged so far, in the order of the chunks."""
+        if not self.anomalies:
+            return pandas.DataFrame(columns=ANOMALY_COLUMNS)
+        return pandas.concat(self.anomalies)
+
+
+def detect_anomalies(data: pandas.DataFrame, chunk_size: int = TRANSACTIONS_CHUNK_SIZE, detector: Optional[AnomalyDetector] = None) -> pandas.DataFrame:
+    """Flags the unusual transactions of validated transactions, chunk_size rows at a time.
+
+    Args:
+        data as pandas.DataFrame, such as load_transactions_data returns
+        chunk_size as the number of rows checked at a time
+        detector as AnomalyDetector to continue from, a new one if None
+
+    Returns:
+        pandas.DataFrame of the flagged rows, like AnomalyDetector.update returns.
+    """
+    detector = AnomalyDetector() if detector is None else detector
+    with measure_stage('detect_anomalies', rows=len(data)):
+        for chunk_start in range(0, len(data), chunk_size):
+            detector.update(data.iloc[chunk_start:chunk_start + chunk_size])
+    return detector.get_anomalies()
+
+
+def stream_anomalies(filepath: str, chunk_size: int = TRANSACTIONS_CHUNK_SIZE,
+                     transform: Optional[Callable[[pandas.DataFrame], Optional[pandas.DataFrame]]] = None) -> Optional[pandas.DataFrame]:
+    """Reads a CSV file in chunks and flags its unusual transactions, keeping only one chunk in memory.
+
+    Args:
+        Path to the CSV file.
+        Number of rows to read at a time.
+        Optional function applied to every validated chunk, such as a currency conversion.
+
+    Returns:
+        pandas.DataFrame of the flagged rows, None if the file could not be read or a chunk not transformed.
+    """
+    detector = AnomalyDetector()
+    try:
+        with measure_stage('stream_anomalies') as stage:
+            for csv_chunk in read_transactions_csv(filepath, chunk_size):
+                validated_chunk = check_transactions_file(csv_chunk)
+                if validated_chunk is None:
+                    continue
+                if transform is not None:
+                    validated_chunk = transform(validated_chunk)
+                    if validated_chunk is None: # Like stream_transactions_aggregates, a failed chunk fails the file
+                        logging.error(f"Could not transform the rows {csv_chunk.index[0] + 1} to {csv_chunk.index[-1] + 1} of {filepath}.")
+                        return None
+                detector.update(validated_chunk)
+            stage.rows = detector.rows
+
+    except FileNotFoundError:
+        logging.error(f"File {filepath} not found.")
+        return None
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+        return None
+
+    return detector.get_anomalies()
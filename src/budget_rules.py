@@ -0,0 +1,102 @@
+import json
+import threading
+import numpy
+import pandas
+from typing import NamedTuple
+from src.config import configure_logging, BUDGET_RULES_PATH
+
+configure_logging() # Initialize logging
+
+# A budget rules file lists one rule per category:
+#
+#     {"rules": [{"category": "Dining", "target_percentage": 5, "tier": 1, "floor_percentage": 0}, ...]}
+#
+# target_percentage is the most of the income the category should take, null for no target.
+# Categories of a lower tier are reduced before the next tier, in the order of the file.
+# floor_percentage is the share of the category that a savings goal never cuts.
+
+
+class BudgetRules(NamedTuple):
+    """Budget rules compiled into arrays aligned with their categories, lowest tier first."""
+    categories: pandas.Index
+    target_percentages: numpy.ndarray # nan for a category without a target
+    tiers: numpy.ndarray
+    floor_percentages: numpy.ndarray
+
+
+loaded_budget_rules = {} # Budget rules by path, every file is read once
+loaded_budget_rules_lock = threading.Lock()
+
+
+def read_budget_rules(path: str) -> BudgetRules:
+    """Reads a budget rules file and compiles it into a BudgetRules.
+
+    Raises:
+        ValueError: if a rule has no category, a category has two rules or a percentage is out of range.
+    """
+    with open(path) as rules_file:
+        rules = json.load(rules_file)['rules']
+
+    categories = [rule.get('category') for rule in rules]
+    if any(category is None for category in categories) or len(set(categories)) != len(categories):
+        raise ValueError(f"Every budget rule in {path} needs its own category.")
+
+    target_percentages = numpy.array([numpy.nan if rule.get('target_percentage') is None else rule['target_percentage'] for rule in rules], dtype=float)
+    tiers = numpy.array([rule.get('tier', 1) for rule in rules], dtype=numpy.int64)
+    floor_percentages = numpy.array([rule.get('floor_percentage', 0) for rule in rules], dtype=float)
+    if (target_percentages < 0).any() or ((floor_percentages < 0) | (floor_percentages > 100)).any():
+        raise ValueError(f"Budget rules in {path} have a percentage out of range.")
+
+    order = numpy.argsort(tiers, kind='stable') # Keep the order of the file within a tier
+    return BudgetRules(
+        categories=pandas.Index(categories, name='Category')[order],
+        target_percentages=target_percentages[order],
+        tiers=tiers[order],
+        floor_percentages=floor_percentages[order],
+    )
+
+
+def load_budget_rules(path: str = BUDGET_RULES_PATH) -> BudgetRules:
+    """Returns the budget rules of a file, reading it only the first time."""
+    with loaded_budget_rules_lock:
+        if path not in loaded_budget_rules:
+            loaded_budget_rules[path] = read_budget_rules(path)
+        return loaded_budget_rules[path]
+
+
+def get_rule_values(rules: BudgetRules, values: numpy.ndarray, categories, fill_value: float = numpy.nan) -> numpy.ndarray:
+    """Aligns one array of the rules with other categories, fill_value for the categories without a rule."""
+    positions = rules.categories.get_indexer(pandas.Index(categories))
+    return numpy.where(positions >= 0, values[positions], fill_value)
+
+
+def get_tier_categories(rules: BudgetRules) -> list:
+    """Returns the categories of every tier, lowest tier first, each in reduction order."""
+    return [list(rules.categories[rules.tiers == tier]) for tier in numpy.unique(rules.tiers)]
+
+
+def get_max_reduction_percentages(rules: BudgetRules) -> numpy.ndarray:
+    """Returns how much of every category a savings goal may cut, in percent."""
+    return 100 - rules.floor_percentages
+
+
+def calculate_target_reductions(amounts: numpy.ndarray, income: numpy.ndarray, target_percentages: numpy.ndarray) -> (numpy.ndarray, numpy.ndarray, numpy.ndarray):
+    """Checks the target percentage of income of every category in one pass.
+
+    Parameters:
+    - amounts (numpy.ndarray): expenses of the categories, or a users x categories matrix of them.
+    - income (numpy.ndarray): the income, or the income of every user.
+    - target_percentages (numpy.ndarray): target of every category, nan for no target.
+
+    Returns:
+    - numpy.ndarray: share of the income of every category, in percent.
+    - numpy.ndarray: True for the categories above their target.
+    - numpy.ndarray: reduction that brings every category above its target back to it, in percent.
+    """
+    amounts = numpy.asarray(amounts, dtype=float)
+    income = numpy.asarray(income, dtype=float)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        current_percentages = amounts / (income[..., None] if income.ndim else income) * 100
+        exceeding = current_percentages > target_percentages
+        reductions = numpy.where(exceeding, (current_percentages - target_percentages) / current_percentages * 100, 0)
+    return current_percentages, exceeding, reductions
@@ -0,0 +1,148 @@
+import numpy
+import pandas
+from typing import NamedTuple, Optional
+from src.config import configure_logging
+from src.data_loader import AMOUNT_CENTS_COLUMN, CENTS_PER_UNIT
+
+configure_logging() # Initialize logging
+
+ROLLING_AVERAGE_MONTHS = 3
+
+
+class CategoryMonthCube(NamedTuple):
+    """Income and expenses of every category in every month, from the first month to the last.
+
+    The category arrays have one row per category and one column per month. Rows without a
+    category are only counted in the month totals, and rows without a date only in the
+    undated and overall totals, so the totals match summing the transactions directly.
+    """
+    categories: pandas.Index
+    months: pandas.PeriodIndex
+    expenses: numpy.ndarray # categories x months, positive amounts
+    income: numpy.ndarray # categories x months
+    month_expenses: numpy.ndarray # months, every category
+    month_income: numpy.ndarray # months, every category
+    undated_expenses: numpy.ndarray # categories
+    undated_income: numpy.ndarray # categories
+    total_expenses: float # every transaction
+    total_income: float
+
+
+def build_category_month_cube(data: pandas.DataFrame) -> Optional[CategoryMonthCube]:
+    """Sums validated transactions into a dense category x month cube in one pass.
+
+    Categories are coded as integers and dates as month numbers, so every cell is summed
+    by one numpy.bincount instead of filtering the DataFrame for every category or month.
+    Compact transactions are summed in whole cents, so the totals do not drift.
+
+    Args:
+        data as pandas.DataFrame with Date, Category and Amount columns
+
+    Returns:
+        CategoryMonthCube of the transactions, None if there are none.
+    """
+    if data is None or data.empty:
+        return None
+
+    if AMOUNT_CENTS_COLUMN in data.columns:
+        amounts = data[AMOUNT_CENTS_COLUMN].to_numpy(dtype=float) # Whole cents are summed exactly up to 2**53
+        amount_scale = CENTS_PER_UNIT
+    else:
+        amounts = pandas.to_numeric(data['Amount']).to_numpy(dtype=float)
+        amount_scale = 1
+    expenses = numpy.where(amounts < 0, -amounts, 0.0)
+    income = numpy.where(amounts > 0, amounts, 0.0)
+
+    category_codes, categories = pandas.factorize(data['Category'], sort=True)
+    categories = pandas.Index(categories, name='Category')
+    dates = data['Date'] if pandas.api.types.is_datetime64_any_dtype(data['Date']) else \
+        pandas.to_datetime(data['Date'], errors='coerce', format='mixed')
+    month_numbers = dates.dt.year.to_numpy(dtype=float) * 12 + dates.dt.month.to_numpy(dtype=float) - 1
+    dated = ~numpy.isnan(month_numbers)
+
+    if dated.any():
+        first_month = int(month_numbers[dated].min())
+        month_count = int(month_numbers[dated].max()) - first_month + 1
+        months = pandas.period_range(pandas.Period(year=first_month // 12, month=first_month % 12 + 1, freq='M'),
+                                     periods=month_count, freq='M')
+    else:
+        first_month, month_count = 0, 0
+        months = pandas.PeriodIndex([], freq='M')
+    month_codes = numpy.where(dated, numpy.nan_to_num(month_numbers) - first_month, -1).astype(numpy.int64)
+
+    categorized = category_codes >= 0
+    in_cube = dated & categorized
+    cell_codes = category_codes[in_cube] * month_count + month_codes[in_cube]
+    cell_count = len(categories) * month_count
+    undated_rows = ~dated & categorized
+
+    return CategoryMonthCube(
+        categories=categories,
+        months=months,
+        expenses=numpy.bincount(cell_codes, expenses[in_cube], cell_count).reshape(len(categories), month_count) / amount_scale,
+        income=numpy.bincount(cell_codes, income[in_cube], cell_count).reshape(len(categories), month_count) / amount_scale,
+        month_expenses=numpy.bincount(month_codes[dated], expenses[dated], month_count) / amount_scale,
+        month_income=numpy.bincount(month_codes[dated], income[dated], month_count) / amount_scale,
+        undated_expenses=numpy.bincount(category_codes[undated_rows], expenses[undated_rows], len(categories)) / amount_scale,
+        undated_income=numpy.bincount(category_codes[undated_rows], income[undated_rows], len(categories)) / amount_scale,
+        total_expenses=float(expenses.sum()) / amount_scale,
+        total_income=float(income.sum()) / amount_scale,
+    )
+
+
+def get_expenses_by_category(cube: CategoryMonthCube, months: Optional[slice] = None) -> pandas.Series:
+    """Sums the expenses of every category, over all the months or a slice of them.
+
+    The undated transactions are only included when every month is.
+    Categories without expenses are left out, like grouping the expense rows would.
+    """
+    expenses = cube.expenses.sum(axis=1) + cube.undated_expenses if months is None else cube.expenses[:, months].sum(axis=1)
+    has_expenses = (cube.expenses.sum(axis=1) + cube.undated_expenses) > 0 if months is None else cube.expenses[:, months].any(axis=1)
+    return pandas.Series(expenses[has_expenses], index=cube.categories[has_expenses], name='Amount')
+
+
+def get_total_income_and_expenses(cube: CategoryMonthCube) -> (float, float):
+    """Returns the total income and the total expenses of every transaction."""
+    return cube.total_income, cube.total_expenses
+
+
+def get_monthly_totals(cube: CategoryMonthCube, rolling_months: int = ROLLING_AVERAGE_MONTHS) -> pandas.DataFrame:
+    """Builds the income, expenses and net of every month with month over month changes.
+
+    Args:
+        cube as CategoryMonthCube
+        rolling_months as the number of months in the rolling averages
+
+    Returns:
+        pandas.DataFrame indexed by month with Income, Expenses, Net, Net Change and
+        Expenses Rolling Average columns.
+    """
+    monthly_totals = pandas.DataFrame({
+        'Income': cube.month_income,
+        'Expenses': cube.month_expenses,
+    }, index=cube.months)
+    monthly_totals['Net'] = monthly_totals['Income'] - monthly_totals['Expenses']
+    monthly_totals['Net Change'] = monthly_totals['Net'].diff()
+    monthly_totals['Expenses Rolling Average'] = get_rolling_average(cube.month_expenses, rolling_months)
+    return monthly_totals
+
+
+def get_category_rolling_averages(cube: CategoryMonthCube, rolling_months: int = ROLLING_AVERAGE_MONTHS) -> pandas.DataFrame:
+    """Returns the rolling average expenses of every category, categories x months."""
+    return pandas.DataFrame(get_rolling_average(cube.expenses, rolling_months), index=cube.categories, columns=cube.months)
+
+
+def get_category_month_over_month(cube: CategoryMonthCube) -> pandas.DataFrame:
+    """Returns the change of the expenses of every category from the month before, categories x months."""
+    changes = numpy.full(cube.expenses.shape, numpy.nan)
+    changes[:, 1:] = numpy.diff(cube.expenses, axis=1)
+    return pandas.DataFrame(changes, index=cube.categories, columns=cube.months)
+
+
+def get_rolling_average(values: numpy.ndarray, window: int) -> numpy.ndarray:
+    """Averages the last window months of every row with a cumulative sum, the first months average what there is."""
+    cumulative = numpy.cumsum(values, axis=-1)
+    windowed = cumulative.copy()
+    windowed[..., window:] -= cumulative[..., :-window]
+    counts = numpy.minimum(numpy.arange(1, values.shape[-1] + 1), window)
+    return windowed / counts
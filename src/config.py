@@ -12,4 +12,69 @@ def configure_logging():
         level=LOGGING_LEVEL,
         format=LOGGING_FORMAT,
         datefmt=DATE_FORMAT
-    )
\ No newline at end of file
+    )
+
+
+# Instrumentation configuration
+INSTRUMENTATION_ENABLED = False # Record the wall time, CPU time and rows of every analysis stage
+INSTRUMENTATION_TRACE_MEMORY = False # Also record the peak allocated memory with tracemalloc, slows the run down
+INSTRUMENTATION_EXPORT_PATH = os.path.join("metrics", "stages.jsonl") # None to keep the stages in memory only
+INSTRUMENTATION_EXPORT_FORMAT = "jsonl" # "jsonl" or "prometheus"
+
+
+# Transactions loading configuration
+TRANSACTIONS_CHUNK_SIZE = 100_000 # Rows read at a time when streaming a transactions file
+STREAM_TRANSACTIONS = False # Stream the file in chunks instead of loading it at once
+TRANSACTIONS_LOADER_WORKERS = None # Worker processes used to load a directory of files, None for all the cores
+COMPACT_TRANSACTIONS = True # Load Category as a categorical, Amount as int64 cents and Date as datetime64
+TRANSACTIONS_DATE_FORMAT = None # Format of the dates, e.g. "%Y-%m-%d", None to infer it from the first date
+INCREMENTAL_LEDGER = False # Add only the new rows of a file to a persistent ledger and its running totals
+INCREMENTAL_LEDGER_DIRECTORY = "ledger" # Every transactions file gets a ledger of its own under it
+LEDGER_LOCK_TIMEOUT_SECONDS = 30 # Longest wait for another process updating the same ledger
+
+# Transactions cache configuration
+USE_TRANSACTIONS_CACHE = True # Keep validated transactions in a binary cache for repeated loads
+TRANSACTIONS_CACHE_DIRECTORY = "cache"
+TRANSACTIONS_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+TRANSACTIONS_CACHE_HASH_CONTENT = False # Also hash the file content when building the cache key
+
+# Exchange rates configuration
+EXCHANGE_RATES_URL = "https://api.frankfurter.app"
+EXCHANGE_RATES_TTL_SECONDS = 60 * 60 # Rates change once a day, refresh them at most every hour
+EXCHANGE_RATES_CACHE_DIRECTORY = os.path.join("cache", "exchange_rates") # None to keep the rates in memory only
+EXCHANGE_RATES_TIMEOUT_SECONDS = 10
+EXCHANGE_RATES_POOL_SIZE = 10
+REPORTING_CURRENCY = "ILS" # Currency that transactions with a Currency column are converted to
+CROSS_RATES_BASE_CURRENCY = "EUR" # The one rates table every pair of currencies is derived from
+EXCHANGE_RATES_MAX_CONCURRENCY = 8 # Most rates requests sent at the same time by a bulk fetch
+EXCHANGE_RATES_RETRIES = 3
+EXCHANGE_RATES_BACKOFF_SECONDS = 0.5 # Doubled after every failed attempt
+
+# Savings recommendations configuration
+BUDGET_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "budget_rules.json") # Target, tier and floor of every category
+FORECAST_SIMULATIONS = 10_000 # Simulated future paths of the savings forecast
+FORECAST_MONTHS = 12 # Months of every simulated path
+FORECAST_SEED = 0 # Seed of the forecast, None for a different forecast every run
+DETECT_ANOMALIES = True # Flag transactions far from the recent transactions of their category
+ANOMALY_WINDOW = 30 # Previous transactions of the category a transaction is compared with
+ANOMALY_MIN_HISTORY = 10 # Transactions a category needs before any of its transactions is flagged
+ANOMALY_Z_THRESHOLD = 4.0 # Standard deviations from the recent average that flag a transaction
+ANOMALY_REPORT_ROWS = 20 # Most unusual transactions listed in the recommendation report
+DETECT_RECURRING = True # Offer the recurring charges of discretionary categories as a cut of their own
+RECURRING_AMOUNT_ROUNDING = 1.0 # Charges whose amounts round to the same step are the same charge
+RECURRING_MIN_OCCURRENCES = 3 # Charges a series needs before it is recurring
+RECURRING_MIN_REGULARITY = 0.8 # Share of the gaps between charges that must match the cadence
+
+# Reports configuration
+REPORTS_DIRECTORY = "reports" # Where the reports of an interactive run are saved
+USE_REPORTS_CACHE = True # Reuse a report PDF when its inputs did not change since it was rendered
+REPORTS_CACHE_DIRECTORY = os.path.join("cache", "reports")
+REPORTS_CACHE_MAX_BYTES = 256 * 1024 * 1024 # Least recently used PDFs are removed above it
+CONSOLIDATED_REPORT = False # Write every page to one financial_report.pdf instead of three reports
+REPORT_RENDERING_WORKERS = 3 # Processes the three reports are rendered in at once, 1 to render them one after the other
+
+# Batch runner configuration
+BATCH_WORKERS = None # Jobs run at the same time, None for all the cores
+BATCH_RETRIES = 2 # Extra attempts for a job that failed
+BATCH_RETRY_BACKOFF_SECONDS = 1.0 # Doubled after every failed attempt
+BATCH_OUTPUT_DIRECTORY = os.path.join("reports", "batch") # Every job gets its own directory under it
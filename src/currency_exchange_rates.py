@@ -1,28 +1,303 @@
-import requests
+import asyncio
+import json
 import logging
-from src.config import configure_logging
+import os
+import re
+import tempfile
+import threading
+import time
+import numpy
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from typing import TYPE_CHECKING, Optional
+from src.config import (
+    configure_logging,
+    EXCHANGE_RATES_CACHE_DIRECTORY,
+    EXCHANGE_RATES_POOL_SIZE,
+    EXCHANGE_RATES_TIMEOUT_SECONDS,
+    EXCHANGE_RATES_TTL_SECONDS,
+    EXCHANGE_RATES_URL,
+    REPORTING_CURRENCY,
+    CROSS_RATES_BASE_CURRENCY,
+    EXCHANGE_RATES_BACKOFF_SECONDS,
+    EXCHANGE_RATES_MAX_CONCURRENCY,
+    EXCHANGE_RATES_RETRIES,
+)
+
+if TYPE_CHECKING:
+    import pandas # Imported only where it is used, the currency exchange menu does not need it
 
 configure_logging() # Initialize logging
 
-def get_exchange_rates(current_currency: str, target_currency: str, amount: float) -> (float, str):
+CURRENCY_COLUMN = 'Currency'
+CURRENCY_CODE_PATTERN = re.compile(r'[A-Z]{3}') # Only these codes name a cache file, so a code cannot be a path
+RATES_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+class ExchangeRatesClient:
+    """Fetches exchange rates tables over a pooled HTTP session and caches them.
+
+    Each base currency table is kept in memory for ttl_seconds and, when a cache
+    directory is set, on disk so it survives restarts. Concurrent lookups of the
+    same base currency wait for a single fetch instead of each sending a request.
+    """
+
+    def __init__(self, base_url: str = EXCHANGE_RATES_URL, ttl_seconds: float = EXCHANGE_RATES_TTL_SECONDS,
+                 cache_directory: Optional[str] = EXCHANGE_RATES_CACHE_DIRECTORY,
+                 timeout: float = EXCHANGE_RATES_TIMEOUT_SECONDS, pool_size: int = EXCHANGE_RATES_POOL_SIZE,
+                 retries: int = EXCHANGE_RATES_RETRIES, backoff_seconds: float = EXCHANGE_RATES_BACKOFF_SECONDS):
+        self.base_url = base_url.rstrip('/')
+        self.ttl_seconds = ttl_seconds
+        self.cache_directory = cache_directory
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        self.session.mount('http://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        self.rates_tables = {}
+        self.cross_rates = {} # (rates table it was built from, CrossRates) by rates key
+        self.fetch_locks = {}
+        self.locks_guard = threading.Lock()
+
+    def get_rates(self, base_currency: str, rates_date: Optional[str] = None) -> dict:
+        """Returns the rates table of a base currency, as returned by the rates API.
+
+        Args:
+            base_currency (str): currency the rates are relative to.
+            rates_date (str): YYYY-MM-DD date of historical rates, the latest rates if None.
+
+        Returns:
+            dict: the API response, with a 'rates' dict or an error 'message'.
+        """
+        if rates_date is not None and not RATES_DATE_PATTERN.fullmatch(rates_date):
+            return {'message': f"{rates_date} is not a YYYY-MM-DD date."}
+
+        rates_key = (base_currency, rates_date or 'latest')
+        rates_table = self.get_cached_rates(rates_key)
+        if rates_table is not None:
+            return rates_table
+
+        with self.locks_guard:
+            fetch_lock = self.fetch_locks.setdefault(rates_key, threading.Lock())
+
+        with fetch_lock:
+            rates_table = self.get_cached_rates(rates_key) # Another thread may have fetched it meanwhile
+            if rates_table is not None:
+                return rates_table
+
+            rates_table = self.session.get(f"{self.base_url}/{rates_key[1]}", params={'base': base_currency}, timeout=self.timeout).json()
+            if rates_table.get('rates') is not None:
+                self.store_rates(rates_key, rates_table)
+            return rates_table
+
+    async def get_rates_async(self, base_currency: str, rates_date: Optional[str] = None,
+                              semaphore: Optional[asyncio.Semaphore] = None) -> dict:
+        """Async version of get_rates, with retries with exponential backoff.
+
+        The pooled session is blocking, so each request runs on a worker thread while the
+        event loop waits for it. The timeout is the one of the HTTP request itself, so a
+        request that times out has ended before its semaphore slot is released, and the
+        semaphore really bounds how many requests run at once.
+        """
+        semaphore = semaphore or asyncio.Semaphore(EXCHANGE_RATES_MAX_CONCURRENCY)
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    return await asyncio.to_thread(self.get_rates, base_currency, rates_date)
+            except requests.RequestException as e:
+                if attempt == self.retries:
+                    raise
+                logging.info(f"Retrying {base_currency} {rates_date or 'latest'} rates after: {e!r}")
+                await asyncio.sleep(self.backoff_seconds * 2 ** attempt)
+
+    async def get_many_rates_async(self, rates_keys: list, max_concurrency: int = EXCHANGE_RATES_MAX_CONCURRENCY) -> dict:
+        """Fetches many (base currency, date) rates tables concurrently.
+
+        Args:
+            rates_keys (list): (base currency, YYYY-MM-DD date or None) pairs.
+            max_concurrency (int): most requests sent at the same time.
+
+        Returns:
+            dict: rates table by key, with an error 'message' for the keys that failed.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        rates_keys = list(dict.fromkeys(rates_keys))
+        results = await asyncio.gather(
+            *(self.get_rates_async(base_currency, rates_date, semaphore) for base_currency, rates_date in rates_keys),
+            return_exceptions=True
+        )
+        return {
+            rates_key: {'message': repr(result)} if isinstance(result, Exception) else result
+            for rates_key, result in zip(rates_keys, results)
+        }
+
+    def get_many_rates(self, rates_keys: list, max_concurrency: int = EXCHANGE_RATES_MAX_CONCURRENCY) -> dict:
+        """Synchronous wrapper of get_many_rates_async.
+
+        asyncio.run cannot start a loop inside a running one, so when it is called from a running
+        event loop the fetch gets its own loop on a worker thread, and blocks the calling loop
+        until it ends. Coroutines should await get_many_rates_async instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.get_many_rates_async(rates_keys, max_concurrency))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.get_many_rates_async(rates_keys, max_concurrency)).result()
+
+    def get_cached_rates(self, rates_key: tuple) -> Optional[dict]:
+        """Returns a rates table that is still fresh from memory or disk, None if there is none.
+
+        Historical rates never change, so only the latest rates expire.
+        """
+        cached = self.rates_tables.get(rates_key)
+        if cached is None and self.cache_directory:
+            cached = self.read_rates_file(rates_key)
+            if cached is not None:
+                self.rates_tables[rates_key] = cached
+
+        if cached is None or (rates_key[1] == 'latest' and time.time() - cached[0] > self.ttl_seconds):
+            return None
+        return cached[1]
+
+    def store_rates(self, rates_key: tuple, rates_table: dict) -> None:
+        """Keeps a fetched rates table in memory and writes it to the disk cache."""
+        fetched_at = time.time()
+        self.rates_tables[rates_key] = (fetched_at, rates_table)
+        rates_file_path = self.rates_file_path(rates_key)
+        if rates_file_path is None:
+            return
+
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_directory, suffix='.tmp')
+            with os.fdopen(file_descriptor, 'w') as rates_file:
+                json.dump({'fetched_at': fetched_at, 'rates_table': rates_table}, rates_file)
+            os.replace(temporary_path, rates_file_path)
+        except OSError as e:
+            logging.error(f"Could not write the exchange rates cache: {e}")
+
+    def read_rates_file(self, rates_key: tuple) -> Optional[tuple]:
+        """Reads a rates table from the disk cache, None if it is missing or broken."""
+        rates_file_path = self.rates_file_path(rates_key)
+        if rates_file_path is None:
+            return None
+        try:
+            with open(rates_file_path) as rates_file:
+                cached = json.load(rates_file)
+            return cached['fetched_at'], cached['rates_table']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def rates_file_path(self, rates_key: tuple) -> Optional[str]:
+        """Returns the cache file of a rates table, None without a cache directory or for a base
+        currency that is not a three letter code, which is then only cached in memory."""
+        base_currency, rates_date = rates_key
+        if not self.cache_directory or not CURRENCY_CODE_PATTERN.fullmatch(base_currency):
+            return None
+        return os.path.join(self.cache_directory, f"{base_currency}_{rates_date}.json")
+
+
+rates_client = ExchangeRatesClient()
+
+
+class CrossRates:
+    """Exchange rates between every pair of currencies, derived from a single rates table.
+
+    The rates are held in an N x N numpy array, where matrix[i, j] is the worth of one unit
+    of currency i in currency j, with a currency to index map for O(1) lookups.
+    """
+
+    def __init__(self, base_currency: str, rates: dict):
+        self.currencies = [base_currency] + sorted(currency for currency in rates if currency != base_currency)
+        self.currency_index = {currency: index for index, currency in enumerate(self.currencies)}
+        base_worth = numpy.array([1.0] + [rates[currency] for currency in self.currencies[1:]], dtype=float)
+        self.matrix = base_worth[None, :] / base_worth[:, None]
+
+    def __contains__(self, currency: str) -> bool:
+        return currency in self.currency_index
+
+    def get_rate(self, current_currency: str, target_currency: str) -> Optional[float]:
+        """Returns the worth of one unit of current_currency in target_currency, None if one is unknown."""
+        current_index = self.currency_index.get(current_currency)
+        target_index = self.currency_index.get(target_currency)
+        if current_index is None or target_index is None:
+            return None
+        return float(self.matrix[current_index, target_index])
+
+    def convert(self, amounts, current_currencies, target_currencies) -> numpy.ndarray:
+        """Converts a whole vector of amounts at once, NaN where a currency is unknown.
+
+        Args:
+            amounts, current_currencies and target_currencies as array likes of the same length,
+            or a single currency for all the amounts.
+
+        Returns:
+            numpy.ndarray of the converted amounts.
+        """
+        import pandas
+        currencies = pandas.Index(self.currencies)
+        current_indexes = currencies.get_indexer(numpy.atleast_1d(current_currencies))
+        target_indexes = currencies.get_indexer(numpy.atleast_1d(target_currencies))
+        rates = numpy.where((current_indexes >= 0) & (target_indexes >= 0), self.matrix[current_indexes, target_indexes], numpy.nan)
+        return numpy.asarray(amounts, dtype=float) * rates
+
+
+def get_cross_rates(client: Optional[ExchangeRatesClient] = None, rates_date: Optional[str] = None,
+                    base_currency: str = CROSS_RATES_BASE_CURRENCY) -> Optional[CrossRates]:
+    """Fetches one rates table and derives the rates between every pair of currencies from it.
+
+    The CrossRates of a table is kept on the client and reused for as long as the client
+    serves the same table, so its matrix is built again only when the rates are refreshed.
+
+    Args:
+        client to fetch the rates with, the shared cached client if None
+        rates_date as YYYY-MM-DD str for historical rates, the latest rates if None
+        base_currency of the fetched table
+
+    Returns:
+        CrossRates, None if the rates table could not be fetched.
+    """
+    client = client or rates_client
+    rates_table = client.get_rates(base_currency, rates_date)
+    if rates_table.get('rates') is None:
+        logging.error(f"{base_currency} - {rates_table.get('message')}")
+        return None
+
+    rates_key = (base_currency, rates_date or 'latest')
+    cached = client.cross_rates.get(rates_key)
+    if cached is not None and cached[0] is rates_table:
+        return cached[1]
+    cross_rates = CrossRates(base_currency, rates_table['rates'])
+    client.cross_rates[rates_key] = (rates_table, cross_rates)
+    return cross_rates
+
+
+def get_exchange_rates(current_currency: str, target_currency: str, amount: float, client: Optional[ExchangeRatesClient] = None) -> (float, str):
     """this function make currency exchange
 
     Args:
         current_currency to exchange as str
         target_currency to exchange as str
         amount of the current currency as float
+        client to fetch the rates with, the shared cached client if None
 
     Returns:
         float : amount after the exchange
     """
     if amount > 0:
         try:
-            URL = 'https://api.frankfurter.app/latest?base='
-            request_result = requests.get(URL+current_currency).json()
-            if request_result.get('message'):
-                return None, f"\n{current_currency} - {request_result.get('message')}"
-            
-            target_currency_worth = request_result.get('rates', None).get(target_currency, None)
+            cross_rates = get_cross_rates(client)
+            if cross_rates is None:
+                return None, "\nThe exchange rates are not available right now"
+
+            if current_currency not in cross_rates:
+                return None, f"\n{current_currency} is not in the database"
+
+            target_currency_worth = cross_rates.get_rate(current_currency, target_currency)
             if target_currency_worth is None:
                 return None, f"\n{target_currency} is not in the database"
 
@@ -32,4 +307,77 @@ def get_exchange_rates(current_currency: str, target_currency: str, amount: floa
             logging.error(e)
     
     else:
-        return None, "amount must be greater that 0"
\ No newline at end of file
+        return None, "amount must be greater that 0"
+
+
+def convert_transactions_currency(data: 'pandas.DataFrame', reporting_currency: str = REPORTING_CURRENCY,
+                                  client: Optional[ExchangeRatesClient] = None) -> Optional['pandas.DataFrame']:
+    """Converts the amounts of a ledger with a Currency column to the reporting currency.
+
+    One rates table is fetched for every distinct date and turned into cross rates. The
+    rate of every distinct (date, currency) pair is kept in a rates table and joined onto
+    the transactions, so no rate is looked up row by row.
+    If any row has no rate, because its date's rates could not be fetched or the rates API
+    does not know its currency, nothing is converted, so the totals never leave rows out.
+
+    Args:
+        data as pandas.DataFrame with Date, Amount (or compact AmountCents) and Currency columns
+        reporting_currency to convert every amount to, as str
+        client to fetch the rates with, the shared cached client if None
+
+    Returns:
+        DataFrame with the converted amounts, the same data if it has no Currency column,
+        None if a rate of any row could not be fetched.
+    """
+    if CURRENCY_COLUMN not in data.columns:
+        return data
+
+    import pandas
+    from src.data_loader import AMOUNT_CENTS_COLUMN, get_amounts
+    try:
+        client = client or rates_client
+        rate_keys = pandas.DataFrame({
+            'RateDate': pandas.to_datetime(data['Date'], errors='coerce', format='mixed').dt.strftime('%Y-%m-%d'),
+            CURRENCY_COLUMN: data[CURRENCY_COLUMN].astype(str).str.upper(),
+        }, index=data.index)
+
+        # Fetch the rates table of every date concurrently, the loop below then reads them from the cache
+        rates_dates = [None if pandas.isna(rates_date) else rates_date for rates_date in rate_keys['RateDate'].unique()]
+        client.get_many_rates([(CROSS_RATES_BASE_CURRENCY, rates_date) for rates_date in rates_dates])
+
+        rates_rows = []
+        cross_rates_by_date = {}
+        for rates_date, currency in rate_keys.drop_duplicates().itertuples(index=False):
+            if currency == reporting_currency:
+                rate = 1.0
+            else:
+                if rates_date not in cross_rates_by_date:
+                    cross_rates_by_date[rates_date] = get_cross_rates(client, None if pandas.isna(rates_date) else rates_date)
+                cross_rates = cross_rates_by_date[rates_date]
+                rate = cross_rates.get_rate(currency, reporting_currency) if cross_rates else None
+                if rate is None:
+                    logging.error(f"No {currency} to {reporting_currency} rate for {rates_date}.")
+            rates_rows.append((rates_date, currency, rate))
+
+        rates = pandas.DataFrame(rates_rows, columns=['RateDate', CURRENCY_COLUMN, 'Rate'])
+        row_rates = rate_keys.merge(rates, on=['RateDate', CURRENCY_COLUMN], how='left')['Rate'].to_numpy(dtype=float)
+
+        missing_rates = numpy.isnan(row_rates)
+        if missing_rates.any():
+            missing_amounts = get_amounts(data)[missing_rates]
+            logging.error(f"No {reporting_currency} rate for {missing_rates.sum()} of {len(data)} transactions "
+                          f"({missing_amounts.abs().sum():.2f} in their own currencies), the transactions were not converted.")
+            return None
+
+        converted_data = data.copy()
+        if AMOUNT_CENTS_COLUMN in data.columns:
+            converted_cents = numpy.rint(data[AMOUNT_CENTS_COLUMN].to_numpy() * row_rates)
+            converted_data[AMOUNT_CENTS_COLUMN] = converted_cents.astype(numpy.int64)
+        else:
+            converted_data['Amount'] = data['Amount'].to_numpy() * row_rates
+        converted_data[CURRENCY_COLUMN] = reporting_currency
+        return converted_data
+
+    except Exception as e:
+        logging.error(f"Could not convert the transactions currency: {e}")
+        return None
@@ -1,24 +1,309 @@
-import pandas
+import glob
 import logging
-from typing import Optional
-from src.config import configure_logging
+import os
+import numpy
+import pandas
+from concurrent.futures import ProcessPoolExecutor
+from pandas.tseries.api import guess_datetime_format
+from typing import Callable, NamedTuple, Optional
+from src.config import configure_logging, TRANSACTIONS_CHUNK_SIZE, TRANSACTIONS_DATE_FORMAT, TRANSACTIONS_LOADER_WORKERS
+from src.instrumentation import measure_stage
+from src.transactions_cache import load_cached_transactions, save_cached_transactions
 
 # Initialize logging
 configure_logging()
 
-def load_transactions_data(filepath: str) -> Optional[pandas.DataFrame]:
+AMOUNT_CENTS_COLUMN = 'AmountCents' # Replaces Amount in compact transactions
+CENTS_PER_UNIT = 100
+CSV_COLUMN_TYPES = {'Date': str, 'Category': str, 'Amount': str} # Read as text, so a chunk and a whole file get the same types
+
+# read_csv infers the type of a column from the rows it reads, so the same Amount cell
+# could be a number in one chunk and text in another, or one text cell could make a whole
+# file of text amounts. read_transactions_csv reads the columns as text and converts every
+# amount that is a number, so a file and its chunks are validated cell by cell the same way.
+
+
+class TransactionsAggregates(NamedTuple):
+    """Totals of a transactions file that the reports are built from."""
+    expenses_by_category: pandas.Series
+    total_income: float
+    total_expenses: float
+    valid_rows: int
+
+
+def load_transactions_data(filepath: str, use_cache: bool = False, compact: bool = False) -> Optional[pandas.DataFrame]:
     """Loads transaction data from a CSV file and validates it.
 
     Args:
         Path to the CSV file.
+        Whether to reuse (and fill) the on-disk cache of validated transactions.
+        Cached data has Date parsed to datetime64 and Category as a categorical.
+        Whether to return the compact column types of compact_transactions.
+
+    Returns:
+        Validated DataFrame if successful, None if not.
+    """
+    validated_data, error_message = load_transactions_file(filepath, use_cache, compact)
+    if error_message != "":
+        logging.error(error_message)
+    return validated_data
+
+
+def load_transactions_file(filepath: str, use_cache: bool = False, compact: bool = False) -> (Optional[pandas.DataFrame], str):
+    """Loads and validates one CSV file, returning the error instead of logging it.
+
+    Args:
+        Path to the CSV file.
+        Whether to reuse (and fill) the on-disk cache of validated transactions.
+        Whether to return the compact column types of compact_transactions.
 
     Returns:
         Validated DataFrame if successful, None if not.
+        str: error message, empty if the file was loaded.
+    """
+    try:
+        if use_cache:
+            with measure_stage('load_cache') as stage:
+                cached_data = load_cached_transactions(filepath)
+                stage.rows = None if cached_data is None else len(cached_data)
+            if cached_data is not None:
+                return compact_transactions(cached_data) if compact else cached_data, ""
+
+        with measure_stage('parse_csv') as stage:
+            csv_data = read_transactions_csv(filepath)
+            stage.rows = len(csv_data)
+        with measure_stage('validate', rows=len(csv_data)):
+            validated_data = check_transactions_file(csv_data)
+        if validated_data is None:
+            return None, f"File {filepath} has no valid transactions."
+        if use_cache:
+            validated_data = save_cached_transactions(filepath, validated_data)
+        return compact_transactions(validated_data) if compact else validated_data, ""
+
+    except FileNotFoundError:
+        return None, f"File {filepath} not found."
+    except Exception as e:
+        return None, f"An error occurred: {e}"
+
+
+def read_transactions_csv(filepath_or_buffer, chunk_size: Optional[int] = None, **read_options):
+    """Reads a transactions CSV file with the same column types however it is split.
+
+    Args:
+        Path or buffer of the CSV file.
+        Number of rows to read at a time, the whole file at once if None.
+        Other read_csv options, such as header and names.
+
+    Returns:
+        DataFrame, or an iterator of DataFrames when chunk_size is set, whose Amount holds
+        numbers for the cells that are numbers and the text of the others.
+    """
+    if chunk_size is None:
+        return parse_csv_amounts(pandas.read_csv(filepath_or_buffer, dtype=CSV_COLUMN_TYPES, **read_options))
+    return map(parse_csv_amounts, pandas.read_csv(filepath_or_buffer, dtype=CSV_COLUMN_TYPES, chunksize=chunk_size, **read_options))
+
+
+def parse_csv_amounts(csv_data: pandas.DataFrame) -> pandas.DataFrame:
+    """Converts the Amount cells read as text to numbers, keeping the text of the cells that are not numbers."""
+    if 'Amount' not in csv_data.columns:
+        return csv_data
+    amounts = csv_data['Amount']
+    numbers = pandas.to_numeric(amounts, errors='coerce')
+    if numbers.notna().sum() == amounts.notna().sum():
+        csv_data['Amount'] = numbers
+    else:
+        csv_data['Amount'] = numbers.astype(object).where(numbers.notna(), amounts)
+    return csv_data
+
+
+def compact_transactions(data: pandas.DataFrame, date_format: Optional[str] = TRANSACTIONS_DATE_FORMAT) -> pandas.DataFrame:
+    """Converts validated transactions to compact column types.
+
+    Date becomes datetime64, Amount becomes int64 cents in an AmountCents column so sums
+    do not drift, and text columns such as Category become categoricals, so grouping runs
+    on integer codes. Other numeric columns are kept.
+
+    Args:
+        Validated DataFrame.
+        Format of the dates, inferred from the first date if None.
+
+    Returns:
+        DataFrame with the compact columns, in the same order.
+    """
+    compact_data = {}
+    for column in data.columns:
+        values = data[column]
+        if column == 'Date':
+            compact_data[column] = parse_transaction_dates(values, date_format)
+        elif column == 'Amount':
+            compact_data[AMOUNT_CENTS_COLUMN] = get_amount_cents(values)
+        elif pandas.api.types.is_numeric_dtype(values) or isinstance(values.dtype, pandas.CategoricalDtype):
+            compact_data[column] = values
+        else:
+            compact_data[column] = values.astype('category')
+
+    compact_data = pandas.DataFrame(compact_data, index=data.index)
+    logging.info(f"Compact transactions use {get_bytes_per_million_rows(compact_data) / 1024 / 1024:.1f} MiB per million rows.")
+    return compact_data
+
+
+def get_amount_cents(amounts: pandas.Series) -> numpy.ndarray:
+    """Rounds validated amounts to int64 cents, missing amounts add nothing, like in a sum."""
+    amounts = numpy.nan_to_num(pandas.to_numeric(amounts).to_numpy(dtype=float))
+    return numpy.rint(amounts * CENTS_PER_UNIT).astype(numpy.int64)
+
+
+def parse_transaction_dates(dates: pandas.Series, date_format: Optional[str] = None) -> pandas.Series:
+    """Parses dates with one format, and only the dates that do not match it one by one.
+
+    Args:
+        Dates as text or datetime64.
+        Format of the dates, inferred from the first date if None.
+
+    Returns:
+        datetime64 Series, NaT for missing dates.
+    """
+    if pandas.api.types.is_datetime64_any_dtype(dates):
+        return dates
+
+    if date_format is None:
+        first_dates = dates.dropna()
+        date_format = guess_datetime_format(str(first_dates.iloc[0])) if not first_dates.empty else None
+    if date_format is None:
+        return pandas.to_datetime(dates, errors='coerce', format='mixed')
+
+    parsed_dates = pandas.to_datetime(dates, errors='coerce', format=date_format)
+    unparsed = parsed_dates.isna() & dates.notna()
+    if unparsed.any():
+        parsed_dates[unparsed] = pandas.to_datetime(dates[unparsed], errors='coerce', format='mixed')
+    return parsed_dates
+
+
+def get_amounts(data: pandas.DataFrame) -> pandas.Series:
+    """Returns the amounts of transactions in currency units, from Amount or from compact AmountCents."""
+    if AMOUNT_CENTS_COLUMN in data.columns:
+        return (data[AMOUNT_CENTS_COLUMN] / CENTS_PER_UNIT).rename('Amount')
+    return data['Amount']
+
+
+def get_bytes_per_million_rows(data: pandas.DataFrame) -> float:
+    """Returns the memory of a DataFrame scaled to a million rows."""
+    if len(data) == 0:
+        return 0.0
+    return data.memory_usage(deep=True).sum() / len(data) * 1_000_000
+
+
+def is_transactions_directory(path: str) -> bool:
+    """Returns True if the path is a directory or a glob pattern of several transactions files."""
+    return os.path.isdir(path) or any(character in path for character in '*?[')
+
+
+def find_transactions_files(path: str) -> list:
+    """Returns the sorted CSV files of a directory, or the files matching a glob pattern."""
+    if os.path.isdir(path):
+        path = os.path.join(path, '*.csv')
+    return sorted(filepath for filepath in glob.glob(path) if os.path.isfile(filepath))
+
+
+def get_source_file_names(filepaths: list) -> list:
+    """Returns the paths of the files relative to the directory they are all in."""
+    root_directory = os.path.commonpath([os.path.dirname(os.path.abspath(filepath)) for filepath in filepaths])
+    return [os.path.relpath(os.path.abspath(filepath), root_directory) for filepath in filepaths]
+
+
+def load_transactions_files(path: str, use_cache: bool = False, max_workers: Optional[int] = TRANSACTIONS_LOADER_WORKERS,
+                            compact: bool = False) -> (Optional[pandas.DataFrame], dict):
+    """Loads and validates every transactions file of a directory or glob pattern in parallel.
+
+    Each file is parsed in its own worker process. A file that fails does not stop
+    the others, its error is returned instead.
+
+    Args:
+        Directory or glob pattern of CSV files.
+        Whether to reuse (and fill) the on-disk cache of validated transactions.
+        Number of worker processes, all the cores if None.
+        Whether to return the compact column types of compact_transactions.
+
+    Returns:
+        DataFrame of all the valid rows with a SourceFile column, None if there are none.
+        dict: error message by file name for the files that could not be loaded.
+        File names are relative to the directory all the files are in, so files of
+        different directories with the same name stay apart.
+    """
+    filepaths = find_transactions_files(path)
+    if not filepaths:
+        return None, {path: f"No transactions files found in {path}."}
+    file_names = get_source_file_names(filepaths)
+
+    frames = []
+    source_files = []
+    errors = {}
+    with ProcessPoolExecutor(max_workers=min(len(filepaths), max_workers or os.cpu_count() or 1)) as executor:
+        results = executor.map(load_transactions_file, filepaths, [use_cache] * len(filepaths), [compact] * len(filepaths))
+        for file_name, (validated_data, error_message) in zip(file_names, results):
+            if validated_data is None:
+                errors[file_name] = error_message
+                continue
+            frames.append(validated_data)
+            source_files.append(file_name)
+
+    for file_name, error_message in errors.items():
+        logging.error(f"Skipping {file_name}: {error_message}")
+
+    if not frames:
+        return None, errors
+
+    data = pandas.concat(frames, ignore_index=True)
+    if compact: # Files with different categories are concatenated as text
+        data['Category'] = data['Category'].astype('category')
+    file_codes = numpy.repeat(numpy.arange(len(frames)), [len(frame) for frame in frames])
+    data['SourceFile'] = pandas.Categorical.from_codes(file_codes, source_files)
+    return data, errors
+
+
+def stream_transactions_aggregates(filepath: str, chunk_size: int = TRANSACTIONS_CHUNK_SIZE,
+                                   transform: Optional[Callable[[pandas.DataFrame], Optional[pandas.DataFrame]]] = None) -> Optional[TransactionsAggregates]:
+    """Reads a CSV file in chunks, validates each chunk and sums it into the report totals.
+
+    Only one chunk and the per-category totals are kept in memory, so files bigger
+    than the available memory can be analyzed.
+
+    Args:
+        Path to the CSV file.
+        Number of rows to read at a time.
+        Optional function applied to every validated chunk before it is summed,
+        such as a currency conversion.
+
+    Returns:
+        TransactionsAggregates of all the valid rows, None if there are none
+        or if the function failed on a chunk and returned None.
     """
+    category_expenses = {}
+    total_income = 0
+    total_expenses = 0
+    valid_rows = 0
     try:
-        csv_data = pandas.read_csv(filepath)
-        validated_data = check_transactions_file(csv_data)
-        return validated_data
+        with measure_stage('stream_transactions') as stage:
+            for csv_chunk in read_transactions_csv(filepath, chunk_size):
+                validated_chunk = check_transactions_file(csv_chunk)
+                if validated_chunk is None:
+                    continue
+                if transform is not None:
+                    validated_chunk = transform(validated_chunk)
+                    if validated_chunk is None: # Totals without the rows of a chunk would look complete
+                        logging.error(f"Could not transform the rows {csv_chunk.index[0] + 1} to {csv_chunk.index[-1] + 1} of {filepath}.")
+                        return None
+
+                # Summed in whole cents, so the totals do not depend on the chunks and match compact transactions
+                amount_cents = pandas.Series(get_amount_cents(validated_chunk['Amount']), index=validated_chunk.index)
+                expense_cents = -amount_cents[amount_cents < 0]
+                for category, cents in expense_cents.groupby(validated_chunk['Category']).sum().items():
+                    category_expenses[category] = category_expenses.get(category, 0) + int(cents)
+
+                total_income += int(amount_cents[amount_cents > 0].sum())
+                total_expenses += int(expense_cents.sum())
+                valid_rows += len(validated_chunk)
+            stage.rows = valid_rows
 
     except FileNotFoundError:
         logging.error(f"File {filepath} not found.")
@@ -26,40 +311,77 @@ def load_transactions_data(filepath: str) -> Optional[pandas.DataFrame]:
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         return None
+
+    if valid_rows == 0:
+        return None
+
+    if category_expenses:
+        expenses_by_category = pandas.Series(category_expenses, name='Amount', dtype=float) / CENTS_PER_UNIT
+    else:
+        expenses_by_category = pandas.Series(dtype=float, name='Amount')
+    expenses_by_category.index.name = 'Category'
+    return TransactionsAggregates(expenses_by_category, total_income / CENTS_PER_UNIT, total_expenses / CENTS_PER_UNIT, valid_rows)
     
 
 def check_transactions_file(csv_data: pandas.DataFrame) -> Optional[pandas.DataFrame]:
     """Validates the transaction data from a CSV file.
 
+    Every column is validated at once: dates are parsed in a single pass and
+    amounts are checked with one boolean mask, so the cost no longer depends
+    on a Python loop over the rows.
+
     Args:
         DataFrame containing CSV data.
 
     Returns:
         DataFrame with valid rows or None if all data is invalid.
     """
-    valid_rows = []
     required_data_columns = {'Date', 'Category', 'Amount'}
-    
+
     # Check if required columns are present
     if not required_data_columns.issubset(csv_data.columns):
         logging.error("CSV file is missing required columns.")
         return None
-    
-    # Validate each row individually
-    for index, row in csv_data.iterrows():
-        # Validate date
-        try:
-            date = pandas.to_datetime(row['Date'], errors='raise')
-        except ValueError:
-            logging.error(f"Invalid date at row {index + 1}: {row['Date']}")
-            continue 
-        
-        # Validate amount 
-        amount = row['Amount']
-        if not isinstance(amount, (int, float)) or amount == 0:
-            logging.error(f"Invalid amount at row {index + 1}: {amount}")
-            continue 
-
-        valid_rows.append(row)
-
-    return pandas.DataFrame(valid_rows) if valid_rows else None
\ No newline at end of file
+
+    valid_dates = find_valid_dates(csv_data['Date'])
+    valid_amounts = find_valid_amounts(csv_data['Amount'])
+    log_invalid_rows(csv_data, valid_dates, valid_amounts)
+
+    valid_rows = valid_dates & valid_amounts
+    return csv_data[valid_rows] if valid_rows.any() else None
+
+
+def find_valid_dates(dates: pandas.Series) -> pandas.Series:
+    """Returns a boolean mask of the dates that can be parsed.
+
+    Missing dates are kept, like a single pandas.to_datetime call would keep them.
+    """
+    parsed_dates = pandas.to_datetime(dates, errors='coerce', format='mixed')
+    return parsed_dates.notna() | dates.isna()
+
+
+def find_valid_amounts(amounts: pandas.Series) -> pandas.Series:
+    """Returns a boolean mask of the amounts that are non zero numbers.
+
+    Text values are rejected even when they look like numbers, only real
+    int and float values are accepted.
+    """
+    numeric_amounts = pandas.to_numeric(amounts, errors='coerce')
+    if pandas.api.types.is_numeric_dtype(amounts):
+        is_number = pandas.Series(True, index=amounts.index)
+    elif amounts.dtype == object:
+        value_types = amounts.map(type)
+        is_number = (numeric_amounts.notna() & ~value_types.isin([str])) | value_types.isin([float])
+    else:
+        is_number = pandas.Series(False, index=amounts.index)
+
+    return is_number & (numeric_amounts != 0)
+
+
+def log_invalid_rows(csv_data: pandas.DataFrame, valid_dates: pandas.Series, valid_amounts: pandas.Series) -> None:
+    """Logs the row number and value of every rejected row."""
+    for index, date in csv_data.loc[~valid_dates, 'Date'].items():
+        logging.error(f"Invalid date at row {index + 1}: {date}")
+
+    for index, amount in csv_data.loc[valid_dates & ~valid_amounts, 'Amount'].items():
+        logging.error(f"Invalid amount at row {index + 1}: {amount}")
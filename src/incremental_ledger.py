@@ -0,0 +1,300 @@
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import pandas
+from contextlib import contextmanager
+from typing import Callable, Optional
+from src.config import configure_logging, INCREMENTAL_LEDGER_DIRECTORY, LEDGER_LOCK_TIMEOUT_SECONDS
+from src.data_loader import TransactionsAggregates, check_transactions_file, read_transactions_csv
+from src.instrumentation import measure_stage
+
+configure_logging() # Initialize logging
+
+LEDGER_FORMAT_VERSION = 1
+LEDGER_FILE_NAME = "transactions.csv"
+AGGREGATES_FILE_NAME = "aggregates.json"
+LOCK_FILE_NAME = ".lock" # Exists while a process updates the ledger
+LOCK_POLL_SECONDS = 0.05
+LEDGER_COLUMNS = ['Date', 'Category', 'Amount']
+UNKNOWN_MONTH = "unknown" # Month of the transactions kept without a date
+TAIL_HASH_BYTES = 4096 # Bytes before the read offset hashed to notice a file that was rewritten
+DRIFT_TOLERANCE = 0.01
+
+# The ledger keeps every validated transaction in an append-only CSV file, next to the
+# running totals the reports are built from. Only the bytes a source file gained since
+# the last update are read, so an update costs O(new rows) instead of O(history).
+# Every source file has a ledger of its own, in a subdirectory of the ledger root named
+# after a hash of its path, so the totals of one file never include another file's rows.
+# A lock file lets one process at a time update a ledger, so batch workers that read
+# the same file wait for each other instead of adding its new rows twice.
+
+
+def get_source_ledger_directory(filepath: str, ledger_root: str = INCREMENTAL_LEDGER_DIRECTORY) -> str:
+    """Returns the directory of the ledger of a source file, under the ledger root."""
+    source_hash = hashlib.sha256(os.path.abspath(filepath).encode()).hexdigest()[:16]
+    return os.path.join(ledger_root, source_hash)
+
+
+def list_ledger_directories(ledger_root: str = INCREMENTAL_LEDGER_DIRECTORY) -> list:
+    """Returns the ledger root if it is a ledger itself, otherwise the ledgers of the source files under it."""
+    if os.path.exists(os.path.join(ledger_root, AGGREGATES_FILE_NAME)):
+        return [ledger_root]
+    if not os.path.isdir(ledger_root):
+        return []
+    return sorted(entry.path for entry in os.scandir(ledger_root)
+                  if entry.is_dir() and os.path.exists(os.path.join(entry.path, AGGREGATES_FILE_NAME)))
+
+
+@contextmanager
+def lock_ledger(ledger_directory: str, timeout_seconds: float = LEDGER_LOCK_TIMEOUT_SECONDS):
+    """Holds the lock file of a ledger, waiting while another process holds it.
+
+    Raises:
+        TimeoutError: if the ledger is still locked after timeout_seconds.
+    """
+    os.makedirs(ledger_directory, exist_ok=True)
+    lock_path = os.path.join(ledger_directory, LOCK_FILE_NAME)
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        try:
+            lock_descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Ledger {ledger_directory} is locked by another update, remove {lock_path} if none is running.")
+            time.sleep(LOCK_POLL_SECONDS)
+
+    try:
+        os.write(lock_descriptor, str(os.getpid()).encode())
+        os.close(lock_descriptor)
+        yield
+    finally:
+        os.remove(lock_path)
+
+
+def get_empty_aggregates() -> dict:
+    return {
+        'version': LEDGER_FORMAT_VERSION,
+        'expenses_by_category': {},
+        'months': {},
+        'valid_rows': 0,
+        'sources': {},
+    }
+
+
+def load_ledger_aggregates(ledger_directory: str = INCREMENTAL_LEDGER_DIRECTORY) -> dict:
+    """Reads the running totals of a ledger, empty totals if the ledger does not exist yet."""
+    aggregates_path = os.path.join(ledger_directory, AGGREGATES_FILE_NAME)
+    if not os.path.exists(aggregates_path):
+        return get_empty_aggregates()
+
+    with open(aggregates_path) as aggregates_file:
+        aggregates = json.load(aggregates_file)
+    if aggregates.get('version') != LEDGER_FORMAT_VERSION:
+        raise ValueError(f"Ledger {ledger_directory} was written by another version, rebuild it.")
+    return aggregates
+
+
+def save_ledger_aggregates(aggregates: dict, ledger_directory: str = INCREMENTAL_LEDGER_DIRECTORY) -> None:
+    """Writes the running totals to a temporary file and renames it into place."""
+    os.makedirs(ledger_directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=ledger_directory)
+    with os.fdopen(file_descriptor, 'w') as aggregates_file:
+        json.dump(aggregates, aggregates_file)
+    os.replace(temporary_path, os.path.join(ledger_directory, AGGREGATES_FILE_NAME))
+
+
+def calculate_ledger_aggregates(data: pandas.DataFrame) -> dict:
+    """Sums validated transactions into expenses by category and income and expenses by month.
+
+    Args:
+        data as pandas.DataFrame with Date, Category and Amount columns
+
+    Returns:
+        dict: expenses_by_category, months and valid_rows, like the running totals.
+    """
+    amounts = pandas.to_numeric(data['Amount'])
+    expenses = amounts.where(amounts < 0, 0).abs()
+    income = amounts.where(amounts > 0, 0)
+    months = pandas.to_datetime(data['Date'], errors='coerce', format='mixed').dt.strftime('%Y-%m').fillna(UNKNOWN_MONTH)
+
+    expenses_by_category = expenses[amounts < 0].groupby(data.loc[amounts < 0, 'Category'].astype(str)).sum()
+    monthly_totals = pandas.DataFrame({'income': income, 'expenses': expenses}).groupby(months.to_numpy()).sum()
+    return {
+        'expenses_by_category': {category: float(amount) for category, amount in expenses_by_category.items()},
+        'months': {month: {'income': float(row['income']), 'expenses': float(row['expenses'])} for month, row in monthly_totals.iterrows()},
+        'valid_rows': len(data),
+    }
+
+
+def merge_ledger_aggregates(aggregates: dict, new_aggregates: dict) -> None:
+    """Adds the totals of new transactions to the running totals."""
+    for category, amount in new_aggregates['expenses_by_category'].items():
+        aggregates['expenses_by_category'][category] = aggregates['expenses_by_category'].get(category, 0) + amount
+    for month, totals in new_aggregates['months'].items():
+        month_totals = aggregates['months'].setdefault(month, {'income': 0, 'expenses': 0})
+        month_totals['income'] += totals['income']
+        month_totals['expenses'] += totals['expenses']
+    aggregates['valid_rows'] += new_aggregates['valid_rows']
+
+
+def hash_bytes_before(source_file, offset: int) -> str:
+    """Hashes the last TAIL_HASH_BYTES bytes of a file before an offset."""
+    start = max(0, offset - TAIL_HASH_BYTES)
+    source_file.seek(start)
+    return hashlib.sha256(source_file.read(offset - start)).hexdigest()
+
+
+def read_new_rows(filepath: str, source: Optional[dict]) -> (Optional[pandas.DataFrame], dict):
+    """Reads the complete rows a CSV file gained since it was last read.
+
+    A last line without its newline is left for the next update, in case it is still being written.
+
+    Args:
+        filepath (str): path to the CSV file.
+        source (dict): what was read of the file before, None for a file never read.
+
+    Returns:
+        DataFrame of the new rows, None if there are none.
+        dict: what was read of the file, to pass to the next update.
+    """
+    offset = source['offset'] if source else 0
+    with open(filepath, 'rb') as source_file:
+        file_size = os.fstat(source_file.fileno()).st_size
+        if source and (file_size < offset or hash_bytes_before(source_file, offset) != source['tail_hash']):
+            raise ValueError(f"{filepath} changed before the rows already in the ledger, rebuild the ledger.")
+
+        source_file.seek(offset)
+        new_bytes = source_file.read(file_size - offset)
+
+    new_bytes = new_bytes[:new_bytes.rfind(b'\n') + 1]
+    new_offset = offset + len(new_bytes)
+    with open(filepath, 'rb') as source_file:
+        tail_hash = hash_bytes_before(source_file, new_offset)
+
+    if offset > 0:
+        columns = source['columns']
+        new_rows = read_transactions_csv(io.BytesIO(new_bytes), header=None, names=columns) if new_bytes.strip() else None
+    else:
+        new_rows = read_transactions_csv(io.BytesIO(new_bytes)) if new_bytes.strip() else None
+        columns = [] if new_rows is None else list(new_rows.columns)
+
+    if new_rows is not None and new_rows.empty:
+        new_rows = None
+    return new_rows, {'offset': new_offset, 'tail_hash': tail_hash, 'columns': columns}
+
+
+def update_ledger(filepath: str, ledger_directory: str = INCREMENTAL_LEDGER_DIRECTORY,
+                  transform: Optional[Callable[[pandas.DataFrame], Optional[pandas.DataFrame]]] = None,
+                  lock_timeout_seconds: float = LEDGER_LOCK_TIMEOUT_SECONDS) -> Optional[TransactionsAggregates]:
+    """Appends the rows a transactions file gained since the last update to the ledger and updates its totals.
+
+    Args:
+        filepath (str): path to the CSV file.
+        ledger_directory (str): directory of the ledger.
+        transform: optional function applied to the validated new rows before they are added,
+                   such as a currency conversion.
+        lock_timeout_seconds (float): longest wait for another process updating the same ledger.
+
+    Returns:
+        TransactionsAggregates of every transaction in the ledger, None if there are none or the update failed.
+    """
+    try:
+        with lock_ledger(ledger_directory, lock_timeout_seconds):
+            aggregates = load_ledger_aggregates(ledger_directory)
+            source_key = os.path.abspath(filepath)
+            with measure_stage('read_new_rows') as stage:
+                new_rows, source = read_new_rows(filepath, aggregates['sources'].get(source_key))
+                stage.rows = 0 if new_rows is None else len(new_rows)
+
+            validated_rows = check_transactions_file(new_rows) if new_rows is not None else None
+            if validated_rows is not None and transform is not None:
+                validated_rows = transform(validated_rows)
+                if validated_rows is None: # Keep the read offset, so the rows are added by the next update
+                    raise ValueError(f"The new rows of {filepath} could not be prepared for the ledger.")
+
+            if validated_rows is not None:
+                with measure_stage('update_ledger', rows=len(validated_rows)):
+                    validated_rows = validated_rows[LEDGER_COLUMNS]
+                    ledger_path = os.path.join(ledger_directory, LEDGER_FILE_NAME)
+                    validated_rows.to_csv(ledger_path, mode='a', header=not os.path.exists(ledger_path), index=False)
+                    merge_ledger_aggregates(aggregates, calculate_ledger_aggregates(validated_rows))
+
+            aggregates['sources'][source_key] = source
+            save_ledger_aggregates(aggregates, ledger_directory)
+            return get_transactions_aggregates(aggregates)
+
+    except FileNotFoundError:
+        logging.error(f"File {filepath} not found.")
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+    return None
+
+
+def get_transactions_aggregates(aggregates: dict) -> Optional[TransactionsAggregates]:
+    """Turns the running totals into the TransactionsAggregates the reports are built from."""
+    if aggregates['valid_rows'] == 0:
+        return None
+
+    expenses_by_category = pandas.Series(aggregates['expenses_by_category'], name='Amount', dtype=float)
+    expenses_by_category.index.name = 'Category'
+    total_income = sum(month['income'] for month in aggregates['months'].values())
+    total_expenses = sum(month['expenses'] for month in aggregates['months'].values())
+    return TransactionsAggregates(expenses_by_category, total_income, total_expenses, aggregates['valid_rows'])
+
+
+def verify_ledger(ledger_directory: str = INCREMENTAL_LEDGER_DIRECTORY, tolerance: float = DRIFT_TOLERANCE) -> list:
+    """Recomputes the totals from every transaction of the ledger and compares them with the running totals.
+
+    Args:
+        ledger_directory (str): directory of the ledger.
+        tolerance (float): largest difference of an amount that is not reported.
+
+    Returns:
+        list of str: one message for every total that drifted, empty if the ledger is consistent.
+    """
+    aggregates = load_ledger_aggregates(ledger_directory)
+    ledger_path = os.path.join(ledger_directory, LEDGER_FILE_NAME)
+    if os.path.exists(ledger_path):
+        recomputed = calculate_ledger_aggregates(pandas.read_csv(ledger_path))
+    else:
+        recomputed = get_empty_aggregates()
+
+    differences = []
+    if aggregates['valid_rows'] != recomputed['valid_rows']:
+        differences.append(f"Rows: {aggregates['valid_rows']} in the totals, {recomputed['valid_rows']} in the ledger.")
+
+    for category in sorted(set(aggregates['expenses_by_category']) | set(recomputed['expenses_by_category'])):
+        running = aggregates['expenses_by_category'].get(category, 0)
+        expected = recomputed['expenses_by_category'].get(category, 0)
+        if not math.isclose(running, expected, abs_tol=tolerance):
+            differences.append(f"{category} expenses: {running:.2f} in the totals, {expected:.2f} in the ledger.")
+
+    for month in sorted(set(aggregates['months']) | set(recomputed['months'])):
+        for total in ('income', 'expenses'):
+            running = aggregates['months'].get(month, {}).get(total, 0)
+            expected = recomputed['months'].get(month, {}).get(total, 0)
+            if not math.isclose(running, expected, abs_tol=tolerance):
+                differences.append(f"{month} {total}: {running:.2f} in the totals, {expected:.2f} in the ledger.")
+
+    for message in differences:
+        logging.error(f"Ledger drift: {message}")
+    return differences
+
+
+def rebuild_ledger_aggregates(ledger_directory: str = INCREMENTAL_LEDGER_DIRECTORY) -> None:
+    """Replaces the running totals with totals recomputed from every transaction of the ledger.
+
+    The read offsets of the source files are kept, so the next update still reads only new rows.
+    """
+    with lock_ledger(ledger_directory):
+        aggregates = load_ledger_aggregates(ledger_directory)
+        ledger_path = os.path.join(ledger_directory, LEDGER_FILE_NAME)
+        recomputed = calculate_ledger_aggregates(pandas.read_csv(ledger_path)) if os.path.exists(ledger_path) else get_empty_aggregates()
+        aggregates.update({key: recomputed[key] for key in ('expenses_by_category', 'months', 'valid_rows')})
+        save_ledger_aggregates(aggregates, ledger_directory)
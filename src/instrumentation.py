@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Optional
+from src.config import (
+    configure_logging,
+    INSTRUMENTATION_ENABLED,
+    INSTRUMENTATION_EXPORT_FORMAT,
+    INSTRUMENTATION_EXPORT_PATH,
+    INSTRUMENTATION_TRACE_MEMORY,
+)
+
+configure_logging() # Initialize logging
+
+METRICS_PREFIX = "smart_financial_stage"
+
+# Stages are recorded in the process that runs them, so the stages of files loaded
+# by worker processes are not recorded. tracemalloc counts the allocations of every
+# thread, so the peak of a stage that runs next to another thread includes its allocations.
+
+stage_records = []
+stage_records_lock = threading.Lock()
+active_stages = threading.local() # Stack of the stages running in each thread
+memory_tracing = {'stages': 0, 'started': False} # Traced stages running in any thread, and whether they started tracemalloc
+memory_tracing_lock = threading.Lock()
+
+
+class StageTimer:
+    """Measures one run of a stage, use it through measure_stage."""
+
+    def __init__(self, stage: str, rows: Optional[int], trace_memory: bool):
+        self.stage = stage
+        self.rows = rows
+        self.trace_memory = trace_memory
+        self.peak_bytes = None
+
+    def __enter__(self):
+        stack = getattr(active_stages, 'stack', None)
+        if stack is None:
+            stack = active_stages.stack = []
+
+        if self.trace_memory:
+            start_memory_tracing()
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            if stack and stack[-1].trace_memory: # Keep the peak of the stage around this one before it is reset
+                stack[-1].peak_bytes = max(stack[-1].peak_bytes, peak_bytes - stack[-1].start_bytes)
+            self.start_bytes = current_bytes
+            self.peak_bytes = 0
+            tracemalloc.reset_peak()
+
+        stack.append(self)
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_seconds = time.perf_counter() - self.start_wall
+        cpu_seconds = time.process_time() - self.start_cpu
+        stack = active_stages.stack
+        stack.pop()
+
+        if self.trace_memory:
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            self.peak_bytes = max(self.peak_bytes, peak_bytes - self.start_bytes)
+            if stack and stack[-1].trace_memory: # The peak was reset by this stage, pass it on to the stage around it
+                stack[-1].peak_bytes = max(stack[-1].peak_bytes, peak_bytes - stack[-1].start_bytes)
+            stop_memory_tracing()
+
+        record = {
+            'stage': self.stage,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            'peak_bytes': self.peak_bytes,
+            'rows': self.rows,
+            'rows_per_second': self.rows / wall_seconds if self.rows is not None and wall_seconds > 0 else None,
+            'failed': exc_type is not None,
+        }
+        with stage_records_lock:
+            stage_records.append(record)
+        return False
+
+
+def start_memory_tracing() -> None:
+    """Starts tracemalloc for a traced stage, unless it is already tracing."""
+    with memory_tracing_lock:
+        if memory_tracing['stages'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            memory_tracing['started'] = True
+        memory_tracing['stages'] += 1
+
+
+def stop_memory_tracing() -> None:
+    """Stops tracemalloc when the last traced stage ends, if the stages started it.
+
+    Tracing slows down every allocation, so it must not outlive the stages it measures.
+    """
+    with memory_tracing_lock:
+        memory_tracing['stages'] -= 1
+        if memory_tracing['stages'] == 0 and memory_tracing['started']:
+            tracemalloc.stop()
+            memory_tracing['started'] = False
+
+
+class DisabledStageTimer:
+    """Stands in for StageTimer when instrumentation is off, so a stage costs one function call."""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass # Rows set by the stage are not kept
+
+
+DISABLED_STAGE_TIMER = DisabledStageTimer()
+
+
+def measure_stage(stage: str, rows: Optional[int] = None, enabled: Optional[bool] = None,
+                  trace_memory: Optional[bool] = None):
+    """Returns a context manager that records the wall time, CPU time and peak memory of a stage.
+
+    Rows that are only known at the end of the stage can be set on the returned timer:
+
+        with measure_stage('validate') as stage:
+            validated_data = check_transactions_file(csv_data)
+            stage.rows = len(csv_data)
+
+    Args:
+        stage (str): name of the stage.
+        rows (int): rows processed by the stage, used for the rows per second.
+        enabled (bool): record the stage, INSTRUMENTATION_ENABLED if None.
+        trace_memory (bool): record the peak allocated memory with tracemalloc, INSTRUMENTATION_TRACE_MEMORY if None.
+    """
+    if not (INSTRUMENTATION_ENABLED if enabled is None else enabled):
+        return DISABLED_STAGE_TIMER
+    return StageTimer(stage, rows, INSTRUMENTATION_TRACE_MEMORY if trace_memory is None else trace_memory)
+
+
+def get_stage_records() -> list:
+    """Returns the stages recorded since the start or the last reset, oldest first."""
+    with stage_records_lock:
+        return [dict(record) for record in stage_records]
+
+
+def reset_stage_records() -> None:
+    """Forgets the recorded stages."""
+    with stage_records_lock:
+        stage_records.clear()
+
+
+def format_json_lines(records: list) -> str:
+    """Formats stage records as one JSON object per line."""
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def format_prometheus(records: list) -> str:
+    """Formats stage records in the Prometheus text exposition format, summed by stage.
+
+    Times and rows are counters summed over the runs of a stage, and the peak memory
+    is the biggest peak of any run.
+    """
+    totals = {}
+    for record in records:
+        stage_totals = totals.setdefault(record['stage'], {'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': 0, 'peak_bytes': None})
+        stage_totals['runs'] += 1
+        stage_totals['wall_seconds'] += record['wall_seconds']
+        stage_totals['cpu_seconds'] += record['cpu_seconds']
+        stage_totals['rows'] += record['rows'] or 0
+        if record['peak_bytes'] is not None:
+            stage_totals['peak_bytes'] = max(stage_totals['peak_bytes'] or 0, record['peak_bytes'])
+
+    metrics = [
+        ('runs_total', 'counter', "Number of times the stage ran.", 'runs'),
+        ('wall_seconds_total', 'counter', "Wall time spent in the stage.", 'wall_seconds'),
+        ('cpu_seconds_total', 'counter', "CPU time of the process spent in the stage.", 'cpu_seconds'),
+        ('rows_total', 'counter', "Rows processed by the stage.", 'rows'),
+        ('peak_bytes', 'gauge', "Biggest peak of memory allocated by the stage.", 'peak_bytes'),
+    ]
+    lines = []
+    for metric_name, metric_type, description, key in metrics:
+        name = f"{METRICS_PREFIX}_{metric_name}"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for stage, stage_totals in totals.items():
+            if stage_totals[key] is not None:
+                lines.append(f'{name}{{stage="{stage}"}} {stage_totals[key]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def export_stage_records(path: Optional[str] = INSTRUMENTATION_EXPORT_PATH, export_format: str = INSTRUMENTATION_EXPORT_FORMAT,
+                         reset: bool = True) -> bool:
+    """Writes the recorded stages to a file.
+
+    JSON lines are appended, so every run adds its stages to the file. The Prometheus
+    format replaces the file, for a textfile collector to pick up.
+
+    Args:
+        path (str): file the stages are written to, nothing is written if None.
+        export_format (str): 'jsonl' or 'prometheus'.
+        reset (bool): forget the stages once they are written.
+
+    Returns:
+        bool: True if the file was written.
+    """
+    records = get_stage_records()
+    if path is None or not records:
+        return False
+
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if export_format == 'prometheus':
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'w') as metrics_file:
+                metrics_file.write(format_prometheus(records))
+            os.replace(temporary_path, path)
+        elif export_format == 'jsonl':
+            with open(path, 'a') as metrics_file:
+                metrics_file.write(format_json_lines(records))
+        else:
+            raise ValueError(f"Unknown instrumentation export format {export_format}.")
+
+    except Exception as e:
+        logging.error(f"Could not export the stage timings: {e}")
+        return False
+
+    if reset:
+        reset_stage_records()
+    return True
@@ -0,0 +1,100 @@
+import logging
+import numpy
+import pandas
+from typing import Optional, Union
+from src.budget_rules import BudgetRules, calculate_target_reductions, get_rule_values, load_budget_rules
+from src.config import configure_logging
+from src.data_loader import get_amounts
+from src.saving_recommendations import calculate_tiered_reduction_matrix
+
+configure_logging() # Initialize logging
+
+USER_ID_COLUMN = 'UserId'
+
+
+def calculate_user_category_expenses(data: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Sums the expenses of every user in every category with a single pivot.
+
+    Parameters:
+    - data (pandas.DataFrame): validated transactions with a UserId column, and Amount or compact AmountCents.
+
+    Returns:
+    - pandas.DataFrame: users x categories matrix of expense amounts.
+    """
+    amounts = get_amounts(data)
+    expense_data = pandas.DataFrame({
+        USER_ID_COLUMN: data[USER_ID_COLUMN],
+        'Category': data['Category'],
+        'Amount': amounts.abs(),
+    })[amounts < 0]
+    return pandas.pivot_table(
+        expense_data,
+        index=USER_ID_COLUMN, columns='Category', values='Amount',
+        aggfunc='sum', fill_value=0, observed=True
+    )
+
+
+def analyze_users(data: pandas.DataFrame, savings_goals: Union[float, pandas.Series] = 0,
+                  rules: Optional[BudgetRules] = None) -> Optional[pandas.DataFrame]:
+    """
+    Runs the category analysis and savings recommendations for every user of a combined ledger.
+
+    Expenses, income, the desired average check and the savings reductions are all computed
+    for all the users together, without running the single user pipeline once per user.
+
+    Parameters:
+    - data (pandas.DataFrame): validated transactions with a UserId column, and Amount or compact AmountCents.
+    - savings_goals (float or pandas.Series): savings goal of every user, or a Series of goals by user id.
+    - rules (BudgetRules): the budget rules, the rules of BUDGET_RULES_PATH if None.
+
+    Returns:
+    - pandas.DataFrame: one row per user and category with the columns UserId, Category, Amount,
+      Income, CurrentPercentage, DesiredPercentage, GeneralReduction, SavingsReduction and RemainingGoal.
+      None if the data has no UserId column.
+    """
+    try:
+        if USER_ID_COLUMN not in data.columns:
+            logging.error(f"Transactions data has no {USER_ID_COLUMN} column.")
+            return None
+
+        rules = load_budget_rules() if rules is None else rules
+        category_expenses = calculate_user_category_expenses(data)
+        users = pandas.Index(data[USER_ID_COLUMN].unique(), name=USER_ID_COLUMN).sort_values()
+        category_expenses = category_expenses.reindex(users, fill_value=0)
+        transaction_amounts = get_amounts(data)
+        income = transaction_amounts[transaction_amounts > 0].groupby(data[USER_ID_COLUMN], observed=True).sum().reindex(users, fill_value=0)
+        income = income.to_numpy(dtype=float)
+        amounts = category_expenses.to_numpy(dtype=float)
+
+        # General recommendations: the share of income of every category against its desired average
+        desired_percentages = get_rule_values(rules, rules.target_percentages, category_expenses.columns)
+        current_percentages, _, general_reductions = calculate_target_reductions(amounts, income, desired_percentages)
+
+        # Savings reductions: the goal minus the net income, solved for all the users at once
+        if isinstance(savings_goals, pandas.Series):
+            goals = savings_goals.reindex(users, fill_value=0).to_numpy(dtype=float)
+        else:
+            goals = numpy.full(len(users), savings_goals, dtype=float)
+        savings_gaps = goals - (income - amounts.sum(axis=1))
+        reduction_amounts = category_expenses.reindex(columns=rules.categories, fill_value=0).to_numpy(dtype=float)
+        reduction_percentages, remaining_goals = calculate_tiered_reduction_matrix(reduction_amounts, numpy.maximum(savings_gaps, 0), rules)
+        savings_reductions = pandas.DataFrame(reduction_percentages, index=users, columns=rules.categories)
+        savings_reductions = savings_reductions.reindex(columns=category_expenses.columns, fill_value=0)
+
+        categories_count = len(category_expenses.columns)
+        return pandas.DataFrame({
+            USER_ID_COLUMN: numpy.repeat(users.to_numpy(), categories_count),
+            'Category': numpy.tile(category_expenses.columns.to_numpy(), len(users)),
+            'Amount': amounts.ravel(),
+            'Income': numpy.repeat(income, categories_count),
+            'CurrentPercentage': current_percentages.ravel(),
+            'DesiredPercentage': numpy.tile(desired_percentages, len(users)),
+            'GeneralReduction': general_reductions.ravel(),
+            'SavingsReduction': savings_reductions.to_numpy().ravel(),
+            'RemainingGoal': numpy.repeat(numpy.where(savings_gaps > 0, remaining_goals, 0), categories_count),
+        })
+
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+        return None
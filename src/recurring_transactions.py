@@ -0,0 +1,186 @@
+import numpy
+import pandas
+from typing import Optional
+from src.budget_rules import BudgetRules, get_rule_values, load_budget_rules
+from src.config import (
+    configure_logging,
+    RECURRING_AMOUNT_ROUNDING,
+    RECURRING_MIN_OCCURRENCES,
+    RECURRING_MIN_REGULARITY,
+)
+from src.data_loader import get_amounts, parse_transaction_dates
+from src.instrumentation import measure_stage
+
+configure_logging() # Initialize logging
+
+DESCRIPTION_COLUMN = 'Description'
+RECURRING_CATEGORY = 'Recurring' # Candidate cut of the recurring charges in calculate_savings_reductions
+RECURRING_COLUMNS = ['Category', 'Description', 'Cadence', 'Amount', 'Occurrences', 'Total', 'MonthlyAmount', 'FirstDate', 'LastDate']
+
+# Days between two charges of each cadence, and how many charges it makes in a month
+CADENCES = {
+    'weekly': (6, 8, 52 / 12),
+    'monthly': (27, 34, 1),
+    'yearly': (360, 370, 1 / 12),
+}
+
+# Expenses with the same category, description and rounded amount are one series of charges.
+# Every row gets a 64 bit hash of that key, and one sort by hash and date puts every series
+# in date order, so the days between charges are differences of neighbouring rows. No
+# transaction is ever compared with all the others.
+
+
+def find_recurring_transactions(data: pandas.DataFrame, amount_rounding: float = RECURRING_AMOUNT_ROUNDING,
+                                min_occurrences: int = RECURRING_MIN_OCCURRENCES,
+                                min_regularity: float = RECURRING_MIN_REGULARITY) -> pandas.DataFrame:
+    """Finds the expenses that are charged again and again at a weekly, monthly or yearly cadence.
+
+    Args:
+        data as validated pandas.DataFrame with Date, Category and Amount or AmountCents columns,
+        and an optional Description column
+        amount_rounding as the step amounts are rounded to before they are grouped, so a charge
+        that changes by a few cents is still the same charge
+        min_occurrences as the fewest charges of a recurring series
+        min_regularity as the smallest share of the gaps between charges that must match the cadence
+
+    Returns:
+        pandas.DataFrame with one row per recurring series and the columns Category, Description,
+        Cadence, Amount (the average charge), Occurrences, Total, MonthlyAmount, FirstDate and LastDate,
+        biggest MonthlyAmount first.
+    """
+    with measure_stage('find_recurring', rows=len(data)):
+        amounts = get_amounts(data).to_numpy(dtype=float)
+        days = parse_transaction_dates(data['Date']).to_numpy(dtype='datetime64[D]')
+        expenses = (amounts < 0) & ~numpy.isnat(days) & data['Category'].notna().to_numpy()
+        expense_rows = numpy.flatnonzero(expenses)
+        if len(expense_rows) == 0:
+            return pandas.DataFrame(columns=RECURRING_COLUMNS)
+
+        charges = -amounts[expense_rows]
+        days = days[expense_rows].astype(numpy.int64)
+        key_columns = {
+            'Category': data['Category'].iloc[expense_rows].to_numpy(),
+            'RoundedAmount': numpy.rint(charges / amount_rounding).astype(numpy.int64),
+        }
+        if DESCRIPTION_COLUMN in data.columns:
+            key_columns[DESCRIPTION_COLUMN] = data[DESCRIPTION_COLUMN].iloc[expense_rows].to_numpy()
+        key_hashes = pandas.util.hash_pandas_object(pandas.DataFrame(key_columns), index=False).to_numpy()
+
+        order = numpy.lexsort((days, key_hashes))
+        key_hashes, days, charges, expense_rows = key_hashes[order], days[order], charges[order], expense_rows[order]
+
+        # Series boundaries, and the cadence every gap between neighbouring charges of a series matches
+        new_series = numpy.concatenate([[True], key_hashes[1:] != key_hashes[:-1]])
+        series_starts = numpy.flatnonzero(new_series)
+        series_ids = numpy.cumsum(new_series) - 1
+        occurrences = numpy.diff(numpy.append(series_starts, len(key_hashes)))
+        gaps = numpy.diff(days)
+        in_series = ~new_series[1:]
+        gap_cadences = numpy.zeros(len(gaps), dtype=numpy.int64)
+        for cadence_code, (min_days, max_days, _) in enumerate(CADENCES.values(), start=1):
+            gap_cadences[(gaps >= min_days) & (gaps <= max_days)] = cadence_code
+        cadence_counts = numpy.bincount(
+            series_ids[1:][in_series] * (len(CADENCES) + 1) + gap_cadences[in_series],
+            minlength=len(series_starts) * (len(CADENCES) + 1)
+        ).reshape(len(series_starts), len(CADENCES) + 1)[:, 1:]
+
+        cadence_codes = cadence_counts.argmax(axis=1)
+        matching_gaps = cadence_counts.max(axis=1)
+        recurring = (occurrences >= min_occurrences) & (matching_gaps >= min_occurrences - 1) & \
+                    (matching_gaps >= min_regularity * (occurrences - 1))
+
+        totals = numpy.add.reduceat(charges, series_starts)
+        cadence_names = numpy.array(list(CADENCES))
+        charges_per_month = numpy.array([per_month for _, _, per_month in CADENCES.values()])
+        first_rows = expense_rows[series_starts]
+        descriptions = data[DESCRIPTION_COLUMN].iloc[first_rows].astype(object).fillna("").astype(str).to_numpy() \
+            if DESCRIPTION_COLUMN in data.columns else numpy.full(len(series_starts), "")
+        series = pandas.DataFrame({
+            'Category': data['Category'].iloc[first_rows].astype(str).to_numpy(),
+            'Description': descriptions,
+            'Cadence': cadence_names[cadence_codes],
+            'Amount': totals / occurrences,
+            'Occurrences': occurrences,
+            'Total': totals,
+            'MonthlyAmount': totals / occurrences * charges_per_month[cadence_codes],
+            'FirstDate': days[series_starts].astype('datetime64[D]'),
+            'LastDate': days[series_starts + occurrences - 1].astype('datetime64[D]'),
+        })[recurring]
+        return series.sort_values('MonthlyAmount', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def find_candidate_charges(recurring_transactions: pandas.DataFrame, rules: BudgetRules) -> pandas.DataFrame:
+    """Returns the recurring charges of the categories in the first tier of the rules or without a rule."""
+    first_tier = rules.tiers.min(initial=1)
+    category_tiers = get_rule_values(rules, rules.tiers, recurring_transactions['Category'], fill_value=first_tier)
+    return recurring_transactions[category_tiers <= first_tier]
+
+
+def has_recurring_category(expenses_dataframe: pandas.Series, rules: BudgetRules) -> bool:
+    """Returns True if the expenses or the rules already have a Recurring category of their own."""
+    return RECURRING_CATEGORY in expenses_dataframe.index or RECURRING_CATEGORY in rules.categories
+
+
+def get_recurring_candidates(expenses_dataframe: pandas.Series, recurring_transactions: pandas.DataFrame,
+                             rules: BudgetRules) -> (pandas.Series, BudgetRules):
+    """Moves the recurring charges that may be cut out of their categories into a Recurring category.
+
+    The charges find_candidate_charges returns are moved; the charges of later tiers, such as rent,
+    stay in their category. Recurring gets a rule
+    without a target in the first tier, before its other categories. Nothing is moved if
+    the expenses or the rules already have a Recurring category of their own.
+
+    Returns:
+        pandas.Series of the expenses with the Recurring category.
+        BudgetRules with the rule of the Recurring category.
+    """
+    if has_recurring_category(expenses_dataframe, rules):
+        return expenses_dataframe, rules
+
+    candidates = find_candidate_charges(recurring_transactions, rules)
+    if candidates.empty:
+        return expenses_dataframe, rules
+
+    moved_totals = candidates.groupby('Category')['Total'].sum()
+    expenses_dataframe = expenses_dataframe.sub(moved_totals, fill_value=0).clip(lower=0).reindex(expenses_dataframe.index)
+    expenses_dataframe[RECURRING_CATEGORY] = moved_totals.sum()
+
+    rules = BudgetRules(
+        categories=rules.categories.insert(0, RECURRING_CATEGORY),
+        target_percentages=numpy.insert(rules.target_percentages, 0, numpy.nan),
+        tiers=numpy.insert(rules.tiers, 0, rules.tiers.min(initial=1)),
+        floor_percentages=numpy.insert(rules.floor_percentages, 0, 0),
+    )
+    return expenses_dataframe, rules
+
+
+def describe_recurring_charges(recurring_transactions: pandas.DataFrame, max_charges: int = 3) -> str:
+    """Names the biggest recurring charges, such as "Streaming (monthly, 15.99)"."""
+    return ", ".join(
+        f"{description or category} ({cadence}, {amount:.2f})"
+        for category, description, cadence, amount in
+        recurring_transactions[['Category', 'Description', 'Cadence', 'Amount']].head(max_charges).itertuples(index=False)
+    )
+
+
+def spread_recurring_reductions(expenses_dataframe: pandas.Series, recurring_transactions: pandas.DataFrame, reductions: dict,
+                                rules: Optional[BudgetRules] = None) -> dict:
+    """Turns the cut of the Recurring category back into reductions of the categories its charges came from.
+
+    Args:
+        expenses_dataframe as pandas.Series of the expenses by category, without the Recurring category
+        recurring_transactions as pandas.DataFrame, such as find_recurring_transactions returns
+        reductions as dict of reduction percentages by category, such as calculate_savings_reductions returns
+        rules as BudgetRules, the rules of BUDGET_RULES_PATH if None
+
+    Returns:
+        dict of reduction percentages of the categories of expenses_dataframe, such as forecast_savings takes.
+    """
+    rules = load_budget_rules() if rules is None else rules
+    candidate_expenses, _ = get_recurring_candidates(expenses_dataframe, recurring_transactions, rules)
+    remaining_expenses = candidate_expenses.reindex(expenses_dataframe.index)
+    moved_expenses = expenses_dataframe - remaining_expenses
+    percentages = pandas.Series(reductions, dtype=float).reindex(expenses_dataframe.index, fill_value=0)
+    saved_expenses = percentages * remaining_expenses + reductions.get(RECURRING_CATEGORY, 0) * moved_expenses
+    spread = (saved_expenses / expenses_dataframe.where(expenses_dataframe > 0)).fillna(0)
+    return {category: percentage for category, percentage in spread.items() if percentage > 0}
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import pandas
+from src.config import configure_logging, REPORTS_CACHE_DIRECTORY, REPORTS_CACHE_MAX_BYTES, USE_REPORTS_CACHE
+
+configure_logging() # Initialize logging
+
+REPORTS_CACHE_VERSION = 2 # Change when the look of a report changes, so the cached PDFs are rendered again
+
+cache_stats = {'hits': 0, 'misses': 0}
+cache_stats_lock = threading.Lock() # Callers may create reports from several threads
+
+
+def hash_report_inputs(report_name: str, *inputs) -> str:
+    """Builds the content hash of a report from everything it is rendered from.
+
+    Args:
+        report_name (str): name of the report, so different reports never share a hash.
+        inputs: pandas Series and DataFrames, lists, dicts, numbers, strings or None.
+
+    Returns:
+        str: hex digest of the report inputs.
+    """
+    report_hash = hashlib.sha256(f"{report_name}|{REPORTS_CACHE_VERSION}".encode())
+    for report_input in inputs:
+        if isinstance(report_input, (pandas.Series, pandas.DataFrame)):
+            columns = report_input.name if isinstance(report_input, pandas.Series) else list(report_input.columns)
+            report_hash.update(json.dumps([type(report_input).__name__, columns], default=str).encode())
+            report_hash.update(pandas.util.hash_pandas_object(report_input, index=True).to_numpy().tobytes())
+        else:
+            report_hash.update(json.dumps(report_input, sort_keys=True, default=str).encode())
+        report_hash.update(b"|")
+
+    return report_hash.hexdigest()
+
+
+def get_cached_report_path(report_hash: str, cache_directory: str = REPORTS_CACHE_DIRECTORY) -> str:
+    """Returns where the PDF rendered for a report hash is kept."""
+    return os.path.join(cache_directory, f"{report_hash}.pdf")
+
+
+def load_cached_report(report_hash: str, output_path: str, cache_directory: str = REPORTS_CACHE_DIRECTORY,
+                       use_cache: bool = USE_REPORTS_CACHE) -> bool:
+    """Copies the cached PDF of a report hash to the report path, instead of rendering it again.
+
+    Args:
+        report_hash (str): hash from hash_report_inputs.
+        output_path (str): path the report is expected at.
+
+    Returns:
+        bool: True on a cache hit, False if the report has to be rendered.
+    """
+    if not use_cache:
+        return False
+
+    cached_path = get_cached_report_path(report_hash, cache_directory)
+    try:
+        if os.path.exists(cached_path):
+            if not os.path.exists(output_path) or not os.path.samefile(cached_path, output_path):
+                shutil.copyfile(cached_path, output_path)
+            os.utime(cached_path) # Mark the PDF as recently used for eviction
+            record_cache_result(hit=True)
+            logging.info(f"Reused {output_path} from the reports cache.")
+            return True
+
+    except Exception as e:
+        logging.error(f"Could not read the reports cache: {e}")
+
+    record_cache_result(hit=False)
+    return False
+
+
+def save_cached_report(report_hash: str, output_path: str, cache_directory: str = REPORTS_CACHE_DIRECTORY,
+                       use_cache: bool = USE_REPORTS_CACHE, max_bytes: int = REPORTS_CACHE_MAX_BYTES) -> None:
+    """Keeps a copy of a rendered report PDF under its hash.
+
+    The copy is written to a temporary file and renamed into place, so a run
+    never reuses a half written PDF. The least recently used PDFs are then
+    removed until the cache fits in max_bytes.
+    """
+    if not use_cache:
+        return
+
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(prefix='.tmp-', suffix='.pdf', dir=cache_directory)
+        os.close(file_descriptor)
+        shutil.copyfile(output_path, temporary_path)
+        os.replace(temporary_path, get_cached_report_path(report_hash, cache_directory))
+        evict_cached_reports(cache_directory, max_bytes)
+
+    except Exception as e:
+        logging.error(f"Could not write the reports cache: {e}")
+
+
+def evict_cached_reports(cache_directory: str = REPORTS_CACHE_DIRECTORY, max_bytes: int = REPORTS_CACHE_MAX_BYTES) -> None:
+    """Removes the least recently used cached PDFs until the cache fits in max_bytes."""
+    entries = []
+    for entry in os.scandir(cache_directory):
+        if entry.name.startswith('.') or not entry.name.endswith('.pdf'):
+            continue
+        entry_stat = entry.stat()
+        entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+
+    total_size = sum(entry_size for _, entry_size, _ in entries)
+    for _, entry_size, entry_path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass # Another process evicted it first
+        total_size -= entry_size
+
+
+def record_cache_result(hit: bool) -> None:
+    """Counts a reports cache hit or miss."""
+    with cache_stats_lock:
+        cache_stats['hits' if hit else 'misses'] += 1
+
+
+def get_cache_stats() -> dict:
+    """Returns the reports cache hits and misses counted since the start or the last reset."""
+    with cache_stats_lock:
+        return dict(cache_stats)
+
+
+def reset_cache_stats() -> None:
+    """Sets the reports cache hits and misses back to zero."""
+    with cache_stats_lock:
+        cache_stats['hits'] = 0
+        cache_stats['misses'] = 0
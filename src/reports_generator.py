@@ -1,48 +1,121 @@
 import logging
+import numpy
 import pandas
 import os
-from src.config import configure_logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.config import configure_logging, ANOMALY_REPORT_ROWS, CONSOLIDATED_REPORT, REPORT_RENDERING_WORKERS, REPORTS_DIRECTORY, USE_REPORTS_CACHE
+from src.data_loader import get_amounts
+from src.category_month_cube import build_category_month_cube, get_monthly_totals, get_total_income_and_expenses
+from src.reports_cache import hash_report_inputs, load_cached_report, save_cached_report
 from typing import Optional
-import matplotlib.pyplot as pyplot
+import matplotlib
+matplotlib.use('Agg') # Reports are only saved to files, never shown in a window
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+EXPENSES_BY_CATEGORIES_REPORT_NAME = "Sort_data_by_expense_categories.pdf"
+MONTHLY_SUMMARY_REPORT_NAME = "monthly_summary.pdf"
+RECOMMENDATION_REPORT_NAME = "recommendation_report.pdf"
+CONSOLIDATED_REPORT_NAME = "financial_report.pdf"
 
 FONT_SIZE = 12
 TEXT_ROTATION = 45
 CATEGORY_LABLEPAD = 20
+BAR_WIDTH = 0.5
 
 configure_logging() # Initialize logging
 
-def create_expenses_by_categories_graph(data : pandas.DataFrame) -> Optional[pandas.DataFrame]:
+# Every report draws on its own Figure and canvas instead of the global pyplot state.
+# That does not make rendering thread-safe: matplotlib shares its font objects between
+# figures, so create_reports renders the reports in worker processes, each with its own
+# matplotlib state, like the batch runner. The draw_* functions draw one page on a cleared
+# figure, so a report can reuse one figure for all its pages.
+
+
+def new_figure(figsize: tuple) -> Figure:
+    """creates a Figure with its own Agg canvas, not registered with pyplot."""
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def get_report_path(report_name: str, output_directory: str = REPORTS_DIRECTORY) -> str:
+    """returns the path a report is saved to, creating its directory if needed."""
+    os.makedirs(output_directory, exist_ok=True)
+    return os.path.join(output_directory, report_name)
+
+
+def create_expenses_by_categories_graph(data : pandas.DataFrame, output_directory: str = REPORTS_DIRECTORY,
+                                        use_cache: bool = USE_REPORTS_CACHE) -> Optional[pandas.DataFrame]:
     """creates a sorted data graph by expense categories.
 
     Args:
         data as pandas.DataFrame object
+        output_directory as the directory the report is saved to
+        use_cache as False to render the report even if the reports cache has it
 
     Returns:
         Sort data by expense categories as pandas.DataFrame object
     """
     try:
-        expense_data = data[data['Amount'] < 0].copy()
-        expense_data['Amount'] = expense_data['Amount'].abs()
-        sorted_data = expense_data.groupby('Category')['Amount'].sum().sort_values(ascending=False)
-        num_categories = len(sorted_data) # Adjust figure width dynamically based on the number of categories
-        pyplot.figure(figsize=(max(14, num_categories * 2), 14))  # Adjust width, keep height constant
-        bars = sorted_data.plot(kind='bar', color='skyblue', legend=False)
-
-        for bar in bars.containers[0]:  # adding the amount in the middle of the column
-            height = bar.get_height()
-            bars.text(
-                bar.get_x() + bar.get_width() / 2, height / 2,  
-                f"{int(height)}",                              
-                ha='center', va='center', fontsize=FONT_SIZE, color='black'
-            )
-            
-        sorted_data.plot(kind='bar', x='Category', y='Amount', legend = False, )
-        pyplot.xlabel('Category', fontsize=FONT_SIZE, labelpad=CATEGORY_LABLEPAD)
-        pyplot.ylabel('Amount', fontsize=FONT_SIZE)
-        pyplot.title('Sorted data by expense categories', fontsize=FONT_SIZE, weight='bold')
-        pyplot.xticks(rotation=TEXT_ROTATION, ha='right')
-        pyplot.savefig("reports/Sort_data_by_expense_categories.pdf", format='pdf')
-        pyplot.close()
+        sorted_data = calculate_expenses_by_categories(data)
+        return plot_expenses_by_categories(sorted_data, output_directory, use_cache)
+
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+        return None
+
+
+def calculate_expenses_by_categories(data : pandas.DataFrame) -> pandas.Series:
+    """sums the expenses of every category, biggest expense first.
+
+    Args:
+        data as pandas.DataFrame object
+
+    Returns:
+        expense amount of each category as pandas.Series object
+    """
+    amounts = get_amounts(data)
+    expenses = amounts[amounts < 0].abs()
+    return sort_expenses_by_categories(expenses.groupby(data.loc[amounts < 0, 'Category'], observed=True).sum())
+
+
+def sort_expenses_by_categories(category_expenses : pandas.Series) -> pandas.Series:
+    """sorts category expense totals the same way for every way they were summed.
+
+    Args:
+        category_expenses as pandas.Series object indexed by category
+
+    Returns:
+        category expenses sorted from the biggest to the smallest
+    """
+    return category_expenses.sort_index().sort_values(ascending=False)
+
+
+def plot_expenses_by_categories(sorted_data : pandas.Series, output_directory: str = REPORTS_DIRECTORY,
+                                use_cache: bool = USE_REPORTS_CACHE) -> Optional[pandas.Series]:
+    """creates the expense categories graph from already summed category expenses.
+
+    Args:
+        sorted_data as pandas.Series object of expenses by category
+        output_directory as the directory the report is saved to
+        use_cache as False to render the report even if the reports cache has it
+
+    Returns:
+        the same sorted data, or None if the graph could not be created
+    """
+    try:
+        report_path = get_report_path(EXPENSES_BY_CATEGORIES_REPORT_NAME, output_directory)
+        report_hash = hash_report_inputs('expenses_by_categories', sorted_data)
+        if load_cached_report(report_hash, report_path, use_cache=use_cache):
+            return sorted_data
+
+        figure = new_figure(figsize=(14, 14))
+        draw_expenses_by_categories(figure, sorted_data)
+        figure.savefig(report_path, format='pdf')
+        save_cached_report(report_hash, report_path, use_cache=use_cache)
         logging.info('Sort_data_by_expense_categories.pdf have been created.')
         return sorted_data
 
@@ -51,8 +124,53 @@ def create_expenses_by_categories_graph(data : pandas.DataFrame) -> Optional[pan
         return None
 
 
-def create_monthly_summary_graph(data : pandas.DataFrame) -> (Optional[pandas.DataFrame], bool):
-    """creates a monthly summary graph - total income and expenses.
+def draw_expenses_by_categories(figure : Figure, sorted_data : pandas.Series) -> None:
+    """draws the expense categories graph on a figure, resized to the number of categories."""
+    num_categories = len(sorted_data) # Adjust figure width dynamically based on the number of categories
+    figure.set_size_inches(max(14, num_categories * 2), 14)  # Adjust width, keep height constant
+    axes = figure.add_subplot()
+    positions = range(num_categories)
+    bars = axes.bar(positions, sorted_data.to_numpy(), width=BAR_WIDTH, color='skyblue')
+
+    for bar in bars:  # adding the amount in the middle of the column
+        height = bar.get_height()
+        axes.text(
+            bar.get_x() + bar.get_width() / 2, height / 2,
+            f"{int(height)}",
+            ha='center', va='center', fontsize=FONT_SIZE, color='black'
+        )
+
+    axes.set_xticks(positions, [str(category) for category in sorted_data.index], rotation=TEXT_ROTATION, ha='right')
+    axes.set_xlabel('Category', fontsize=FONT_SIZE, labelpad=CATEGORY_LABLEPAD)
+    axes.set_ylabel('Amount', fontsize=FONT_SIZE)
+    axes.set_title('Sorted data by expense categories', fontsize=FONT_SIZE, weight='bold')
+
+
+def create_monthly_summary_graph(data : pandas.DataFrame, output_directory: str = REPORTS_DIRECTORY,
+                                 use_cache: bool = USE_REPORTS_CACHE) -> (Optional[pandas.DataFrame], bool):
+    """creates a monthly summary graph - total income and expenses, and the income and expenses of every month.
+
+    Args:
+        data as DataFrame object
+        output_directory as the directory the report is saved to
+        use_cache as False to render the report even if the reports cache has it
+
+    Returns:
+        monthly summary as pandas.DataFrame object
+    """
+    try:
+        cube = build_category_month_cube(data)
+        summary_df = summarize_income_and_expenses(*get_total_income_and_expenses(cube))
+        return plot_monthly_summary(summary_df, output_directory, get_monthly_totals(cube), use_cache)
+
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+
+    return None, False
+
+
+def calculate_monthly_summary(data : pandas.DataFrame) -> pandas.DataFrame:
+    """sums the income and expenses of the transactions.
 
     Args:
         data as DataFrame object
@@ -60,99 +178,385 @@ def create_monthly_summary_graph(data : pandas.DataFrame) -> (Optional[pandas.Da
     Returns:
         monthly summary as pandas.DataFrame object
     """
+    amounts = get_amounts(data)
+    total_income = amounts[amounts > 0].sum()
+    total_expenses = amounts[amounts < 0].abs().sum()
+    return summarize_income_and_expenses(total_income, total_expenses)
+
+
+def summarize_income_and_expenses(total_income : float, total_expenses : float) -> pandas.DataFrame:
+    """builds the monthly summary table from already summed income and expenses.
+
+    Args:
+        total_income as float
+        total_expenses as float, a positive number
+
+    Returns:
+        monthly summary as pandas.DataFrame object
+    """
+    net_income = total_income - total_expenses
+    summary_data = {
+        'Type': ['Total Income', 'Total Expenses', 'Net Income'],
+        'Amount': [total_income, total_expenses, net_income]
+    }
+    return pandas.DataFrame(summary_data)
+
+
+def plot_monthly_summary(summary_df : pandas.DataFrame, output_directory: str = REPORTS_DIRECTORY,
+                         monthly_totals: Optional[pandas.DataFrame] = None, use_cache: bool = USE_REPORTS_CACHE) -> (Optional[pandas.DataFrame], bool):
+    """creates the monthly summary graph from the monthly summary table.
+
+    Args:
+        summary_df as pandas.DataFrame with Type and Amount columns
+        output_directory as the directory the report is saved to
+        monthly_totals as optional pandas.DataFrame of every month from get_monthly_totals, added as a second page
+        use_cache as False to render the report even if the reports cache has it
+
+    Returns:
+        monthly summary as pandas.DataFrame object
+        True if the graph was created
+    """
     try:
         graph_created = False
-        income_data = data[data['Amount'] > 0]
-        expense_data = data[data['Amount'] < 0]
-        total_income = income_data['Amount'].sum()
-        total_expenses = expense_data['Amount'].abs().sum()
-        net_income = total_income - total_expenses
-        summary_data = {
-            'Type': ['Total Income', 'Total Expenses', 'Net Income'],
-            'Amount': [total_income, total_expenses, net_income]
-        }
-        pyplot.figure(figsize=(8, 10))
-        summary_df = pandas.DataFrame(summary_data)
-        bars = pyplot.bar(summary_df['Type'], summary_df['Amount'], color=['green', 'red', 'blue'])
-        pyplot.xlabel('Category', labelpad=CATEGORY_LABLEPAD)
-        pyplot.ylabel('Amount')
-        pyplot.title('Income and Expenses')
-
-        for bar, amount in zip(bars, summary_df['Amount']): # adding the amount in the middle of the column
-            pyplot.text(
-                bar.get_x() + bar.get_width() / 2,  
-                bar.get_height() / 2,               
-                f"{amount}",                        
-                ha='center', va='center', fontsize=10, color='white'  
-            )
-
-        pyplot.savefig("reports/monthly_summary.pdf", format='pdf')
-        pyplot.close()
-        if os.path.exists("reports/monthly_summary.pdf"):
+        report_path = get_report_path(MONTHLY_SUMMARY_REPORT_NAME, output_directory)
+        report_hash = hash_report_inputs('monthly_summary', summary_df, monthly_totals)
+        if load_cached_report(report_hash, report_path, use_cache=use_cache):
+            return summary_df, True
+
+        figure = new_figure(figsize=(8, 10))
+        with PdfPages(report_path) as report_pages:
+            draw_monthly_summary(figure, summary_df)
+            report_pages.savefig(figure)
+            if monthly_totals is not None and not monthly_totals.empty:
+                figure.clear()
+                draw_monthly_totals(figure, monthly_totals)
+                report_pages.savefig(figure)
+
+        if os.path.exists(report_path):
             graph_created = True
+            save_cached_report(report_hash, report_path, use_cache=use_cache)
             logging.info('monthly_summary.pdf have been created.')
 
         return summary_df, graph_created
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
-    
+
     return None, False
 
 
-def create_recommendation_report(general_recommendations: list, saving_goal_recommendations: list, category_reductions: dict) -> bool:
+def draw_monthly_summary(figure : Figure, summary_df : pandas.DataFrame) -> None:
+    """draws the total income, expenses and net income on a figure."""
+    figure.set_size_inches(8, 10)
+    axes = figure.add_subplot()
+    bars = axes.bar(summary_df['Type'], summary_df['Amount'], color=['green', 'red', 'blue'])
+    axes.set_xlabel('Category', labelpad=CATEGORY_LABLEPAD)
+    axes.set_ylabel('Amount')
+    axes.set_title('Income and Expenses')
+
+    for bar, amount in zip(bars, summary_df['Amount']): # adding the amount in the middle of the column
+        axes.text(
+            bar.get_x() + bar.get_width() / 2,
+            bar.get_height() / 2,
+            f"{amount}",
+            ha='center', va='center', fontsize=10, color='white'
+        )
+
+
+def draw_monthly_totals(figure : Figure, monthly_totals : pandas.DataFrame) -> None:
+    """draws the income and expenses of every month and the rolling average of the expenses on a figure."""
+    num_months = len(monthly_totals)
+    figure.set_size_inches(max(8, num_months * 0.6), 10)
+    axes = figure.add_subplot()
+    positions = numpy.arange(num_months)
+    axes.bar(positions - BAR_WIDTH / 4, monthly_totals['Income'], width=BAR_WIDTH / 2, color='green', label='Income')
+    axes.bar(positions + BAR_WIDTH / 4, monthly_totals['Expenses'], width=BAR_WIDTH / 2, color='red', label='Expenses')
+    axes.plot(positions, monthly_totals['Expenses Rolling Average'], color='black', marker='o', label='Expenses rolling average')
+    axes.set_xticks(positions, [str(month) for month in monthly_totals.index], rotation=TEXT_ROTATION, ha='right')
+    axes.set_xlabel('Month', labelpad=CATEGORY_LABLEPAD)
+    axes.set_ylabel('Amount')
+    axes.set_title('Income and Expenses by Month', fontsize=15, weight='bold', loc='left')
+    axes.legend()
+    figure.tight_layout(pad=3.0)
+
+
+def create_recommendation_report(general_recommendations: list, saving_goal_recommendations: list, category_reductions: dict,
+                                 savings_curve: Optional[pandas.DataFrame] = None, output_directory: str = REPORTS_DIRECTORY,
+                                 savings_forecast: Optional[pandas.DataFrame] = None, anomalies: Optional[pandas.DataFrame] = None,
+                                 use_cache: bool = USE_REPORTS_CACHE) -> bool:
     """creates a recommendations graph - general and for saving goal that the user asks.
 
     Args:
        general_recommendations (list)
        saving_goal_recommendations(list)
        category_reductions(dict) with the persentage of each category redcution
+       savings_curve(pandas.DataFrame) optional savings reached for a range of goals, added as a second page
+       output_directory(str) the directory the report is saved to
+       savings_forecast(pandas.DataFrame) optional forecast from forecast_savings, added as a page
+       anomalies(pandas.DataFrame) optional unusual transactions from detect_anomalies, added as the last page
+       use_cache(bool) False to render the report even if the reports cache has it
 
     Returns:
         None
     """
     try:
         graph_created = False
-        show_graph = True
-        pyplot.figure(figsize=(8, 10))
-        pyplot.subplot(3, 1, 1)
-        pyplot.axis('off')
-        pyplot.title("General Recommendations", fontsize=15, weight='bold', loc='left')
-        
-        recommendations_text = ""
-        if general_recommendations:
-            recommendations_text += "\n".join(general_recommendations)
-        else:
-            recommendations_text = "No general recommendations."
-        recommendations_text += "\n\n"
-        pyplot.text(0, 1, recommendations_text, fontsize=FONT_SIZE, va='top', ha='left', wrap=True)
-        pyplot.text(0, 0.25, "To achive your saving goal we recommended:", fontsize=12, weight='bold', ha='left')
-
-        saving_goal_recommendations_text = ""
-        if saving_goal_recommendations:
-            saving_goal_recommendations_text += "\n".join(saving_goal_recommendations)
-        else:
-            show_graph = False
-            saving_goal_recommendations_text += "The current budget meets the savings goal."
-        
-        pyplot.text(0, 0.2, saving_goal_recommendations_text, fontsize=FONT_SIZE, va='top', ha='left', wrap=True)
-        if show_graph:
-            pyplot.subplot(3, 1, 3)
-            pyplot.title("Reduction Percentages by Category for Saving Goals", fontsize=16, weight='bold', loc='left')
-            categories = list(category_reductions.keys())
-            values = list(category_reductions.values())
-            pyplot.bar(categories, values, color='skyblue')
-            pyplot.xlabel("Category")
-            pyplot.ylabel("Reduction (%)")
-            pyplot.ylim(0, 100)
-            pyplot.tight_layout(pad=3.0)
-            
-        pyplot.savefig("reports/recommendation_report.pdf", format="pdf")
-        pyplot.close()
-        if os.path.exists("reports/recommendation_report.pdf"):
+        report_path = get_report_path(RECOMMENDATION_REPORT_NAME, output_directory)
+        report_hash = hash_report_inputs('recommendation_report', general_recommendations, saving_goal_recommendations,
+                                         category_reductions, savings_curve, savings_forecast, anomalies)
+        if load_cached_report(report_hash, report_path, use_cache=use_cache):
+            return True
+
+        figure = new_figure(figsize=(8, 10))
+        with PdfPages(report_path) as report_pages:
+            draw_recommendations(figure, general_recommendations, saving_goal_recommendations, category_reductions)
+            report_pages.savefig(figure)
+            if savings_curve is not None:
+                figure.clear()
+                draw_savings_goals_curve(figure, savings_curve)
+                report_pages.savefig(figure)
+            if savings_forecast is not None:
+                figure.clear()
+                draw_savings_forecast(figure, savings_forecast)
+                report_pages.savefig(figure)
+            if anomalies is not None:
+                figure.clear()
+                draw_anomalies(figure, anomalies)
+                report_pages.savefig(figure)
+
+        if os.path.exists(report_path):
             graph_created = True
+            save_cached_report(report_hash, report_path, use_cache=use_cache)
             logging.info("PDF report saved as recommendation_report.pdf")
         return graph_created
-    
+
+    except Exception as e:
+        logging.error(e)
+
+
+def draw_recommendations(figure : Figure, general_recommendations: list, saving_goal_recommendations: list,
+                         category_reductions: dict) -> None:
+    """draws the general and saving goal recommendations, and the reduction of every category, on a figure."""
+    figure.set_size_inches(8, 10)
+    show_graph = True
+    axes = figure.add_subplot(3, 1, 1)
+    axes.axis('off')
+    axes.set_title("General Recommendations", fontsize=15, weight='bold', loc='left')
+
+    recommendations_text = ""
+    if general_recommendations:
+        recommendations_text += "\n".join(general_recommendations)
+    else:
+        recommendations_text = "No general recommendations."
+    recommendations_text += "\n\n"
+    axes.text(0, 1, recommendations_text, fontsize=FONT_SIZE, va='top', ha='left', wrap=True)
+    axes.text(0, 0.25, "To achive your saving goal we recommended:", fontsize=12, weight='bold', ha='left')
+
+    saving_goal_recommendations_text = ""
+    if saving_goal_recommendations:
+        saving_goal_recommendations_text += "\n".join(saving_goal_recommendations)
+    else:
+        show_graph = False
+        saving_goal_recommendations_text += "The current budget meets the savings goal."
+
+    axes.text(0, 0.2, saving_goal_recommendations_text, fontsize=FONT_SIZE, va='top', ha='left', wrap=True)
+    if show_graph:
+        axes = figure.add_subplot(3, 1, 3)
+        axes.set_title("Reduction Percentages by Category for Saving Goals", fontsize=16, weight='bold', loc='left')
+        categories = list(category_reductions.keys())
+        values = list(category_reductions.values())
+        axes.bar(categories, values, color='skyblue')
+        axes.set_xlabel("Category")
+        axes.set_ylabel("Reduction (%)")
+        axes.set_ylim(0, 100)
+        figure.tight_layout(pad=3.0)
+
+
+def draw_savings_goals_curve(figure : Figure, savings_curve : pandas.DataFrame) -> None:
+    """draws the savings reached by the recommended reductions for each goal on a figure."""
+    figure.set_size_inches(8, 10)
+    axes = figure.add_subplot()
+    axes.plot(savings_curve['Goal'], savings_curve['Savings'], color='green', label='Savings from reductions')
+    axes.plot(savings_curve['Goal'], savings_curve['Remaining Goal'], color='red', label='Goal not met')
+    axes.set_xlabel('Savings goal', fontsize=FONT_SIZE)
+    axes.set_ylabel('Amount', fontsize=FONT_SIZE)
+    axes.set_title('Savings by goal', fontsize=15, weight='bold', loc='left')
+    axes.legend()
+
+
+def draw_savings_forecast(figure : Figure, savings_forecast : pandas.DataFrame) -> None:
+    """draws the probability of reaching the savings goal and the range of the forecast savings on a figure."""
+    figure.set_size_inches(8, 10)
+    axes = figure.add_subplot(2, 1, 1)
+    axes.axis('off')
+    axes.set_title("Savings Forecast", fontsize=15, weight='bold', loc='left')
+    forecast_text = "\n".join(
+        f"{scenario}: {row['Probability']:.0%} chance to save {row['Goal']:,.0f}, most likely {row['Savings Median']:,.0f}."
+        for scenario, row in savings_forecast.iterrows()
+    )
+    axes.text(0, 1, forecast_text, fontsize=FONT_SIZE, va='top', ha='left', wrap=True)
+
+    axes = figure.add_subplot(2, 1, 2)
+    positions = numpy.arange(len(savings_forecast))
+    medians = savings_forecast['Savings Median'].to_numpy()
+    spread = [medians - savings_forecast['Savings P5'].to_numpy(), savings_forecast['Savings P95'].to_numpy() - medians]
+    axes.bar(positions, medians, width=BAR_WIDTH, yerr=spread, capsize=10, color='skyblue', label='Savings, 5th to 95th percentile')
+    axes.axhline(savings_forecast['Goal'].iloc[0], color='red', label='Savings goal')
+    axes.set_xticks(positions, list(savings_forecast.index))
+    axes.set_ylabel('Amount', fontsize=FONT_SIZE)
+    axes.legend()
+    figure.tight_layout(pad=3.0)
+
+
+def draw_anomalies(figure : Figure, anomalies : pandas.DataFrame, max_rows: int = ANOMALY_REPORT_ROWS) -> None:
+    """draws a table of the most unusual transactions on a figure, farthest from their category first."""
+    figure.set_size_inches(8, 10)
+    axes = figure.add_subplot()
+    axes.axis('off')
+    axes.set_title("Unusual Transactions", fontsize=15, weight='bold', loc='left')
+    if anomalies.empty:
+        axes.text(0, 1, "No unusual transactions.", fontsize=FONT_SIZE, va='top', ha='left')
+        return
+
+    shown = anomalies.iloc[numpy.argsort(-anomalies['ZScore'].abs().to_numpy(), kind='stable')[:max_rows]]
+    cells = [
+        [str(pandas.Timestamp(date).date()) if pandas.notna(date) else "", str(category), f"{amount:,.2f}", f"{expected:,.2f}", f"{z_score:.1f}"]
+        for date, category, amount, expected, z_score in shown[['Date', 'Category', 'Amount', 'Expected', 'ZScore']].itertuples(index=False)
+    ]
+    table = axes.table(cellText=cells, colLabels=['Date', 'Category', 'Amount', 'Usual amount', 'Deviations'], loc='upper center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+    table.scale(1, 1.5)
+    if len(anomalies) > max_rows:
+        axes.text(0, 0, f"{len(anomalies) - max_rows} more unusual transactions are not shown.", fontsize=10, ha='left')
+
+
+def create_consolidated_report(sorted_data : pandas.Series, summary_df : pandas.DataFrame, general_recommendations: list,
+                               saving_goal_recommendations: list, category_reductions: dict,
+                               savings_curve: Optional[pandas.DataFrame] = None, output_directory: str = REPORTS_DIRECTORY,
+                               monthly_totals: Optional[pandas.DataFrame] = None,
+                               savings_forecast: Optional[pandas.DataFrame] = None, anomalies: Optional[pandas.DataFrame] = None,
+                               use_cache: bool = USE_REPORTS_CACHE) -> bool:
+    """creates one PDF with the pages of the expense categories, monthly summary and recommendation reports.
+
+    Every page is drawn on the same figure and streamed into the same PDF, so the fonts
+    are embedded once for the whole report instead of once for every file.
+
+    Args:
+        sorted_data as pandas.Series of expenses by category
+        summary_df as pandas.DataFrame monthly summary
+        general_recommendations, saving_goal_recommendations, category_reductions, savings_curve, savings_forecast
+        and anomalies as for create_recommendation_report
+        output_directory as the directory the report is saved to
+        monthly_totals as optional pandas.DataFrame of every month, for the monthly summary page
+        use_cache as False to render the report even if the reports cache has it
+
+    Returns:
+        True if the report was created
+    """
+    try:
+        report_path = get_report_path(CONSOLIDATED_REPORT_NAME, output_directory)
+        report_hash = hash_report_inputs('consolidated_report', sorted_data, summary_df, general_recommendations,
+                                         saving_goal_recommendations, category_reductions, savings_curve, monthly_totals,
+                                         savings_forecast, anomalies)
+        if load_cached_report(report_hash, report_path, use_cache=use_cache):
+            return True
+
+        pages = [
+            (draw_expenses_by_categories, (sorted_data,)),
+            (draw_monthly_summary, (summary_df,)),
+        ]
+        if monthly_totals is not None and not monthly_totals.empty:
+            pages.append((draw_monthly_totals, (monthly_totals,)))
+        pages.append((draw_recommendations, (general_recommendations, saving_goal_recommendations, category_reductions)))
+        if savings_curve is not None:
+            pages.append((draw_savings_goals_curve, (savings_curve,)))
+        if savings_forecast is not None:
+            pages.append((draw_savings_forecast, (savings_forecast,)))
+        if anomalies is not None:
+            pages.append((draw_anomalies, (anomalies,)))
+
+        figure = new_figure(figsize=(8, 10))
+        with PdfPages(report_path) as report_pages:
+            for draw_page, page_inputs in pages:
+                figure.clear()
+                draw_page(figure, *page_inputs)
+                report_pages.savefig(figure)
+
+        save_cached_report(report_hash, report_path, use_cache=use_cache)
+        logging.info(f"PDF report saved as {CONSOLIDATED_REPORT_NAME}")
+        return True
+
     except Exception as e:
-        logging.error(e)
\ No newline at end of file
+        logging.error(f"An error occurred: {e}")
+        return False
+
+
+def create_reports(sorted_data : pandas.Series, summary_df : pandas.DataFrame, general_recommendations: list,
+                   saving_goal_recommendations: list, category_reductions: dict,
+                   savings_curve: Optional[pandas.DataFrame] = None,
+                   output_directory: str = REPORTS_DIRECTORY, monthly_totals: Optional[pandas.DataFrame] = None,
+                   consolidated: bool = CONSOLIDATED_REPORT, savings_forecast: Optional[pandas.DataFrame] = None,
+                   anomalies: Optional[pandas.DataFrame] = None, max_workers: int = REPORT_RENDERING_WORKERS,
+                   use_cache: bool = USE_REPORTS_CACHE) -> dict:
+    """renders the expense categories, monthly summary and recommendation reports at the same time in
+    worker processes, or all their pages into one consolidated report.
+
+    The reports cache hits and misses of the worker processes are not counted in this process.
+
+    Args:
+        sorted_data as pandas.Series of expenses by category
+        summary_df as pandas.DataFrame monthly summary
+        general_recommendations, saving_goal_recommendations, category_reductions, savings_curve, savings_forecast
+        and anomalies as for create_recommendation_report
+        output_directory as the directory the reports are saved to
+        monthly_totals as optional pandas.DataFrame of every month, for the monthly summary report
+        consolidated as True to create one financial_report.pdf instead of three reports
+        max_workers as the processes the reports are rendered in, 1 to render them one after the other
+        use_cache as False to render the reports even if the reports cache has them
+
+    Returns:
+        dict: True or False by report name for whether the report was created
+    """
+    if consolidated:
+        return {
+            'consolidated_report': create_consolidated_report(
+                sorted_data, summary_df, general_recommendations, saving_goal_recommendations, category_reductions,
+                savings_curve, output_directory, monthly_totals, savings_forecast, anomalies, use_cache
+            ),
+        }
+
+    reports = render_reports({
+        'expenses_by_categories': (plot_expenses_by_categories, (sorted_data, output_directory, use_cache)),
+        'monthly_summary': (plot_monthly_summary, (summary_df, output_directory, monthly_totals, use_cache)),
+        'recommendation_report': (create_recommendation_report, (
+            general_recommendations, saving_goal_recommendations, category_reductions,
+            savings_curve, output_directory, savings_forecast, anomalies, use_cache
+        )),
+    }, max_workers)
+    return {
+        'expenses_by_categories': reports['expenses_by_categories'] is not None,
+        'monthly_summary': reports['monthly_summary'][1],
+        'recommendation_report': bool(reports['recommendation_report']),
+    }
+
+
+def render_reports(report_calls: dict, max_workers: int = REPORT_RENDERING_WORKERS) -> dict:
+    """runs report functions in worker processes, or one after the other if there are no worker processes.
+
+    Args:
+        report_calls as dict of (function, arguments) by report name
+        max_workers as the most processes to use, 1 to run the functions in this process
+
+    Returns:
+        dict: the result of every function by report name
+    """
+    if max_workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(report_calls))) as executor:
+                futures = {name: executor.submit(function, *arguments) for name, (function, arguments) in report_calls.items()}
+                return {name: future.result() for name, future in futures.items()}
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            logging.warning(f"Rendering the reports one after the other, worker processes are unavailable: {e}")
+
+    return {name: function(*arguments) for name, (function, arguments) in report_calls.items()}
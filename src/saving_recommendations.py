@@ -1,50 +1,59 @@
+import numpy
 import pandas
 import logging
+from typing import Optional
+from src.budget_rules import (
+    BudgetRules,
+    calculate_target_reductions,
+    get_max_reduction_percentages,
+    get_rule_values,
+    get_tier_categories,
+    load_budget_rules,
+)
 from src.config import configure_logging
+from src.recurring_transactions import (
+    describe_recurring_charges,
+    find_candidate_charges,
+    get_recurring_candidates,
+    has_recurring_category,
+    RECURRING_CATEGORY,
+)
 
 configure_logging()# Initialize logging
 REDUCTION_STEP = 2 
+REDUCTION_TOLERANCE = 1e-9 # Max difference in percentage points between the closed form and the stepping reductions
+GOAL_TOLERANCE = 1e-6 # Remaining goal treated as met, so float noise at the end of a pass does not start another one
+SAVINGS_CURVE_POINTS = 50
 
-def find_categories_exceeding_average(expenses_dataframe: pandas.DataFrame, income: int) -> list:
+# The desired maximum percentage of income of every category, the order categories are
+# reduced in for a savings goal and how much of each may be cut are budget rules,
+# read from BUDGET_RULES_PATH by load_budget_rules.
+
+
+def find_categories_exceeding_average(expenses_dataframe: pandas.DataFrame, income: int, rules: Optional[BudgetRules] = None) -> list:
     """
     Identifies categories with expenses higher than the desired average and provides recommendations.
 
+    Every category is checked against its target in one vectorized pass, and only the
+    categories above their target get a recommendation text.
+
     Parameters:
     - expenses_dataframe (pandas.DataFrame): a dataframe with expense categories 
       (e.g., "Rent", "Groceries") and the amounts spent in each category.
     - income (int): Monthly income.
+    - rules (BudgetRules): the budget rules, the rules of BUDGET_RULES_PATH if None.
 
     Returns:
     - list of str: recommendations for reducing expenses.
     """
+    rules = load_budget_rules() if rules is None else rules
+    target_percentages = get_rule_values(rules, rules.target_percentages, expenses_dataframe.index)
+    _, exceeding, reductions = calculate_target_reductions(expenses_dataframe.to_numpy(dtype=float), income, target_percentages)
 
-    # Define desired maximum percentage of income for each category
-    desired_average_expenses = {
-        'Rent': 30,  
-        'Groceries': 10,  
-        'Transport': 5, 
-        'Entertainment': 5,  
-        'Dining': 5,  
-        'Healthcare': 7,  
-        'Utilities': 5   
-    }
-
-    recommendations = []
-
-    # Calculate each category's expense as a percentage of income and check against desired averages
-    for category, amount in expenses_dataframe.items():
-        if category in desired_average_expenses:
-            max_percentage = desired_average_expenses[category]
-            current_percentage = (amount / income) * 100
-            
-            # If the current percentage exceeds the max allowed percentage, recommend a reduction
-            if current_percentage > max_percentage:
-                reduction_percentage = ((current_percentage - max_percentage) / current_percentage) * 100
-                recommendations.append(
-                    f"It is recommended to reduce {category} expenses by {reduction_percentage:.1f}% because its higher than the desired average."
-                )
-
-    return recommendations
+    return [
+        f"It is recommended to reduce {expenses_dataframe.index[position]} expenses by {reductions[position]:.1f}% because its higher than the desired average."
+        for position in numpy.flatnonzero(exceeding)
+    ]
 
 
 def calculate_reduction_amount(category_amount: float, reduction_step: float) -> float:
@@ -54,7 +63,8 @@ def calculate_reduction_amount(category_amount: float, reduction_step: float) ->
     return (reduction_step / 100) * category_amount
 
 
-def apply_reduction(expenses_dataframe: pandas.DataFrame, category: str, reduction_amount: float, reduction_percentages: dict) -> float:
+def apply_reduction(expenses_dataframe: pandas.DataFrame, category: str, reduction_amount: float, reduction_percentages: dict,
+                    max_percentage: float = 100) -> float:
     """
     Apply a reduction to a category in the expenses dataframe and update cumulative reductions.
 
@@ -62,24 +72,26 @@ def apply_reduction(expenses_dataframe: pandas.DataFrame, category: str, reducti
     - expenses_dataframe (pandas.DataFrame): The DataFrame of expenses.
     - category (str): The category to reduce.
     - reduction_percentages (dict): Dictionary tracking cumulative reduction percentages.
+    - max_percentage (float): The most the category may be reduced, 100 minus its floor.
 
     Returns:
     - float: The actual reduction applied to the category.
     """
     original_amount = expenses_dataframe[category]
-    if reduction_percentages[category] >= 100:
-        return 0  # Stop if we've already reduced this category by 100%
+    if reduction_percentages[category] >= max_percentage:
+        return 0  # Stop if we've already reduced this category as much as it may be
 
     # Calculate actual reduction percentage and apply it
     reduction_percentage = (reduction_amount / original_amount) * 100
-    if reduction_percentages[category] + reduction_percentage > 100:
-        reduction_percentage = 100 - reduction_percentages[category]
-        reduction_amount = (reduction_percentage / 100) * original_amount  # Adjust reduction amount because its over 100
+    if reduction_percentages[category] + reduction_percentage > max_percentage:
+        reduction_percentage = max_percentage - reduction_percentages[category]
+        reduction_amount = (reduction_percentage / 100) * original_amount  # Adjust reduction amount because its over the maximum
 
     reduction_percentages[category] += reduction_percentage
     return reduction_amount
 
-def reduce_expenses(expenses_dataframe: pandas.DataFrame, categories: list, remaining_goal: float) -> (dict, float):
+def reduce_expenses(expenses_dataframe: pandas.DataFrame, categories: list, remaining_goal: float,
+                    max_percentages: Optional[dict] = None) -> (dict, float):
     """
     Reduces expenses for the given categories in steps to meet the savings goal.
 
@@ -87,77 +99,261 @@ def reduce_expenses(expenses_dataframe: pandas.DataFrame, categories: list, rema
     - expenses_dataframe (pandas.DataFrame): DataFrame with expense categories as index and values as amounts.
     - categories (list): List of categories to attempt reductions on.
     - remaining_goal (float): The amount needed to meet the savings goal.
+    - max_percentages (dict): The most each category may be reduced, 100 for the categories not in it.
 
     Returns:
     - dict: A dictionary with cumulative reduction percentages for each category.
     - float: Updated remaining goal after reductions.
     """
     reduction_percentages = {category: 0 for category in categories}
+    max_percentages = {category: (max_percentages or {}).get(category, 100) for category in categories}
 
-    while remaining_goal > 0 and any(reduction_percentages[category] < 100 for category in categories if category in expenses_dataframe.index):
+    while remaining_goal > GOAL_TOLERANCE and any(reduction_percentages[category] < max_percentages[category] for category in categories if category in expenses_dataframe.index):
         for category in categories:
-            if remaining_goal <= 0:
+            if remaining_goal <= GOAL_TOLERANCE:
                 break
             if category in expenses_dataframe:
                 # Calculate reduction amount and apply reduction
                 current_amount = expenses_dataframe[category]
                 reduction_amount = calculate_reduction_amount(current_amount, REDUCTION_STEP)
-                actual_reduction = apply_reduction(expenses_dataframe, category, reduction_amount, reduction_percentages)
+                actual_reduction = apply_reduction(expenses_dataframe, category, reduction_amount, reduction_percentages, max_percentages[category])
                 remaining_goal -= actual_reduction
 
-        if all(reduction_percentages[category] >= 100 for category in categories if category in expenses_dataframe.index):   # Check if all categories have reached 100% reduction
+        if all(reduction_percentages[category] >= max_percentages[category] for category in categories if category in expenses_dataframe.index):   # Check if all categories have reached their maximum reduction
             break
 
     return reduction_percentages, remaining_goal
 
-def calculate_savings_reductions(expenses_dataframe: pandas.DataFrame, savings_goal: float) -> (list, dict):
+def reduce_expenses_closed_form(expenses_dataframe: pandas.DataFrame, categories: list, remaining_goal: float,
+                                max_percentages: Optional[dict] = None) -> (dict, float):
+    """
+    Computes the result of reduce_expenses directly instead of stepping REDUCTION_STEP at a time.
+
+    The result matches reduce_expenses within REDUCTION_TOLERANCE percentage points and runs in
+    O(categories) time no matter how big the goal is.
+
+    Parameters:
+    - expenses_dataframe (pandas.DataFrame): DataFrame with expense categories as index and values as amounts.
+    - categories (list): List of categories to attempt reductions on, in reduction order.
+    - remaining_goal (float): The amount needed to meet the savings goal.
+    - max_percentages (dict): The most each category may be reduced, 100 for the categories not in it.
+
+    Returns:
+    - dict: A dictionary with cumulative reduction percentages for each category.
+    - float: Updated remaining goal after reductions.
+    """
+    reduction_percentages = {category: 0 for category in categories}
+    present_categories = [category for category in categories if category in expenses_dataframe.index]
+    if not present_categories:
+        return reduction_percentages, remaining_goal
+
+    amounts = numpy.array([[expenses_dataframe[category] for category in present_categories]], dtype=float)
+    category_max_percentages = numpy.array([(max_percentages or {}).get(category, 100) for category in present_categories], dtype=float)
+    percentages, remaining_goals = calculate_reduction_matrix(amounts, numpy.array([remaining_goal], dtype=float),
+                                                              max_percentages=category_max_percentages)
+    for category, percentage in zip(present_categories, percentages[0]):
+        reduction_percentages[category] = float(percentage)
+
+    return reduction_percentages, float(remaining_goals[0])
+
+
+def calculate_reduction_matrix(amounts: numpy.ndarray, goals: numpy.ndarray, reduction_step: float = REDUCTION_STEP,
+                               max_percentages: Optional[numpy.ndarray] = None) -> (numpy.ndarray, numpy.ndarray):
+    """
+    Solves the round robin reduction of reduce_expenses for many rows of expenses at once.
+
+    Every pass reduces each category by reduction_step percent of its amount, in column order,
+    until the goal is met or every category is reduced as much as it may be. The amount saved
+    after every number of passes is one matrix product, which gives the last pass directly.
+
+    Parameters:
+    - amounts (numpy.ndarray): rows x categories matrix of expense amounts, in reduction order.
+    - goals (numpy.ndarray): the amount each row needs to save.
+    - reduction_step (float): percentage reduced from a category in each pass.
+    - max_percentages (numpy.ndarray): the most each category may be reduced, 100 for all if None.
+
+    Returns:
+    - numpy.ndarray: rows x categories matrix of reduction percentages.
+    - numpy.ndarray: remaining goal of each row after the reductions.
+    """
+    amounts = numpy.asarray(amounts, dtype=float)
+    goals = numpy.asarray(goals, dtype=float)
+    if max_percentages is None:
+        max_percentages = numpy.full(amounts.shape[1], 100.0)
+    max_percentages = numpy.clip(numpy.asarray(max_percentages, dtype=float), 0, 100)
+    passes_count = int(numpy.ceil(max_percentages.max(initial=0) / reduction_step))
+
+    # Reduction of every category after 0 to passes_count passes, and the amount each row saved by then
+    pass_percentages = numpy.minimum(numpy.arange(passes_count + 1)[:, None] * reduction_step, max_percentages)
+    saved_after_passes = amounts @ pass_percentages.T / 100
+
+    # Number of passes that start, a pass starts while the goal is not met yet
+    started_passes = numpy.minimum((saved_after_passes[:, 1:] < goals[:, None] - GOAL_TOLERANCE).sum(axis=1) + 1, passes_count)
+    started_passes = numpy.where((goals > GOAL_TOLERANCE) & (saved_after_passes[:, -1] > 0), started_passes, 0)
+
+    # Every pass before the last one is complete, the last one stops once the goal is met
+    full_passes = numpy.maximum(started_passes - 1, 0)
+    full_percentages = pass_percentages[full_passes]
+    last_percentages = pass_percentages[started_passes]
+    goal_before_last_pass = goals - saved_after_passes[numpy.arange(len(goals)), full_passes]
+    last_pass_amounts = amounts * (last_percentages - full_percentages) / 100
+    reduced_before_category = numpy.cumsum(last_pass_amounts, axis=1) - last_pass_amounts
+    in_last_pass = goal_before_last_pass[:, None] - reduced_before_category > GOAL_TOLERANCE
+
+    percentages = numpy.where(in_last_pass, last_percentages, full_percentages)
+    percentages = numpy.where(amounts > 0, percentages, 0)
+    remaining_goals = goals - (amounts * percentages / 100).sum(axis=1)
+    return percentages, remaining_goals
+
+
+REDUCTION_METHODS = {
+    'iterative': reduce_expenses,
+    'closed_form': reduce_expenses_closed_form,
+}
+
+
+def calculate_savings_reductions(expenses_dataframe: pandas.DataFrame, savings_goal: float, method: str = 'closed_form',
+                                 rules: Optional[BudgetRules] = None, recurring_transactions: Optional[pandas.DataFrame] = None) -> (list, dict):
     """
-    Provides recommendations to reduce expenses and meet a savings goal by reducing non-essential
-    and then essential categories if needed.
+    Provides recommendations to reduce expenses and meet a savings goal by reducing the categories
+    of the first tier of the budget rules, such as non-essential ones, and then the next tiers if needed.
 
     Parameters:
     - expenses_dataframe (pandas.DataFrame): DataFrame with expense categories as index and values as amounts.
     - income (float): Monthly income.
     - savings_goal (float): The target amount to save.
+    - method (str): 'closed_form' to compute the reductions directly, or 'iterative' to step
+      REDUCTION_STEP at a time like reduce_expenses.
+    - rules (BudgetRules): the budget rules, the rules of BUDGET_RULES_PATH if None.
+    - recurring_transactions (pandas.DataFrame): recurring charges, such as find_recurring_transactions
+      returns. The charges of the first tier are cut as a Recurring category of their own.
 
     Returns:
     - list of str: List of recommendations for expense reductions.
-    - dict of percentage reductions in non_essential_categories.
-    - dict of percentage reductions in essential_categories.
+    - dict of percentage reductions of every category of the tiers that were reduced.
     """
-    essential_reductions = {}
-    non_essential_reductions = {}
     try:
-        essential_categories = ['Utilities', 'Transport', 'Rent', 'Groceries',  'Healthcare', ]
-        non_essential_categories = ['Entertainment', 'Dining']
+        reduce_function = REDUCTION_METHODS[method]
+        rules = load_budget_rules() if rules is None else rules
+        candidate_charges = None
+        if recurring_transactions is not None and has_recurring_category(expenses_dataframe, rules):
+            logging.info(f"The category {RECURRING_CATEGORY} already exists, the recurring charges stay in their categories.")
+        elif recurring_transactions is not None:
+            candidate_charges = find_candidate_charges(recurring_transactions, rules)
+            expenses_dataframe, rules = get_recurring_candidates(expenses_dataframe, recurring_transactions, rules)
+        max_percentages = dict(zip(rules.categories, get_max_reduction_percentages(rules)))
         recommendations = []
+        reductions = {}
         remaining_goal = savings_goal
 
-        non_essential_reductions, remaining_goal = reduce_expenses(
-            expenses_dataframe, non_essential_categories, remaining_goal
-        )
-        for category, reduction_percentage in non_essential_reductions.items():
-            if reduction_percentage > 0:
-                amount = int((expenses_dataframe[category] * reduction_percentage) / 100)
-                recommendations.append(f"Reduce {category} expenses by {reduction_percentage:.1f}% to save {amount}.")
-
-        if remaining_goal > 1:
-            essential_reductions, remaining_goal = reduce_expenses(
-                expenses_dataframe, essential_categories, remaining_goal
+        for tier_index, tier_categories in enumerate(get_tier_categories(rules)):
+            if tier_index > 0 and remaining_goal <= 1: # The next tiers are reduced only if more than 1 is missing
+                break
+
+            tier_reductions, remaining_goal = reduce_function(
+                expenses_dataframe, tier_categories, remaining_goal, max_percentages
             )
-            for category, reduction_percentage in essential_reductions.items():
+            for category, reduction_percentage in tier_reductions.items():
                 if reduction_percentage > 0:
                     amount = int((expenses_dataframe[category] * reduction_percentage) / 100)
-                    recommendations.append(f"Reduce {category} expenses by {reduction_percentage:.1f}% to save {amount} and meet you goal.")
+                    if category == RECURRING_CATEGORY and candidate_charges is not None:
+                        recommendations.append(f"Cut {reduction_percentage:.1f}% of your recurring charges to save {amount}, "
+                                               f"such as {describe_recurring_charges(candidate_charges)}.")
+                    elif tier_index == 0:
+                        recommendations.append(f"Reduce {category} expenses by {reduction_percentage:.1f}% to save {amount}.")
+                    else:
+                        recommendations.append(f"Reduce {category} expenses by {reduction_percentage:.1f}% to save {amount} and meet you goal.")
+            reductions |= tier_reductions
 
-        if remaining_goal > 0:
+        if remaining_goal > GOAL_TOLERANCE:
             recommendations.append(f"Even with reductions, the savings goal could not be fully met. Additional savings of ${remaining_goal:.2f} are needed.")
 
-        reductions = non_essential_reductions | essential_reductions
         return recommendations, reductions
     
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         return None, None
-    
-    
+
+
+def calculate_savings_reductions_batch(expenses_dataframe: pandas.DataFrame, savings_goals,
+                                       rules: Optional[BudgetRules] = None) -> (pandas.DataFrame, numpy.ndarray):
+    """
+    Evaluates many savings goals at once, with the same priorities as calculate_savings_reductions.
+
+    All the goals are solved together with numpy broadcasting, the first tier first and
+    the next tiers only for the goals that are still not met.
+
+    Parameters:
+    - expenses_dataframe (pandas.DataFrame): DataFrame with expense categories as index and values as amounts.
+    - savings_goals (array like): the target amounts to save.
+    - rules (BudgetRules): the budget rules, the rules of BUDGET_RULES_PATH if None.
+
+    Returns:
+    - pandas.DataFrame: goals x categories reduction percentages, indexed by goal.
+    - numpy.ndarray: the amount still missing for each goal after the reductions.
+    """
+    rules = load_budget_rules() if rules is None else rules
+    goals = numpy.asarray(savings_goals, dtype=float)
+    amounts = expenses_dataframe.reindex(rules.categories, fill_value=0).to_numpy(dtype=float)
+    percentages, remaining_goals = calculate_tiered_reduction_matrix(numpy.broadcast_to(amounts, (len(goals), len(amounts))), goals, rules)
+    reductions = pandas.DataFrame(percentages, index=pandas.Index(goals, name='Goal'), columns=list(rules.categories))
+    return reductions, remaining_goals
+
+
+def calculate_tiered_reduction_matrix(amounts: numpy.ndarray, goals: numpy.ndarray, rules: Optional[BudgetRules] = None) -> (numpy.ndarray, numpy.ndarray):
+    """
+    Reduces the categories of every tier of the budget rules in turn for many rows of expenses at once.
+
+    Parameters:
+    - amounts (numpy.ndarray): rows x categories matrix of expense amounts, with the columns
+      ordered as the categories of the rules.
+    - goals (numpy.ndarray): the amount each row needs to save.
+    - rules (BudgetRules): the budget rules, the rules of BUDGET_RULES_PATH if None.
+
+    Returns:
+    - numpy.ndarray: rows x categories matrix of reduction percentages.
+    - numpy.ndarray: remaining goal of each row after the reductions.
+    """
+    rules = load_budget_rules() if rules is None else rules
+    amounts = numpy.asarray(amounts, dtype=float)
+    remaining_goals = numpy.asarray(goals, dtype=float)
+    max_percentages = get_max_reduction_percentages(rules)
+    percentages = numpy.zeros(amounts.shape)
+
+    for tier_index, tier in enumerate(numpy.unique(rules.tiers)):
+        tier_columns = rules.tiers == tier
+        # Like calculate_savings_reductions, the next tiers are reduced only if more than 1 is missing
+        tier_goals = remaining_goals if tier_index == 0 else numpy.where(remaining_goals > 1, remaining_goals, 0)
+        percentages[:, tier_columns], tier_remaining = calculate_reduction_matrix(
+            amounts[:, tier_columns], tier_goals, max_percentages=max_percentages[tier_columns]
+        )
+        remaining_goals = numpy.where(tier_goals > 0, tier_remaining, remaining_goals)
+
+    return percentages, remaining_goals
+
+
+def calculate_savings_goals_curve(expenses_dataframe: pandas.DataFrame, max_goal: float, points: int = SAVINGS_CURVE_POINTS,
+                                  recurring_transactions: Optional[pandas.DataFrame] = None) -> pandas.DataFrame:
+    """
+    Builds the savings that the recommended reductions reach for goals from 0 to max_goal.
+
+    Parameters:
+    - expenses_dataframe (pandas.DataFrame): DataFrame with expense categories as index and values as amounts.
+    - max_goal (float): the biggest goal on the curve.
+    - points (int): number of goals on the curve.
+    - recurring_transactions (pandas.DataFrame): recurring charges cut like calculate_savings_reductions does.
+
+    Returns:
+    - pandas.DataFrame: Goal, Savings and Remaining Goal columns, one row per goal.
+    """
+    goals = numpy.linspace(0, max_goal, points)
+    rules = load_budget_rules()
+    if recurring_transactions is not None:
+        expenses_dataframe, rules = get_recurring_candidates(expenses_dataframe, recurring_transactions, rules)
+    reductions, remaining_goals = calculate_savings_reductions_batch(expenses_dataframe, goals, rules)
+    amounts = numpy.array([expenses_dataframe[category] if category in expenses_dataframe.index else 0 for category in reductions.columns], dtype=float)
+    return pandas.DataFrame({
+        'Goal': goals,
+        'Savings': reductions.to_numpy() @ amounts / 100,
+        'Remaining Goal': numpy.maximum(remaining_goals, 0),
+    })
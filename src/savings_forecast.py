@@ -0,0 +1,88 @@
+import logging
+import numpy
+import pandas
+from typing import Optional
+from src.category_month_cube import CategoryMonthCube
+from src.config import configure_logging, FORECAST_MONTHS, FORECAST_SEED, FORECAST_SIMULATIONS
+
+configure_logging() # Initialize logging
+
+WITHOUT_REDUCTIONS = 'Without reductions'
+WITH_REDUCTIONS = 'With reductions'
+SAVINGS_PERCENTILES = {'Savings P5': 5, 'Savings Median': 50, 'Savings P95': 95}
+
+# Every simulated month is a month of the history drawn at random with all its categories
+# and its income together, so the months keep the mix of spending and income they had.
+# Reductions scale the expenses of a category, so the net of every history month with and
+# without the reductions is computed once, and a path only sums the nets of its months.
+
+
+def get_monthly_nets(cube: CategoryMonthCube, reductions: Optional[dict] = None) -> numpy.ndarray:
+    """Returns the income minus the expenses of every month of the history, before and after the reductions.
+
+    Args:
+        cube as CategoryMonthCube of the transactions
+        reductions as dict of reduction percentages by category, such as calculate_savings_reductions returns
+
+    Returns:
+        numpy.ndarray: 2 x months, the nets without and with the reductions.
+    """
+    reduction_percentages = pandas.Series(reductions or {}, dtype=float).reindex(cube.categories, fill_value=0).to_numpy()
+    saved_expenses = (reduction_percentages / 100) @ cube.expenses # Expenses every month no longer has with the reductions
+    nets = cube.month_income - cube.month_expenses
+    return numpy.vstack([nets, nets + saved_expenses])
+
+
+def simulate_savings(monthly_nets: numpy.ndarray, simulations: int = FORECAST_SIMULATIONS, months: int = FORECAST_MONTHS,
+                     seed: Optional[int] = FORECAST_SEED) -> numpy.ndarray:
+    """Simulates the savings of future paths of months drawn from the history.
+
+    Every scenario uses the same drawn months, so the difference between scenarios is only their nets.
+
+    Args:
+        monthly_nets as numpy.ndarray of scenarios x history months
+        simulations as the number of paths
+        months as the number of months of every path
+        seed as the seed of the random generator, None for a different draw every run
+
+    Returns:
+        numpy.ndarray: scenarios x simulations of the savings at the end of every path.
+    """
+    generator = numpy.random.default_rng(seed)
+    drawn_months = generator.integers(0, monthly_nets.shape[1], size=(simulations, months))
+    return monthly_nets[:, drawn_months].sum(axis=2)
+
+
+def forecast_savings(cube: Optional[CategoryMonthCube], monthly_savings_goal: float, reductions: Optional[dict] = None,
+                     simulations: int = FORECAST_SIMULATIONS, months: int = FORECAST_MONTHS,
+                     seed: Optional[int] = FORECAST_SEED) -> Optional[pandas.DataFrame]:
+    """Projects the savings of the next months and the probability of reaching the savings goal.
+
+    Args:
+        cube as CategoryMonthCube of the transactions
+        monthly_savings_goal as the amount to save every month
+        reductions as dict of reduction percentages by category, None for no reductions
+        simulations, months and seed as for simulate_savings
+
+    Returns:
+        pandas.DataFrame indexed by scenario, without and with the reductions, with Goal, Probability,
+        Savings P5, Savings Median and Savings P95 columns. None if the transactions have no dated months.
+    """
+    try:
+        if cube is None or len(cube.months) == 0:
+            return None
+
+        savings = simulate_savings(get_monthly_nets(cube, reductions), simulations, months, seed)
+        goal = monthly_savings_goal * months
+        forecast = pandas.DataFrame({
+            'Goal': goal,
+            'Probability': (savings >= goal).mean(axis=1),
+        }, index=pandas.Index([WITHOUT_REDUCTIONS, WITH_REDUCTIONS], name='Scenario'))
+        percentiles = numpy.percentile(savings, list(SAVINGS_PERCENTILES.values()), axis=1)
+        for column, column_percentiles in zip(SAVINGS_PERCENTILES, percentiles):
+            forecast[column] = column_percentiles
+        return forecast
+
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+        return None
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy
+import pandas
+from typing import Optional
+from src.config import (
+    configure_logging,
+    TRANSACTIONS_CACHE_DIRECTORY,
+    TRANSACTIONS_CACHE_HASH_CONTENT,
+    TRANSACTIONS_CACHE_MAX_BYTES,
+)
+
+configure_logging() # Initialize logging
+
+CACHE_FORMAT_VERSION = 1
+METADATA_FILE_NAME = "columns.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def get_cache_key(filepath: str, hash_content: bool = TRANSACTIONS_CACHE_HASH_CONTENT) -> str:
+    """Builds the cache key of a transactions file from its path, size and modification time.
+
+    Args:
+        filepath (str): path to the transactions file.
+        hash_content (bool): also hash the file content, for files that can change
+                             without changing their size or modification time.
+
+    Returns:
+        str: hex digest identifying this version of the file.
+    """
+    file_stat = os.stat(filepath)
+    key_parts = [os.path.abspath(filepath), str(file_stat.st_size), str(file_stat.st_mtime_ns), str(CACHE_FORMAT_VERSION)]
+    if hash_content:
+        content_hash = hashlib.sha256()
+        with open(filepath, 'rb') as transactions_file:
+            for block in iter(lambda: transactions_file.read(HASH_BLOCK_SIZE), b''):
+                content_hash.update(block)
+        key_parts.append(content_hash.hexdigest())
+
+    return hashlib.sha256("|".join(key_parts).encode()).hexdigest()
+
+
+def encode_transactions(data: pandas.DataFrame) -> (dict, dict):
+    """Converts validated transactions to one numpy array per column.
+
+    Date is stored as int64 nanoseconds, numeric columns keep their dtype and
+    text columns such as Category are stored as dictionary codes.
+
+    Returns:
+        dict: column arrays by file name.
+        dict: metadata needed to rebuild the DataFrame.
+    """
+    arrays = {'index.npy': numpy.asarray(data.index, dtype=numpy.int64)}
+    columns = []
+    for position, column in enumerate(data.columns):
+        values = data[column]
+        file_name = f"{position}.npy"
+        column_metadata = {'name': column, 'file': file_name}
+        if column == 'Date' or pandas.api.types.is_datetime64_any_dtype(values):
+            dates = pandas.to_datetime(values, errors='coerce', format='mixed')
+            arrays[file_name] = dates.to_numpy(dtype='datetime64[ns]').view(numpy.int64)
+            column_metadata['kind'] = 'datetime'
+        elif column == 'Amount' or pandas.api.types.is_numeric_dtype(values):
+            arrays[file_name] = pandas.to_numeric(values).to_numpy()
+            column_metadata['kind'] = 'numeric'
+        else:
+            codes, categories = pandas.factorize(values)
+            arrays[file_name] = codes.astype(numpy.int32)
+            column_metadata['kind'] = 'dictionary'
+            column_metadata['categories'] = categories.tolist()
+        columns.append(column_metadata)
+
+    return arrays, {'version': CACHE_FORMAT_VERSION, 'columns': columns}
+
+
+def decode_transactions(arrays: dict, metadata: dict) -> pandas.DataFrame:
+    """Rebuilds the transactions DataFrame from the column arrays of encode_transactions."""
+    data = {}
+    for column_metadata in metadata['columns']:
+        values = arrays[column_metadata['file']]
+        if column_metadata['kind'] == 'datetime':
+            data[column_metadata['name']] = values.view('datetime64[ns]')
+        elif column_metadata['kind'] == 'dictionary':
+            data[column_metadata['name']] = pandas.Categorical.from_codes(values, column_metadata['categories'])
+        else:
+            data[column_metadata['name']] = values
+
+    return pandas.DataFrame(data, index=pandas.Index(arrays['index.npy']), copy=False)
+
+
+def load_cached_transactions(filepath: str, cache_directory: str = TRANSACTIONS_CACHE_DIRECTORY) -> Optional[pandas.DataFrame]:
+    """Loads the validated transactions of a file from the cache, memory mapping its columns.
+
+    Returns:
+        DataFrame if the file is cached, None if not.
+    """
+    try:
+        entry_directory = os.path.join(cache_directory, get_cache_key(filepath))
+        metadata_path = os.path.join(entry_directory, METADATA_FILE_NAME)
+        if not os.path.exists(metadata_path):
+            return None
+
+        with open(metadata_path) as metadata_file:
+            metadata = json.load(metadata_file)
+        file_names = ['index.npy'] + [column['file'] for column in metadata['columns']]
+        arrays = {name: numpy.load(os.path.join(entry_directory, name), mmap_mode='r') for name in file_names}
+        os.utime(metadata_path) # Mark the entry as recently used for eviction
+        logging.info(f"Loaded {filepath} from the transactions cache.")
+        return decode_transactions(arrays, metadata)
+
+    except Exception as e:
+        logging.error(f"Could not read the transactions cache: {e}")
+        return None
+
+
+def save_cached_transactions(filepath: str, data: pandas.DataFrame, cache_directory: str = TRANSACTIONS_CACHE_DIRECTORY,
+                             max_bytes: int = TRANSACTIONS_CACHE_MAX_BYTES) -> pandas.DataFrame:
+    """Stores validated transactions in the cache.
+
+    The entry is written to a temporary directory and renamed into place, so a
+    process never sees a half written entry. When two processes cache the same
+    file, the first rename wins and the other copy is discarded.
+
+    Returns:
+        DataFrame: the transactions as they will be loaded from the cache.
+    """
+    arrays, metadata = encode_transactions(data)
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        entry_directory = os.path.join(cache_directory, get_cache_key(filepath))
+        temporary_directory = tempfile.mkdtemp(prefix='.tmp-', dir=cache_directory)
+        for name, values in arrays.items():
+            numpy.save(os.path.join(temporary_directory, name), values)
+        with open(os.path.join(temporary_directory, METADATA_FILE_NAME), 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+
+        try:
+            os.rename(temporary_directory, entry_directory)
+        except OSError:
+            shutil.rmtree(temporary_directory, ignore_errors=True) # Another process cached it first
+
+        evict_cached_transactions(cache_directory, max_bytes)
+
+    except Exception as e:
+        logging.error(f"Could not write the transactions cache: {e}")
+
+    return decode_transactions(arrays, metadata)
+
+
+def evict_cached_transactions(cache_directory: str = TRANSACTIONS_CACHE_DIRECTORY, max_bytes: int = TRANSACTIONS_CACHE_MAX_BYTES) -> None:
+    """Removes the least recently used cache entries until the cache fits in max_bytes."""
+    entries = []
+    for entry_name in os.listdir(cache_directory):
+        entry_directory = os.path.join(cache_directory, entry_name)
+        metadata_path = os.path.join(entry_directory, METADATA_FILE_NAME)
+        if entry_name.startswith('.') or not os.path.exists(metadata_path):
+            continue
+        entry_size = sum(entry.stat().st_size for entry in os.scandir(entry_directory))
+        entries.append((os.path.getmtime(metadata_path), entry_size, entry_directory))
+
+    total_size = sum(entry_size for _, entry_size, _ in entries)
+    for _, entry_size, entry_directory in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        shutil.rmtree(entry_directory, ignore_errors=True)
+        total_size -= entry_size
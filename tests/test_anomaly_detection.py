@@ -0,0 +1,73 @@
+import numpy
+import pandas
+import pytest
+from src.anomaly_detection import AnomalyDetector, detect_anomalies, stream_anomalies
+from src.data_loader import compact_transactions
+
+
+@pytest.fixture
+def sample_data():
+    generator = numpy.random.default_rng(0)
+    rows = 3000
+    categories = generator.choice(['Groceries', 'Dining', 'Rent'], size=rows)
+    amounts = -numpy.round(numpy.where(categories == 'Rent', 1500, 60) * generator.normal(1, 0.05, size=rows), 2)
+    amounts[[500, 1700, 2900]] *= 20 # Three unusual transactions
+    return pandas.DataFrame({
+        'Date': pandas.date_range('2022-01-01', periods=rows, freq='6h').strftime('%Y-%m-%d'),
+        'Category': categories,
+        'Amount': amounts,
+    })
+
+
+def find_anomalies_one_by_one(data, window=30, z_threshold=4.0, min_history=10):
+    """Checks every row against the rows before it, the slow way."""
+    flagged = []
+    history = {}
+    for index, category, amount in data[['Category', 'Amount']].itertuples():
+        recent = numpy.array(history.setdefault(category, [])[-window:])
+        if len(recent) >= min_history:
+            deviation = max(recent.std(), abs(recent.mean()) * 0.01)
+            if abs(amount - recent.mean()) / deviation > z_threshold:
+                flagged.append(index)
+        history[category].append(amount)
+    return flagged
+
+
+def test_detect_anomalies_flags_the_unusual_transactions(sample_data):
+    anomalies = detect_anomalies(sample_data)
+    assert list(anomalies.index) == [500, 1700, 2900]
+    assert list(anomalies.columns) == ['Date', 'Category', 'Amount', 'Expected', 'ZScore']
+    assert (anomalies['ZScore'] < -4).all()
+
+
+def test_detect_anomalies_matches_one_by_one(sample_data):
+    sample_data.loc[::97, 'Amount'] *= 3 # More flags, and more rows right after a flagged one
+    assert list(detect_anomalies(sample_data, chunk_size=10_000).index) == find_anomalies_one_by_one(sample_data)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 250, 2999])
+def test_chunks_give_the_same_anomalies(sample_data, chunk_size):
+    pandas.testing.assert_frame_equal(detect_anomalies(sample_data, chunk_size=chunk_size), detect_anomalies(sample_data, chunk_size=10_000))
+
+
+def test_detect_anomalies_on_compact_transactions(sample_data):
+    anomalies = detect_anomalies(compact_transactions(sample_data))
+    assert list(anomalies.index) == [500, 1700, 2900]
+    assert anomalies['Amount'].tolist() == pytest.approx(sample_data.loc[[500, 1700, 2900], 'Amount'].tolist())
+
+
+def test_missing_amounts_are_skipped(sample_data):
+    sample_data.loc[100, 'Amount'] = numpy.nan
+    assert list(detect_anomalies(sample_data).index) == [500, 1700, 2900]
+
+
+def test_detector_keeps_only_the_last_window():
+    detector = AnomalyDetector(window=5)
+    detector.update(pandas.DataFrame({'Date': ['2024-01-01'] * 8, 'Category': ['Rent'] * 8, 'Amount': numpy.arange(1.0, 9.0)}))
+    assert detector.recent_amounts['Rent'].tolist() == [4, 5, 6, 7, 8]
+
+
+def test_stream_anomalies(sample_data, tmp_path):
+    filepath = tmp_path / "transactions.csv"
+    sample_data.to_csv(filepath, index=False)
+    assert list(stream_anomalies(str(filepath), chunk_size=400).index) == [500, 1700, 2900]
@@ -0,0 +1,70 @@
+import os
+import pandas
+import pytest
+from UI.batch_runner import BatchJob, read_jobs_manifest, run_batch_job, start_batch
+
+
+@pytest.fixture(autouse=True)
+def working_directory(tmp_path, monkeypatch):
+    """Runs every test in its own directory, so the transactions and reports caches are not written to the repository."""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def manifest_file(tmp_path):
+    pandas.DataFrame({
+        'Date': ['2024-01-01', '2024-01-05', '2024-02-01'],
+        'Category': ['Salary', 'Groceries', 'Rent'],
+        'Amount': [5000, -200, -1500]
+    }).to_csv(tmp_path / "january.csv", index=False)
+    manifest_path = tmp_path / "jobs.csv"
+    manifest_path.write_text("transactions_file,saving_goal\njanuary.csv,4000\nmissing.csv,0\n")
+    return str(manifest_path)
+
+
+def test_read_jobs_manifest(tmp_path, manifest_file):
+    jobs = read_jobs_manifest(manifest_file, str(tmp_path / "out"))
+    assert [job.name for job in jobs] == ["00001_january", "00002_missing"]
+    assert jobs[0].transactions_file == str(tmp_path / "january.csv")
+    assert jobs[0].saving_goal == 4000
+    assert jobs[0].output_directory == str(tmp_path / "out" / "00001_january")
+
+
+def test_read_jobs_manifest_saving_goals(tmp_path):
+    manifest_path = tmp_path / "jobs.csv"
+    manifest_path.write_text("transactions_file,saving_goal\njanuary.csv,1500.50\nfebruary.csv,abc\n")
+    jobs = read_jobs_manifest(str(manifest_path), str(tmp_path / "out"))
+    assert jobs[0].saving_goal == 1500.5 and jobs[0].error == ""
+    assert "invalid saving_goal: abc" in jobs[1].error
+    result = run_batch_job(jobs[1], retries=2, backoff_seconds=0)
+    assert (result['status'], result['attempts'], result['error']) == ('failed', 0, jobs[1].error)
+
+
+def test_run_batch_job_writes_to_its_own_directory(tmp_path, manifest_file):
+    job = read_jobs_manifest(manifest_file, str(tmp_path / "out"))[0]
+    result = run_batch_job(job, retries=0)
+    assert result['status'] == 'succeeded'
+    assert result['attempts'] == 1
+    assert sorted(os.listdir(job.output_directory)) == [
+        'Sort_data_by_expense_categories.pdf', 'monthly_summary.pdf', 'recommendation_report.pdf'
+    ]
+
+
+def test_run_batch_job_retries_failures(tmp_path, monkeypatch):
+    calls = []
+    def failing_process(transactions_filepath, saving_goal, output_directory):
+        calls.append(transactions_filepath)
+        raise RuntimeError("disk full")
+    monkeypatch.setattr('UI.console_ui.run_smart_financial_process', failing_process)
+    result = run_batch_job(BatchJob("job", "file.csv", 0, str(tmp_path)), retries=2, backoff_seconds=0)
+    assert result['status'] == 'failed'
+    assert result['attempts'] == 3
+    assert result['error'] == "disk full"
+    assert len(calls) == 3
+
+
+def test_start_batch_writes_summary(tmp_path, manifest_file):
+    output_root = str(tmp_path / "out")
+    assert start_batch(manifest_file, output_root, max_workers=2, retries=0) is False
+    summary = pandas.read_csv(os.path.join(output_root, "batch_summary.csv"))
+    assert summary['status'].tolist() == ['succeeded', 'no data']
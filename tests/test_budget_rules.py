@@ -0,0 +1,90 @@
+import json
+import numpy
+import pandas
+import pytest
+from src.budget_rules import get_tier_categories, load_budget_rules, read_budget_rules
+from src.multi_user_engine import analyze_users
+from src.saving_recommendations import (
+    calculate_savings_reductions,
+    calculate_savings_reductions_batch,
+    find_categories_exceeding_average,
+    REDUCTION_TOLERANCE,
+)
+
+
+@pytest.fixture
+def expenses():
+    return pandas.Series({'Rent': 3000, 'Dining': 800, 'Gym': 300, 'Groceries': 500}, name='Amount')
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    rules = {'rules': [
+        {'category': 'Rent', 'target_percentage': 30, 'tier': 2, 'floor_percentage': 80},
+        {'category': 'Gym', 'target_percentage': None, 'tier': 1},
+        {'category': 'Dining', 'target_percentage': 5, 'tier': 1, 'floor_percentage': 50},
+        {'category': 'Groceries', 'target_percentage': 10, 'tier': 2},
+    ]}
+    path = tmp_path / "budget_rules.json"
+    path.write_text(json.dumps(rules))
+    return str(path)
+
+
+def test_read_budget_rules_orders_categories_by_tier(rules_path):
+    rules = read_budget_rules(rules_path)
+    assert list(rules.categories) == ['Gym', 'Dining', 'Rent', 'Groceries']
+    assert get_tier_categories(rules) == [['Gym', 'Dining'], ['Rent', 'Groceries']]
+    assert numpy.isnan(rules.target_percentages[0])
+    assert list(rules.floor_percentages) == [0, 50, 80, 0]
+
+
+def test_load_budget_rules_reads_the_file_once(rules_path):
+    assert load_budget_rules(rules_path) is load_budget_rules(rules_path)
+
+
+def test_read_budget_rules_rejects_duplicate_categories(tmp_path):
+    path = tmp_path / "budget_rules.json"
+    path.write_text(json.dumps({'rules': [{'category': 'Rent'}, {'category': 'Rent'}]}))
+    with pytest.raises(ValueError):
+        read_budget_rules(str(path))
+
+
+def test_find_categories_exceeding_average_with_rules(rules_path, expenses):
+    recommendations = find_categories_exceeding_average(expenses, 5000, read_budget_rules(rules_path))
+    assert len(recommendations) == 2
+    assert recommendations[0].startswith("It is recommended to reduce Rent expenses by 50.0%")
+    assert "Dining" in recommendations[1]
+
+
+def test_floors_limit_the_reductions(rules_path, expenses):
+    rules = read_budget_rules(rules_path)
+    goal = 1e6 # More than every category can save
+    _, expected_reductions = calculate_savings_reductions(expenses, goal, method='iterative', rules=rules)
+    assert expected_reductions == pytest.approx({'Gym': 100, 'Dining': 50, 'Rent': 20, 'Groceries': 100})
+
+    reductions, remaining_goals = calculate_savings_reductions_batch(expenses, [goal], rules)
+    for category, percentage in expected_reductions.items():
+        assert reductions.loc[goal, category] == pytest.approx(percentage, abs=REDUCTION_TOLERANCE)
+    assert remaining_goals[0] == pytest.approx(goal - (300 + 400 + 600 + 500))
+
+
+@pytest.mark.parametrize("goal", [0.0, 150.0, 700.0, 1000.0, 1250.0, 1799.0])
+def test_floors_closed_form_matches_iterative(rules_path, expenses, goal):
+    rules = read_budget_rules(rules_path)
+    expected = calculate_savings_reductions(expenses, goal, method='iterative', rules=rules)
+    recommendations, reductions = calculate_savings_reductions(expenses, goal, method='closed_form', rules=rules)
+    assert recommendations == expected[0]
+    assert reductions == pytest.approx(expected[1], abs=REDUCTION_TOLERANCE)
+
+
+def test_analyze_users_with_rules(rules_path):
+    data = pandas.DataFrame({
+        'UserId': ['alice'] * 3,
+        'Date': ['2024-01-01'] * 3,
+        'Category': ['Salary', 'Rent', 'Gym'],
+        'Amount': [5000, -3000, -300],
+    })
+    result = analyze_users(data, 10000, read_budget_rules(rules_path)).set_index('Category')
+    assert result.loc['Rent', 'GeneralReduction'] == pytest.approx(50)
+    assert result.loc['Gym', 'GeneralReduction'] == 0
+    assert result.loc['Rent', 'SavingsReduction'] == pytest.approx(20)
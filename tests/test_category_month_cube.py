@@ -0,0 +1,62 @@
+import numpy
+import pandas
+import pytest
+from src.category_month_cube import (
+    build_category_month_cube,
+    get_category_month_over_month,
+    get_category_rolling_averages,
+    get_expenses_by_category,
+    get_monthly_totals,
+    get_total_income_and_expenses,
+)
+from src.reports_generator import calculate_expenses_by_categories, calculate_monthly_summary
+
+
+@pytest.fixture
+def sample_data():
+    return pandas.DataFrame({
+        'Date': ['2024-01-01', '2024-01-05', '2024-01-20', '2024-03-01', '2024-03-02', None],
+        'Category': ['Salary', 'Groceries', 'Rent', 'Salary', 'Groceries', 'Dining'],
+        'Amount': [5000, -200, -1500, 5200, -300, -40]
+    })
+
+
+def test_cube_totals_match_the_transactions(sample_data):
+    cube = build_category_month_cube(sample_data)
+    expected = calculate_expenses_by_categories(sample_data)
+    assert get_expenses_by_category(cube).sort_index().to_dict() == expected.sort_index().to_dict()
+    total_income, total_expenses = get_total_income_and_expenses(cube)
+    summary = calculate_monthly_summary(sample_data)
+    assert (total_income, total_expenses) == (summary['Amount'][0], summary['Amount'][1])
+
+
+def test_cube_has_every_month(sample_data):
+    cube = build_category_month_cube(sample_data)
+    assert [str(month) for month in cube.months] == ['2024-01', '2024-02', '2024-03']
+    assert cube.expenses.shape == (len(cube.categories), 3)
+    assert get_expenses_by_category(cube, slice(2, 3)).to_dict() == {'Groceries': 300}
+
+
+def test_monthly_totals(sample_data):
+    monthly_totals = get_monthly_totals(build_category_month_cube(sample_data), rolling_months=2)
+    assert monthly_totals['Income'].tolist() == [5000, 0, 5200]
+    assert monthly_totals['Expenses'].tolist() == [1700, 0, 300]
+    assert monthly_totals['Net'].tolist() == [3300, 0, 4900]
+    assert monthly_totals['Net Change'].tolist()[1:] == [-3300, 4900]
+    assert monthly_totals['Expenses Rolling Average'].tolist() == [1700, 850, 150]
+
+
+def test_category_rolling_averages_and_changes(sample_data):
+    cube = build_category_month_cube(sample_data)
+    rolling_averages = get_category_rolling_averages(cube, rolling_months=3)
+    assert rolling_averages.loc['Groceries'].tolist() == [200, 100, pytest.approx(500 / 3)]
+    changes = get_category_month_over_month(cube)
+    assert numpy.isnan(changes.loc['Groceries'].iloc[0])
+    assert changes.loc['Groceries'].tolist()[1:] == [-200, 300]
+
+
+def test_cube_of_compact_transactions(sample_data):
+    from src.data_loader import compact_transactions
+    cube = build_category_month_cube(compact_transactions(sample_data))
+    assert get_total_income_and_expenses(cube) == (10200, 2040)
+    assert get_expenses_by_category(cube).to_dict() == {'Dining': 40, 'Groceries': 500, 'Rent': 1500}
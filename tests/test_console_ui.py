@@ -1,7 +1,9 @@
 import pytest
 import os
+import subprocess
+import sys
 from unittest.mock import patch
-from UI.console_ui import handle_monthly_savings_goal,get_user_transactions_file_name
+from UI.console_ui import handle_monthly_savings_goal,get_user_transactions_file_name, load_report_totals
 
 def test_handle_monthly_savings_goal_valid():
     with patch('builtins.input', side_effect=['100']):
@@ -23,4 +25,23 @@ def test_get_user_transactions_file_name_exit():
 def test_get_user_transactions_file_name_not_exists():
     with patch('builtins.input', side_effect=['invalid.csv', 'transactions.csv']), \
          patch('os.path.exists', side_effect=[False, True]):
-        assert get_user_transactions_file_name() == os.path.join(os.getcwd(), "data", "transactions.csv")
\ No newline at end of file
+        assert get_user_transactions_file_name() == os.path.join(os.getcwd(), "data", "transactions.csv")
+
+def test_menu_does_not_import_heavy_modules():
+    check = "import sys, main; print([m for m in ('pandas', 'matplotlib', 'requests') if m in sys.modules])"
+    result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "[]", "Heavy modules should be imported by the menu option that needs them."
+
+
+def test_load_report_totals_keeps_a_ledger_per_file(tmp_path, monkeypatch):
+    monkeypatch.setattr('UI.console_ui.INCREMENTAL_LEDGER', True)
+    monkeypatch.setattr('UI.console_ui.INCREMENTAL_LEDGER_DIRECTORY', str(tmp_path / "ledger"))
+    (tmp_path / "a.csv").write_text("Date,Category,Amount\n2024-01-01,Salary,1000\n2024-01-02,Rent,-300\n")
+    (tmp_path / "b.csv").write_text("Date,Category,Amount\n2024-01-01,Salary,50\n2024-01-03,Dining,-10\n")
+
+    load_report_totals(str(tmp_path / "a.csv"))
+    expenses, summary, *_ = load_report_totals(str(tmp_path / "b.csv"))
+    assert expenses.to_dict() == {'Dining': 10}, "The totals of b.csv should not include the rows of a.csv."
+    expenses, *_ = load_report_totals(str(tmp_path / "a.csv"))
+    assert expenses.to_dict() == {'Rent': 300}
@@ -1,7 +1,16 @@
+import asyncio
+import json
+import numpy
+import pandas
 import pytest
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
-from src.currency_exchange_rates import get_exchange_rates
+from urllib.parse import parse_qs, urlparse
+from src.currency_exchange_rates import get_exchange_rates, get_cross_rates, convert_transactions_currency, CrossRates, ExchangeRatesClient
 
 
 def test_get_exchange_rates_valid():
@@ -19,3 +28,265 @@ def test_get_exchange_rates_invalid_target_currency():
 def test_get_exchange_rates_invalid_amount():
     amount, error_message  = get_exchange_rates('USD', 'EUR', -1)
     assert amount is None and "amount must be greater that 0" in error_message 
+
+
+class RatesRequestHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the rates API, counting the requests it gets."""
+    requests_count = 0
+    delay_seconds = 0
+    failures_left = 0
+    rates = {'EUR': {'USD': 1.1, 'ILS': 4.0}, 'USD': {'EUR': 0.9, 'ILS': 3.6}}
+    historical_rates = {'2024-01-01': {'EUR': {'ILS': 4.0, 'USD': 1.1}}, '2024-01-02': {'EUR': {'ILS': 4.2, 'USD': 1.2}}}
+
+    def do_GET(self):
+        type(self).requests_count += 1
+        time.sleep(self.delay_seconds)
+        if self.failures_left > 0:
+            type(self).failures_left -= 1
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b'Internal Server Error')
+            return
+        url = urlparse(self.path)
+        rates_date = url.path.strip('/')
+        base_currency = parse_qs(url.query).get('base', ['EUR'])[0]
+        rates = self.rates if rates_date == 'latest' else self.historical_rates.get(rates_date, {})
+        if base_currency in rates:
+            status, body = 200, {'amount': 1.0, 'base': base_currency, 'date': rates_date, 'rates': rates[base_currency]}
+        else:
+            status, body = 404, {'message': 'not found'}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def rates_server():
+    RatesRequestHandler.requests_count = 0
+    RatesRequestHandler.delay_seconds = 0
+    RatesRequestHandler.failures_left = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RatesRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", RatesRequestHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_rates_client_caches_rates(rates_server):
+    url, handler = rates_server
+    client = ExchangeRatesClient(url, cache_directory=None)
+    assert client.get_rates('USD')['rates']['EUR'] == 0.9
+    assert client.get_rates('USD')['rates']['EUR'] == 0.9
+    assert handler.requests_count == 1, "The second lookup should be served from memory."
+
+
+def test_rates_client_refreshes_after_ttl(rates_server):
+    url, handler = rates_server
+    client = ExchangeRatesClient(url, ttl_seconds=0, cache_directory=None)
+    client.get_rates('USD')
+    time.sleep(0.01)
+    client.get_rates('USD')
+    assert handler.requests_count == 2
+
+
+def test_rates_client_disk_cache_survives_restart(rates_server, tmp_path):
+    url, handler = rates_server
+    ExchangeRatesClient(url, cache_directory=str(tmp_path)).get_rates('EUR')
+    assert ExchangeRatesClient(url, cache_directory=str(tmp_path)).get_rates('EUR')['rates']['USD'] == 1.1
+    assert handler.requests_count == 1, "A new client should read the rates from disk."
+
+
+def test_rates_client_disk_cache_only_names_currency_codes(rates_server, tmp_path):
+    url, handler = rates_server
+    cache_directory = tmp_path / "exchange_rates"
+    client = ExchangeRatesClient(url, cache_directory=str(cache_directory))
+    client.get_rates('EUR')
+    client.get_rates('../../EUR')
+    assert os.listdir(cache_directory) == ["EUR_latest.json"]
+    assert sorted(os.listdir(tmp_path)) == ["exchange_rates"], "No cache file should be written outside the cache directory."
+    assert 'YYYY-MM-DD' in client.get_rates('EUR', '../2024-01-01')['message']
+    assert handler.requests_count == 2
+
+
+def test_rates_client_single_flight(rates_server):
+    url, handler = rates_server
+    handler.delay_seconds = 0.2
+    client = ExchangeRatesClient(url, cache_directory=None)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(client.get_rates, ['USD'] * 10))
+    assert all(result['rates']['EUR'] == 0.9 for result in results)
+    assert handler.requests_count == 1, "Concurrent lookups of one currency should share one fetch."
+
+
+def test_rates_client_does_not_cache_errors(rates_server):
+    url, handler = rates_server
+    client = ExchangeRatesClient(url, cache_directory=None)
+    client.get_rates('abccc')
+    client.get_rates('abccc')
+    assert handler.requests_count == 2
+
+
+def test_get_exchange_rates_with_client(rates_server):
+    url, _ = rates_server
+    client = ExchangeRatesClient(url, cache_directory=None)
+    assert get_exchange_rates('EUR', 'ILS', 10, client) == (40.0, "")
+    amount, error_message = get_exchange_rates('abccc', 'EUR', 1, client)
+    assert amount is None and 'abccc' in error_message
+    amount, error_message = get_exchange_rates('USD', 'abccc', 1, client)
+    assert amount is None and 'abccc' in error_message
+
+
+@pytest.fixture
+def multi_currency_data():
+    return pandas.DataFrame({
+        'Date': ['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-02', '2024-01-01', '2024-01-02'],
+        'Category': ['Salary', 'Dining', 'Rent', 'Dining', 'Groceries', 'Transport'],
+        'Amount': [1000, -10, -500, -20, -30, -40],
+        'Currency': ['USD', 'EUR', 'ILS', 'EUR', 'usd', 'XXX'],
+    })
+
+
+def test_convert_transactions_currency(rates_server, multi_currency_data):
+    url, handler = rates_server
+    client = ExchangeRatesClient(url, cache_directory=None)
+    converted = convert_transactions_currency(multi_currency_data.drop(index=5), 'ILS', client)
+    assert converted['Amount'].tolist() == pytest.approx([1000 * 4.0 / 1.1, -40, -500, -84, -30 * 4.0 / 1.1])
+    assert (converted['Currency'] == 'ILS').all()
+    assert handler.requests_count == 2, "One rates table should be fetched per date."
+
+
+def test_convert_transactions_currency_unknown_currency(rates_server, multi_currency_data, caplog):
+    url, _ = rates_server
+    assert convert_transactions_currency(multi_currency_data, 'ILS', ExchangeRatesClient(url, cache_directory=None)) is None
+    assert "No ILS rate for 1 of 6 transactions" in caplog.text
+
+
+def test_convert_transactions_currency_failed_date(rates_server, multi_currency_data, caplog):
+    url, _ = rates_server
+    multi_currency_data = multi_currency_data.drop(index=5)
+    multi_currency_data.loc[2:3, 'Date'] = '2023-12-31' # The rates API has no rates for this date
+    assert convert_transactions_currency(multi_currency_data, 'ILS', ExchangeRatesClient(url, cache_directory=None)) is None, \
+        "The totals should not quietly leave out the rows of a date without rates."
+    assert "No ILS rate for 1 of 5 transactions" in caplog.text
+
+
+def test_convert_compact_transactions_currency(rates_server, multi_currency_data):
+    from src.data_loader import compact_transactions
+    url, handler = rates_server
+    client = ExchangeRatesClient(url, cache_directory=None)
+    converted = convert_transactions_currency(compact_transactions(multi_currency_data.drop(index=5)), 'ILS', client)
+    assert converted['AmountCents'].tolist() == [363636, -4000, -50000, -8400, -10909]
+    assert str(converted['AmountCents'].dtype) == 'int64'
+
+
+def test_convert_transactions_currency_without_currency_column(multi_currency_data):
+    data = multi_currency_data.drop(columns='Currency')
+    assert convert_transactions_currency(data, 'ILS') is data
+
+
+def test_rates_client_historical_rates(rates_server, tmp_path):
+    url, handler = rates_server
+    client = ExchangeRatesClient(url, ttl_seconds=0, cache_directory=str(tmp_path))
+    assert client.get_rates('EUR', '2024-01-02')['rates']['ILS'] == 4.2
+    time.sleep(0.01)
+    client.get_rates('EUR', '2024-01-02')
+    assert handler.requests_count == 1, "Historical rates never change, so they should not expire."
+
+
+def test_cross_rates():
+    cross_rates = CrossRates('EUR', {'USD': 1.25, 'ILS': 4.0})
+    assert cross_rates.get_rate('EUR', 'ILS') == 4.0
+    assert cross_rates.get_rate('USD', 'EUR') == pytest.approx(0.8)
+    assert cross_rates.get_rate('USD', 'ILS') == pytest.approx(3.2)
+    assert cross_rates.get_rate('ILS', 'ILS') == 1.0
+    assert cross_rates.get_rate('USD', 'abccc') is None
+    assert cross_rates.matrix.shape == (3, 3)
+
+
+def test_cross_rates_convert_vector():
+    cross_rates = CrossRates('EUR', {'USD': 1.25, 'ILS': 4.0})
+    converted = cross_rates.convert([10, 20, 30, 40], ['USD', 'EUR', 'ILS', 'abccc'], 'ILS')
+    assert converted[:3] == pytest.approx([32, 80, 30])
+    assert numpy.isnan(converted[3])
+
+
+def test_get_exchange_rates_uses_one_table(rates_server):
+    url, handler = rates_server
+    client = ExchangeRatesClient(url, cache_directory=None)
+    assert get_exchange_rates('USD', 'ILS', 11, client)[0] == pytest.approx(40.0)
+    assert get_exchange_rates('ILS', 'USD', 4, client)[0] == pytest.approx(1.1)
+    assert handler.requests_count == 1, "Every pair should be answered from the same table."
+    assert get_cross_rates(client).get_rate('EUR', 'USD') == 1.1
+
+
+def test_get_cross_rates_is_reused_until_the_rates_refresh(rates_server):
+    url, _ = rates_server
+    client = ExchangeRatesClient(url, ttl_seconds=60, cache_directory=None)
+    cross_rates = get_cross_rates(client)
+    assert get_cross_rates(client) is cross_rates, "The matrix should be built once per rates table."
+    client.ttl_seconds = 0
+    time.sleep(0.01)
+    assert get_cross_rates(client) is not cross_rates, "Refreshed rates should get a new matrix."
+
+
+def test_get_many_rates_runs_concurrently(rates_server, monkeypatch):
+    url, handler = rates_server
+    handler.delay_seconds = 0.3
+    rates_dates = [f"2024-02-{day:02d}" for day in range(1, 9)]
+    monkeypatch.setattr(handler, 'historical_rates', {rates_date: {'EUR': {'ILS': 4.0}} for rates_date in rates_dates})
+    client = ExchangeRatesClient(url, cache_directory=None)
+    start_time = time.perf_counter()
+    results = client.get_many_rates([('EUR', rates_date) for rates_date in rates_dates], max_concurrency=8)
+    elapsed = time.perf_counter() - start_time
+    assert all(results[('EUR', rates_date)]['rates']['ILS'] == 4.0 for rates_date in rates_dates)
+    assert elapsed < 0.3 * len(rates_dates) / 2, "Requests should overlap instead of running one after another."
+
+
+def test_get_many_rates_retries_failures(rates_server):
+    url, handler = rates_server
+    handler.failures_left = 2
+    client = ExchangeRatesClient(url, cache_directory=None, retries=2, backoff_seconds=0.01)
+    results = client.get_many_rates([('EUR', None)])
+    assert results[('EUR', None)]['rates']['USD'] == 1.1
+    assert handler.requests_count == 3
+
+
+def test_get_many_rates_times_out(rates_server):
+    url, handler = rates_server
+    handler.delay_seconds = 0.5
+    client = ExchangeRatesClient(url, cache_directory=None, timeout=0.1, retries=0)
+    results = client.get_many_rates([('EUR', None)])
+    assert 'message' in results[('EUR', None)]
+
+
+def test_get_many_rates_times_out_in_the_request(rates_server, monkeypatch):
+    url, handler = rates_server
+    handler.delay_seconds = 0.5
+    client = ExchangeRatesClient(url, cache_directory=None, timeout=0.1, retries=0)
+    running_requests = []
+    session_get = client.session.get
+    def counting_get(*args, **kwargs):
+        running_requests.append(1)
+        try:
+            return session_get(*args, **kwargs)
+        finally:
+            running_requests.pop()
+    monkeypatch.setattr(client.session, 'get', counting_get)
+    results = client.get_many_rates([('EUR', None)])
+    assert 'Timeout' in results[('EUR', None)]['message']
+    assert running_requests == [], "The request should have ended when its timeout was reported."
+
+
+def test_get_many_rates_from_a_running_event_loop(rates_server):
+    url, _ = rates_server
+    client = ExchangeRatesClient(url, cache_directory=None)
+    async def fetch():
+        return client.get_many_rates([('EUR', None)])
+    assert asyncio.run(fetch())[('EUR', None)]['rates']['USD'] == 1.1
@@ -1,6 +1,11 @@
+import os
+import numpy
 import pandas 
 import pytest
-from src.data_loader import load_transactions_data, check_transactions_file
+from src.category_month_cube import build_category_month_cube, get_expenses_by_category, get_total_income_and_expenses
+from src.data_loader import load_transactions_data, load_transactions_files, check_transactions_file, stream_transactions_aggregates
+from src.data_loader import compact_transactions, get_amounts, get_bytes_per_million_rows
+from src.reports_generator import calculate_expenses_by_categories, sort_expenses_by_categories
 
 @pytest.fixture
 def valid_data():
@@ -66,4 +71,167 @@ def test_check_transactions_file_bad_amount(invalid_data_bad_amount):
 def test_check_transactions_file_bad_date(invalid_data_bad_date):
     dataframe = check_transactions_file(invalid_data_bad_date)
     assert dataframe is not None, "DataFrame should be returned, skipping invalid rows."
-    assert len(dataframe) == 1, "One invalid row with bad date should be skipped."
\ No newline at end of file
+    assert len(dataframe) == 1, "One invalid row with bad date should be skipped."
+
+def reference_check_transactions_file(csv_data):
+    """The original row by row validation, kept to compare against the vectorized one."""
+    valid_rows = []
+    for index, row in csv_data.iterrows():
+        try:
+            pandas.to_datetime(row['Date'], errors='raise')
+        except ValueError:
+            continue
+        amount = row['Amount']
+        if not isinstance(amount, (int, float)) or amount == 0:
+            continue
+        valid_rows.append(row)
+    return pandas.DataFrame(valid_rows) if valid_rows else None
+
+
+@pytest.fixture
+def mixed_data():
+    """Fixture for a DataFrame mixing every kind of valid and invalid value."""
+    data = {
+        'Date': ['2024-01-01', 'Invalid Date', '01/05/2024', None, 'Jan 3 2024', '2024-13-45', '2024-02-01', '2024-02-02', '2024-02-03'],
+        'Category': ['Salary', 'Food', 'Rent', 'Dining', 'Food', 'Rent', 'Transport', 'Dining', 'Rent'],
+        'Amount': [5000, -200, 0, -15.5, 'Not a number', -1500, '-300', None, float('nan')]
+    }
+    return pandas.DataFrame(data)
+
+
+def test_check_transactions_file_matches_reference(mixed_data):
+    dataframe = check_transactions_file(mixed_data)
+    expected = reference_check_transactions_file(mixed_data)
+    assert list(dataframe.index) == list(expected.index), "Vectorized validation should accept the same rows."
+    assert dataframe['Amount'].tolist()[:2] == expected['Amount'].tolist()[:2]
+
+
+def test_check_transactions_file_matches_reference_numeric_amounts(mixed_data):
+    mixed_data['Amount'] = [5000, -200, 0, -15.5, 12, -1500, 0, -3, -7]
+    dataframe = check_transactions_file(mixed_data)
+    expected = reference_check_transactions_file(mixed_data)
+    assert list(dataframe.index) == list(expected.index), "Vectorized validation should accept the same rows."
+
+
+def test_check_transactions_file_logs_rejected_rows(mixed_data, caplog):
+    check_transactions_file(mixed_data)
+    assert "Invalid date at row 2" in caplog.text
+    assert "Invalid amount at row 3" in caplog.text
+
+
+@pytest.fixture
+def large_transactions_file(tmp_path):
+    """Fixture for a CSV file big enough to be read in several chunks."""
+    categories = ['Rent', 'Groceries', 'Dining', 'Salary', 'Transport']
+    rows = 1000
+    data = pandas.DataFrame({
+        'Date': [f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}" if i % 97 else 'Invalid Date' for i in range(rows)],
+        'Category': [categories[i % len(categories)] for i in range(rows)],
+        'Amount': [(i * 37) % 2000 - 1500 for i in range(rows)]
+    })
+    file_path = tmp_path / "large_transactions.csv"
+    data.to_csv(file_path, index=False)
+    return file_path
+
+
+def assert_stream_matches_in_memory(file_path, chunk_size):
+    aggregates = stream_transactions_aggregates(file_path, chunk_size=chunk_size)
+    data = load_transactions_data(file_path, compact=True)
+    cube = build_category_month_cube(data)
+    assert aggregates.valid_rows == len(data)
+    assert (aggregates.total_income, aggregates.total_expenses) == get_total_income_and_expenses(cube)
+    pandas.testing.assert_series_equal(
+        sort_expenses_by_categories(get_expenses_by_category(cube)).rename(index=str).rename_axis('Category'),
+        sort_expenses_by_categories(aggregates.expenses_by_category)
+    )
+
+
+def test_stream_transactions_aggregates_matches_in_memory(large_transactions_file):
+    assert_stream_matches_in_memory(large_transactions_file, chunk_size=64)
+
+
+def test_stream_transactions_aggregates_matches_in_memory_with_a_bad_amount(tmp_path):
+    generator = numpy.random.default_rng(0)
+    data = pandas.DataFrame({
+        'Date': '2024-01-15',
+        'Category': generator.choice(['Rent', 'Dining', 'Salary'], size=1000),
+        'Amount': numpy.round(generator.normal(0, 300, size=1000), 2).astype(object),
+    })
+    data.loc[300, 'Amount'] = "abc" # Only the chunk of rows 256 to 319 has a text amount
+    file_path = tmp_path / "transactions.csv"
+    data.to_csv(file_path, index=False)
+    assert len(load_transactions_data(file_path)) == 999, "Only the row with the bad amount should be rejected."
+    assert_stream_matches_in_memory(file_path, chunk_size=64)
+
+
+def test_stream_transactions_aggregates_fails_when_a_chunk_is_not_transformed(large_transactions_file):
+    def fail_on_second_chunk(chunk):
+        return None if chunk.index[0] == 64 else chunk
+    assert stream_transactions_aggregates(large_transactions_file, chunk_size=64, transform=fail_on_second_chunk) is None
+
+
+def test_stream_transactions_aggregates_file_not_found(tmp_path):
+    assert stream_transactions_aggregates(tmp_path / "missing.csv") is None
+
+
+@pytest.fixture
+def transactions_directory(tmp_path, valid_data, invalid_data_missing_columns):
+    """Fixture for a directory with two valid exports and a broken one."""
+    valid_data.to_csv(tmp_path / "account_1.csv", index=False)
+    valid_data.iloc[:2].to_csv(tmp_path / "account_2.csv", index=False)
+    invalid_data_missing_columns.to_csv(tmp_path / "broken.csv", index=False)
+    return tmp_path
+
+
+def test_load_transactions_files_directory(transactions_directory):
+    dataframe, errors = load_transactions_files(str(transactions_directory), max_workers=2)
+    assert len(dataframe) == 5, "Valid rows of every file should be loaded."
+    assert dataframe['SourceFile'].tolist() == ['account_1.csv'] * 3 + ['account_2.csv'] * 2
+    assert list(errors) == ['broken.csv'], "The broken file should be reported, not stop the run."
+
+
+def test_load_transactions_files_glob(transactions_directory):
+    dataframe, errors = load_transactions_files(str(transactions_directory / "account_*.csv"), max_workers=2)
+    assert len(dataframe) == 5
+    assert errors == {}
+
+
+def test_load_transactions_files_same_names_in_different_directories(tmp_path, valid_data, invalid_data_missing_columns):
+    for account in ["bank", "card"]:
+        (tmp_path / account).mkdir()
+        valid_data.to_csv(tmp_path / account / "jan.csv", index=False)
+        invalid_data_missing_columns.to_csv(tmp_path / account / "broken.csv", index=False)
+    dataframe, errors = load_transactions_files(str(tmp_path / "*" / "*.csv"), max_workers=2)
+    assert dataframe['SourceFile'].tolist() == [os.path.join("bank", "jan.csv")] * 3 + [os.path.join("card", "jan.csv")] * 3
+    assert sorted(errors) == [os.path.join("bank", "broken.csv"), os.path.join("card", "broken.csv")]
+
+
+def test_load_transactions_files_no_files(tmp_path):
+    dataframe, errors = load_transactions_files(str(tmp_path / "*.csv"))
+    assert dataframe is None
+    assert len(errors) == 1
+
+
+def test_load_transactions_data_compact(tmp_path, valid_data):
+    file_path = tmp_path / "valid_transactions.csv"
+    valid_data.to_csv(file_path, index=False)
+    dataframe = load_transactions_data(file_path, compact=True)
+    assert list(dataframe.columns) == ['Date', 'Category', 'AmountCents']
+    assert str(dataframe['Date'].dtype) == 'datetime64[ns]'
+    assert isinstance(dataframe['Category'].dtype, pandas.CategoricalDtype)
+    assert dataframe['AmountCents'].tolist() == [500000, -20000, -150000]
+    assert calculate_expenses_by_categories(dataframe).to_dict() == {'Rent': 1500, 'Food': 200}
+
+
+def test_compact_transactions_mixed_date_formats():
+    data = pandas.DataFrame({
+        'Date': ['2024-01-01', '01/05/2024', None],
+        'Category': ['Salary', 'Food', 'Rent'],
+        'Amount': [0.1, -0.2, 19.99]
+    })
+    dataframe = compact_transactions(data)
+    assert dataframe['Date'].dt.strftime('%Y-%m-%d').tolist()[:2] == ['2024-01-01', '2024-01-05']
+    assert dataframe['Date'].isna().tolist() == [False, False, True]
+    assert dataframe['AmountCents'].tolist() == [10, -20, 1999]
+    assert get_amounts(dataframe).tolist() == [0.1, -0.2, 19.99]
+    assert get_bytes_per_million_rows(dataframe) < get_bytes_per_million_rows(data)
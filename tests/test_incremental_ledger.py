@@ -0,0 +1,97 @@
+import json
+import os
+import pandas
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from src.incremental_ledger import (
+    AGGREGATES_FILE_NAME,
+    get_source_ledger_directory,
+    list_ledger_directories,
+    lock_ledger,
+    rebuild_ledger_aggregates,
+    update_ledger,
+    verify_ledger,
+)
+
+
+@pytest.fixture
+def transactions_file(tmp_path):
+    data = pandas.DataFrame({
+        'Date': ['2024-01-01', '2024-01-05', 'Invalid Date', '2024-02-01'],
+        'Category': ['Salary', 'Groceries', 'Rent', 'Rent'],
+        'Amount': [5000, -200, -1500, -1500]
+    })
+    file_path = tmp_path / "transactions.csv"
+    data.to_csv(file_path, index=False)
+    return str(file_path)
+
+
+def test_update_ledger_adds_only_new_rows(tmp_path, transactions_file):
+    ledger_directory = str(tmp_path / "ledger")
+    aggregates = update_ledger(transactions_file, ledger_directory)
+    assert aggregates.valid_rows == 3
+    assert aggregates.total_income == 5000
+    assert aggregates.total_expenses == 1700
+
+    assert update_ledger(transactions_file, ledger_directory).valid_rows == 3, "An unchanged file should add nothing."
+
+    with open(transactions_file, 'a') as file:
+        file.write("2024-02-10,Dining,-50\n2024-02-11,Dining")
+    aggregates = update_ledger(transactions_file, ledger_directory)
+    assert aggregates.valid_rows == 4, "The last line without a newline should wait for the next update."
+    assert aggregates.expenses_by_category.to_dict() == {'Groceries': 200, 'Rent': 1500, 'Dining': 50}
+
+    with open(transactions_file, 'a') as file:
+        file.write(",-25\n")
+    assert update_ledger(transactions_file, ledger_directory).expenses_by_category['Dining'] == 75
+    assert verify_ledger(ledger_directory) == []
+
+
+def test_update_ledger_rejects_rewritten_file(tmp_path, transactions_file):
+    ledger_directory = str(tmp_path / "ledger")
+    update_ledger(transactions_file, ledger_directory)
+    pandas.DataFrame({'Date': ['2024-03-01'], 'Category': ['Rent'], 'Amount': [-900]}).to_csv(transactions_file, index=False)
+    assert update_ledger(transactions_file, ledger_directory) is None
+
+
+def test_verify_ledger_detects_and_rebuilds_drift(tmp_path, transactions_file):
+    ledger_directory = str(tmp_path / "ledger")
+    update_ledger(transactions_file, ledger_directory)
+    aggregates_path = os.path.join(ledger_directory, AGGREGATES_FILE_NAME)
+    with open(aggregates_path) as aggregates_file:
+        aggregates = json.load(aggregates_file)
+    aggregates['expenses_by_category']['Rent'] += 10
+    with open(aggregates_path, 'w') as aggregates_file:
+        json.dump(aggregates, aggregates_file)
+
+    assert verify_ledger(ledger_directory) == ["Rent expenses: 1510.00 in the totals, 1500.00 in the ledger."]
+    rebuild_ledger_aggregates(ledger_directory)
+    assert verify_ledger(ledger_directory) == []
+
+
+def test_every_source_file_has_its_own_ledger(tmp_path, transactions_file):
+    ledger_root = str(tmp_path / "ledger")
+    other_file = tmp_path / "other.csv"
+    other_file.write_text("Date,Category,Amount\n2024-01-03,Dining,-10\n")
+    assert update_ledger(transactions_file, get_source_ledger_directory(transactions_file, ledger_root)).valid_rows == 3
+    aggregates = update_ledger(str(other_file), get_source_ledger_directory(str(other_file), ledger_root))
+    assert (aggregates.valid_rows, aggregates.total_expenses) == (1, 10)
+    assert list_ledger_directories(ledger_root) == sorted([
+        get_source_ledger_directory(transactions_file, ledger_root), get_source_ledger_directory(str(other_file), ledger_root)
+    ])
+
+
+def test_update_ledger_waits_for_the_lock(tmp_path, transactions_file):
+    ledger_directory = str(tmp_path / "ledger")
+    with lock_ledger(ledger_directory):
+        assert update_ledger(transactions_file, ledger_directory, lock_timeout_seconds=0.1) is None
+    assert update_ledger(transactions_file, ledger_directory).valid_rows == 3
+
+
+def test_update_ledger_from_several_processes(tmp_path, transactions_file):
+    ledger_directory = str(tmp_path / "ledger")
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(update_ledger, [transactions_file] * 8, [ledger_directory] * 8))
+    assert [aggregates.valid_rows for aggregates in results] == [3] * 8, "Every update should see the rows added once."
+    assert verify_ledger(ledger_directory) == []
+    assert len(pandas.read_csv(os.path.join(ledger_directory, "transactions.csv"))) == 3
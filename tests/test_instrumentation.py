@@ -0,0 +1,72 @@
+import json
+import tracemalloc
+from src.instrumentation import (
+    export_stage_records,
+    format_prometheus,
+    get_stage_records,
+    measure_stage,
+    reset_stage_records,
+)
+
+
+def test_measure_stage_disabled_records_nothing():
+    reset_stage_records()
+    with measure_stage('parse_csv', enabled=False) as stage:
+        stage.rows = 10
+    assert get_stage_records() == []
+
+
+def test_measure_stage_records_times_and_rows():
+    reset_stage_records()
+    with measure_stage('validate', enabled=True, trace_memory=False) as stage:
+        stage.rows = 1000
+    record = get_stage_records()[0]
+    assert record['stage'] == 'validate'
+    assert record['rows'] == 1000
+    assert record['wall_seconds'] >= 0 and record['cpu_seconds'] >= 0
+    assert record['peak_bytes'] is None
+    assert record['failed'] is False
+
+
+def test_measure_stage_traces_nested_peak_memory():
+    reset_stage_records()
+    with measure_stage('analysis', enabled=True, trace_memory=True):
+        with measure_stage('aggregate', enabled=True, trace_memory=True):
+            data = bytearray(5_000_000)
+            del data
+    aggregate, analysis = get_stage_records()
+    assert aggregate['peak_bytes'] >= 5_000_000
+    assert analysis['peak_bytes'] >= aggregate['peak_bytes']
+    assert not tracemalloc.is_tracing(), "Tracing should stop with the outermost stage that started it."
+
+
+def test_measure_stage_keeps_tracing_it_did_not_start():
+    tracemalloc.start()
+    try:
+        with measure_stage('aggregate', enabled=True, trace_memory=True):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_format_prometheus():
+    records = [
+        {'stage': 'parse_csv', 'wall_seconds': 1.5, 'cpu_seconds': 1.0, 'peak_bytes': None, 'rows': 100, 'rows_per_second': 66.7, 'failed': False},
+        {'stage': 'parse_csv', 'wall_seconds': 0.5, 'cpu_seconds': 0.5, 'peak_bytes': None, 'rows': 50, 'rows_per_second': 100.0, 'failed': False},
+    ]
+    metrics = format_prometheus(records)
+    assert 'smart_financial_stage_runs_total{stage="parse_csv"} 2' in metrics
+    assert 'smart_financial_stage_wall_seconds_total{stage="parse_csv"} 2.0' in metrics
+    assert 'smart_financial_stage_rows_total{stage="parse_csv"} 150' in metrics
+    assert '# TYPE smart_financial_stage_peak_bytes gauge' in metrics
+
+
+def test_export_stage_records_json_lines(tmp_path):
+    reset_stage_records()
+    with measure_stage('aggregate', enabled=True, trace_memory=False):
+        pass
+    path = tmp_path / "stages.jsonl"
+    assert export_stage_records(str(path), 'jsonl') is True
+    assert [json.loads(line)['stage'] for line in path.read_text().splitlines()] == ['aggregate']
+    assert get_stage_records() == []
@@ -0,0 +1,68 @@
+import pandas
+import pytest
+from src.data_loader import compact_transactions
+from src.multi_user_engine import analyze_users, calculate_user_category_expenses
+from src.reports_generator import calculate_expenses_by_categories
+from src.saving_recommendations import calculate_savings_reductions, find_categories_exceeding_average, REDUCTION_TOLERANCE
+
+
+@pytest.fixture
+def combined_ledger():
+    users = {
+        'alice': [('Salary', 10000), ('Rent', -4000), ('Dining', -900), ('Entertainment', -700), ('Groceries', -800)],
+        'bob': [('Salary', 6000), ('Rent', -1500), ('Transport', -600), ('Dining', -100)],
+        'carol': [('Salary', 3000), ('Rent', -2500), ('Groceries', -900), ('Healthcare', -400), ('Dining', -50)],
+    }
+    rows = [
+        {'UserId': user, 'Date': '2024-01-01', 'Category': category, 'Amount': amount}
+        for user, transactions in users.items() for category, amount in transactions
+    ]
+    return pandas.DataFrame(rows)
+
+
+def test_calculate_user_category_expenses(combined_ledger):
+    category_expenses = calculate_user_category_expenses(combined_ledger)
+    assert category_expenses.loc['alice', 'Rent'] == 4000
+    assert category_expenses.loc['bob', 'Groceries'] == 0
+    assert 'Salary' not in category_expenses.columns
+
+
+def test_analyze_users_matches_single_user_pipeline(combined_ledger):
+    savings_goal = 3000
+    result = analyze_users(combined_ledger, savings_goal)
+    for user, user_data in combined_ledger.groupby('UserId'):
+        user_result = result[result['UserId'] == user].set_index('Category')
+        expenses = calculate_expenses_by_categories(user_data)
+        income = user_data[user_data['Amount'] > 0]['Amount'].sum()
+
+        general_recommendations = find_categories_exceeding_average(expenses, income)
+        assert len(general_recommendations) == (user_result['GeneralReduction'] > 0).sum()
+        for category, amount in expenses.items():
+            assert user_result.loc[category, 'Amount'] == amount
+
+        savings_gap = savings_goal - (income - expenses.sum())
+        if savings_gap > 0:
+            _, reductions = calculate_savings_reductions(expenses, savings_gap, method='iterative')
+            for category, percentage in reductions.items():
+                if category in user_result.index:
+                    assert user_result.loc[category, 'SavingsReduction'] == pytest.approx(percentage, abs=REDUCTION_TOLERANCE)
+        else:
+            assert (user_result['SavingsReduction'] == 0).all()
+
+
+def test_analyze_users_goals_by_user(combined_ledger):
+    savings_goals = pandas.Series({'alice': 0, 'carol': 10000})
+    result = analyze_users(combined_ledger, savings_goals)
+    assert (result.loc[result['UserId'] == 'alice', 'SavingsReduction'] == 0).all()
+    assert (result.loc[result['UserId'] == 'carol', 'RemainingGoal'] > 0).all(), "The goal of carol cannot be reached."
+
+
+def test_analyze_users_without_user_column(combined_ledger):
+    assert analyze_users(combined_ledger.drop(columns='UserId')) is None
+
+
+def test_analyze_users_on_compact_transactions(combined_ledger):
+    result = analyze_users(compact_transactions(combined_ledger), 3000)
+    assert result is not None, "Compact transactions have AmountCents instead of Amount."
+    expected = analyze_users(combined_ledger, 3000)
+    pandas.testing.assert_frame_equal(result.astype({'UserId': str, 'Category': str}), expected, check_dtype=False)
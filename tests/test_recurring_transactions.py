@@ -0,0 +1,126 @@
+import logging
+import time
+import numpy
+import pandas
+import pytest
+from src.budget_rules import load_budget_rules
+from src.data_loader import compact_transactions
+from src.recurring_transactions import (
+    describe_recurring_charges,
+    find_recurring_transactions,
+    get_recurring_candidates,
+    spread_recurring_reductions,
+    RECURRING_CATEGORY,
+)
+from src.saving_recommendations import calculate_savings_reductions, calculate_savings_goals_curve
+
+
+@pytest.fixture
+def sample_data():
+    months = pandas.date_range('2024-01-03', periods=12, freq='MS') + pandas.Timedelta(days=2)
+    weeks = pandas.date_range('2024-01-01', periods=20, freq='7D')
+    generator = numpy.random.default_rng(0)
+    one_off_days = pandas.to_datetime('2024-01-01') + pandas.to_timedelta(generator.integers(0, 365, size=40), unit='D')
+    frames = [
+        pandas.DataFrame({'Date': months, 'Category': 'Entertainment', 'Description': 'Streaming', 'Amount': -15.99}),
+        pandas.DataFrame({'Date': months, 'Category': 'Rent', 'Description': 'Landlord', 'Amount': -3000.0}),
+        pandas.DataFrame({'Date': weeks, 'Category': 'Dining', 'Description': 'Lunch club', 'Amount': -numpy.round(20.0 + generator.random(20) * 0.4, 2)}),
+        pandas.DataFrame({'Date': one_off_days, 'Category': 'Dining', 'Description': 'Restaurant', 'Amount': -generator.integers(30, 200, size=40).astype(float)}),
+        pandas.DataFrame({'Date': months, 'Category': 'Salary', 'Description': 'Employer', 'Amount': 10000.0}),
+    ]
+    data = pandas.concat(frames, ignore_index=True).sample(frac=1, random_state=0).reset_index(drop=True)
+    data['Date'] = data['Date'].dt.strftime('%Y-%m-%d')
+    return data
+
+
+def test_find_recurring_transactions(sample_data):
+    recurring = find_recurring_transactions(sample_data)
+    assert recurring[['Description', 'Cadence', 'Occurrences']].values.tolist() == [
+        ['Landlord', 'monthly', 12], ['Lunch club', 'weekly', 20], ['Streaming', 'monthly', 12],
+    ]
+    assert recurring['Amount'].iloc[2] == pytest.approx(15.99)
+    assert recurring['MonthlyAmount'].iloc[1] == pytest.approx(recurring['Amount'].iloc[1] * 52 / 12)
+
+
+def test_find_recurring_transactions_without_descriptions(sample_data):
+    recurring = find_recurring_transactions(sample_data.drop(columns='Description'))
+    assert recurring[['Category', 'Cadence']].values.tolist() == [['Rent', 'monthly'], ['Dining', 'weekly'], ['Entertainment', 'monthly']]
+    assert (recurring['Description'] == "").all()
+
+
+def test_find_recurring_transactions_on_compact_transactions(sample_data):
+    pandas.testing.assert_frame_equal(find_recurring_transactions(compact_transactions(sample_data)), find_recurring_transactions(sample_data))
+
+
+def test_irregular_charges_are_not_recurring():
+    data = pandas.DataFrame({
+        'Date': ['2024-01-01', '2024-01-02', '2024-03-15', '2024-03-16', '2024-07-01'],
+        'Category': 'Dining',
+        'Amount': -50.0,
+    })
+    assert find_recurring_transactions(data).empty
+
+
+def test_recurring_candidates_keep_essential_charges(sample_data):
+    expenses = -sample_data[sample_data['Amount'] < 0].groupby('Category')['Amount'].sum()
+    recurring = find_recurring_transactions(sample_data)
+    candidate_expenses, rules = get_recurring_candidates(expenses, recurring, load_budget_rules())
+    assert rules.categories[0] == RECURRING_CATEGORY
+    assert candidate_expenses[RECURRING_CATEGORY] == pytest.approx(recurring.loc[recurring['Category'] != 'Rent', 'Total'].sum())
+    assert candidate_expenses['Rent'] == expenses['Rent']
+    assert candidate_expenses.sum() == pytest.approx(expenses.sum())
+
+
+def test_find_recurring_transactions_missing_descriptions(sample_data):
+    sample_data.loc[sample_data['Description'] == 'Streaming', 'Description'] = numpy.nan
+    recurring = find_recurring_transactions(sample_data)
+    assert recurring['Description'].tolist() == ['Landlord', 'Lunch club', '']
+    assert describe_recurring_charges(recurring.iloc[2:]) == "Entertainment (monthly, 15.99)"
+
+
+def test_recurring_candidates_keep_a_recurring_category_of_the_user(sample_data, caplog):
+    caplog.set_level(logging.INFO)
+    expenses = -sample_data[sample_data['Amount'] < 0].groupby('Category')['Amount'].sum()
+    expenses[RECURRING_CATEGORY] = 50.0
+    recurring = find_recurring_transactions(sample_data)
+    rules = load_budget_rules()
+    candidate_expenses, candidate_rules = get_recurring_candidates(expenses, recurring, rules)
+    assert candidate_expenses is expenses and candidate_rules is rules
+
+    recommendations, reductions = calculate_savings_reductions(expenses, 300, recurring_transactions=recurring)
+    assert not any("recurring charges" in recommendation for recommendation in recommendations)
+    calculate_savings_goals_curve(expenses, 600, points=5, recurring_transactions=recurring)
+    spread_recurring_reductions(expenses, recurring, reductions)
+    collision_records = [record for record in caplog.records if "already exists" in record.getMessage()]
+    assert [record.levelname for record in collision_records] == ['INFO'], "A Recurring category of the user is valid input, noted once."
+
+
+def test_savings_reductions_cut_recurring_charges(sample_data):
+    expenses = -sample_data[sample_data['Amount'] < 0].groupby('Category')['Amount'].sum()
+    recurring = find_recurring_transactions(sample_data)
+    recommendations, reductions = calculate_savings_reductions(expenses, 300, recurring_transactions=recurring)
+    assert reductions[RECURRING_CATEGORY] > 0
+    recurring_recommendation = next(recommendation for recommendation in recommendations if "recurring charges" in recommendation)
+    assert "Lunch club (weekly" in recurring_recommendation and "Landlord" not in recurring_recommendation
+
+    candidate_expenses, _ = get_recurring_candidates(expenses, recurring, load_budget_rules())
+    category_reductions = spread_recurring_reductions(expenses, recurring, reductions)
+    saved = sum(expenses[category] * percentage / 100 for category, percentage in category_reductions.items())
+    assert saved == pytest.approx(sum(candidate_expenses[category] * percentage / 100 for category, percentage in reductions.items()))
+    assert saved >= 300
+
+    curve = calculate_savings_goals_curve(expenses, 600, points=5, recurring_transactions=recurring)
+    assert curve['Savings'].iloc[2] == pytest.approx(saved)
+
+
+def test_find_recurring_transactions_is_fast():
+    rows = 1_000_000
+    generator = numpy.random.default_rng(0)
+    data = pandas.DataFrame({
+        'Date': pandas.to_datetime('2020-01-01') + pandas.to_timedelta(generator.integers(0, 1500, size=rows), unit='D'),
+        'Category': generator.choice(['Groceries', 'Dining', 'Rent', 'Transport'], size=rows),
+        'Amount': -generator.integers(1, 5000, size=rows).astype(float),
+    })
+    start = time.perf_counter()
+    find_recurring_transactions(data)
+    assert time.perf_counter() - start < 5
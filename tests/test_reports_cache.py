@@ -0,0 +1,62 @@
+import os
+import pandas
+from src.reports_cache import (
+    evict_cached_reports,
+    hash_report_inputs,
+    load_cached_report,
+    save_cached_report,
+    get_cache_stats,
+    reset_cache_stats,
+)
+
+
+def test_hash_report_inputs_changes_with_inputs():
+    sorted_data = pandas.Series({'Rent': 1500, 'Groceries': 200}, name='Amount')
+    report_hash = hash_report_inputs('expenses_by_categories', sorted_data)
+    assert report_hash == hash_report_inputs('expenses_by_categories', sorted_data.copy())
+    assert report_hash != hash_report_inputs('expenses_by_categories', sorted_data * 2)
+    assert report_hash != hash_report_inputs('monthly_summary', sorted_data)
+    assert hash_report_inputs('report', ["a"], {"Dining": 20}) != hash_report_inputs('report', ["a"], {"Dining": 10})
+
+
+def test_save_and_load_cached_report(tmp_path):
+    cache_directory = str(tmp_path / "cache")
+    output_path = str(tmp_path / "report.pdf")
+    with open(output_path, 'wb') as report_file:
+        report_file.write(b"%PDF-report")
+
+    reset_cache_stats()
+    assert load_cached_report("abc", output_path, cache_directory) is False
+    save_cached_report("abc", output_path, cache_directory)
+    os.remove(output_path)
+    assert load_cached_report("abc", output_path, cache_directory) is True
+    with open(output_path, 'rb') as report_file:
+        assert report_file.read() == b"%PDF-report"
+    assert get_cache_stats() == {'hits': 1, 'misses': 1}
+
+
+def test_reports_cache_disabled(tmp_path):
+    cache_directory = str(tmp_path / "cache")
+    output_path = str(tmp_path / "report.pdf")
+    with open(output_path, 'wb') as report_file:
+        report_file.write(b"%PDF-report")
+
+    save_cached_report("abc", output_path, cache_directory, use_cache=False)
+    assert not os.path.exists(cache_directory)
+    assert load_cached_report("abc", output_path, cache_directory, use_cache=False) is False
+
+
+def test_reports_cache_evicts_least_recently_used(tmp_path):
+    cache_directory = str(tmp_path / "cache")
+    output_path = str(tmp_path / "report.pdf")
+    with open(output_path, 'wb') as report_file:
+        report_file.write(b"%PDF" + b"0" * 996)
+
+    for age, report_hash in enumerate(["c", "b", "a"]):
+        save_cached_report(report_hash, output_path, cache_directory)
+        os.utime(os.path.join(cache_directory, f"{report_hash}.pdf"), (1000 - age, 1000 - age))
+    load_cached_report("a", output_path, cache_directory) # a is now the most recently used
+    save_cached_report("d", output_path, cache_directory, max_bytes=2000)
+    assert sorted(os.listdir(cache_directory)) == ["a.pdf", "d.pdf"]
+    evict_cached_reports(cache_directory, max_bytes=0)
+    assert os.listdir(cache_directory) == []
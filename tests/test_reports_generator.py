@@ -1,9 +1,25 @@
 import pandas
 import pytest
 import os
-from src.reports_generator import create_expenses_by_categories_graph, create_monthly_summary_graph, create_recommendation_report
+import re
+import sys
+from src.reports_generator import (
+    calculate_expenses_by_categories,
+    calculate_monthly_summary,
+    create_expenses_by_categories_graph,
+    create_monthly_summary_graph,
+    create_recommendation_report,
+    create_reports,
+)
 import time
 
+@pytest.fixture(autouse=True)
+def working_directory(tmp_path_factory, monkeypatch):
+    """Runs every test in its own directory, so the reports and their cache are not written to the repository."""
+    working_directory = tmp_path_factory.mktemp("working_directory")
+    (working_directory / "reports").mkdir()
+    monkeypatch.chdir(working_directory)
+
 @pytest.fixture
 def sample_data():
     data = {
@@ -44,4 +60,130 @@ def test_create_recommendation_report(report_data):
         report_data["category_reductions"])
     time.sleep(2)
     assert created == True, "pdf should be created"
-    os.remove("reports/recommendation_report.pdf")
\ No newline at end of file
+    os.remove("reports/recommendation_report.pdf")
+
+
+def test_create_recommendation_report_with_savings_curve(report_data):
+    savings_curve = pandas.DataFrame({'Goal': [0, 500, 1000], 'Savings': [0, 510, 1020], 'Remaining Goal': [0, 0, 0]})
+    created = create_recommendation_report(
+        report_data["general_recommendations"],
+        report_data["saving_goal_recommendations"],
+        report_data["category_reductions"],
+        savings_curve)
+    assert created == True, "pdf should be created"
+    os.remove("reports/recommendation_report.pdf")
+
+
+def test_create_recommendation_report_with_savings_forecast(report_data, tmp_path):
+    savings_forecast = pandas.DataFrame({
+        'Goal': [6000, 6000], 'Probability': [0.4, 0.9],
+        'Savings P5': [2000, 5000], 'Savings Median': [5500, 8000], 'Savings P95': [9000, 11000],
+    }, index=pandas.Index(['Without reductions', 'With reductions'], name='Scenario'))
+    created = create_recommendation_report(
+        report_data["general_recommendations"],
+        report_data["saving_goal_recommendations"],
+        report_data["category_reductions"],
+        output_directory=str(tmp_path),
+        savings_forecast=savings_forecast)
+    assert created == True, "pdf should be created"
+
+
+def test_create_recommendation_report_with_anomalies(report_data, tmp_path):
+    anomalies = pandas.DataFrame({
+        'Date': ['2024-01-05'], 'Category': ['Groceries'], 'Amount': [-2000.0], 'Expected': [-200.0], 'ZScore': [-12.5],
+    })
+    created = create_recommendation_report(
+        report_data["general_recommendations"],
+        report_data["saving_goal_recommendations"],
+        report_data["category_reductions"],
+        output_directory=str(tmp_path),
+        anomalies=anomalies)
+    assert created == True, "pdf should be created"
+
+
+def test_create_reports_renders_all_reports(sample_data, report_data):
+    created_reports = create_reports(
+        calculate_expenses_by_categories(sample_data),
+        calculate_monthly_summary(sample_data),
+        report_data["general_recommendations"],
+        report_data["saving_goal_recommendations"],
+        report_data["category_reductions"])
+    assert created_reports == {'expenses_by_categories': True, 'monthly_summary': True, 'recommendation_report': True}
+    os.remove("reports/Sort_data_by_expense_categories.pdf")
+    os.remove("reports/monthly_summary.pdf")
+    os.remove("reports/recommendation_report.pdf")
+
+
+def read_report_pages(report_path):
+    """Returns the content of a PDF report without the creation date, which differs on every render."""
+    with open(report_path, 'rb') as report_file:
+        return re.sub(rb"/CreationDate \(.*?\)", b"", report_file.read())
+
+
+def test_create_reports_in_worker_processes_matches_serial(sample_data, report_data, tmp_path):
+    report_inputs = (
+        calculate_expenses_by_categories(sample_data),
+        calculate_monthly_summary(sample_data),
+        report_data["general_recommendations"],
+        report_data["saving_goal_recommendations"],
+        report_data["category_reductions"],
+    )
+    serial_reports = create_reports(*report_inputs, output_directory=str(tmp_path / "serial"), max_workers=1, use_cache=False)
+    pool_reports = create_reports(*report_inputs, output_directory=str(tmp_path / "pool"), max_workers=3, use_cache=False)
+    assert not os.path.exists("cache"), "The reports should be rendered without the cache."
+    assert pool_reports == serial_reports == {'expenses_by_categories': True, 'monthly_summary': True, 'recommendation_report': True}
+    assert sorted(os.listdir(tmp_path / "pool")) == sorted(os.listdir(tmp_path / "serial"))
+    for report_name in os.listdir(tmp_path / "serial"):
+        assert read_report_pages(tmp_path / "pool" / report_name) == read_report_pages(tmp_path / "serial" / report_name)
+
+
+def test_create_reports_without_worker_processes(sample_data, report_data, tmp_path, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise OSError("no processes")
+    monkeypatch.setattr('src.reports_generator.ProcessPoolExecutor', unavailable)
+    created_reports = create_reports(
+        calculate_expenses_by_categories(sample_data),
+        calculate_monthly_summary(sample_data),
+        report_data["general_recommendations"],
+        report_data["saving_goal_recommendations"],
+        report_data["category_reductions"],
+        output_directory=str(tmp_path))
+    assert created_reports == {'expenses_by_categories': True, 'monthly_summary': True, 'recommendation_report': True}
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_reports_do_not_use_pyplot(sample_data):
+    create_expenses_by_categories_graph(sample_data)
+    assert 'matplotlib.pyplot' not in sys.modules or not sys.modules['matplotlib.pyplot'].get_fignums()
+    os.remove("reports/Sort_data_by_expense_categories.pdf")
+
+
+def test_unchanged_report_is_reused_from_cache(sample_data):
+    from src.reports_cache import get_cache_stats, reset_cache_stats
+    create_expenses_by_categories_graph(sample_data)
+    os.remove("reports/Sort_data_by_expense_categories.pdf")
+    reset_cache_stats()
+    dataframe = create_expenses_by_categories_graph(sample_data)
+    assert dataframe is not None and len(dataframe) == 2
+    assert os.path.exists("reports/Sort_data_by_expense_categories.pdf")
+    assert get_cache_stats() == {'hits': 1, 'misses': 0}
+    os.remove("reports/Sort_data_by_expense_categories.pdf")
+
+
+def test_create_reports_consolidated_writes_one_pdf(sample_data, report_data, tmp_path):
+    from src.category_month_cube import build_category_month_cube, get_monthly_totals
+    savings_curve = pandas.DataFrame({'Goal': [0, 500, 1000], 'Savings': [0, 510, 1020], 'Remaining Goal': [0, 0, 0]})
+    created_reports = create_reports(
+        calculate_expenses_by_categories(sample_data),
+        calculate_monthly_summary(sample_data),
+        report_data["general_recommendations"],
+        report_data["saving_goal_recommendations"],
+        report_data["category_reductions"],
+        savings_curve,
+        output_directory=str(tmp_path),
+        monthly_totals=get_monthly_totals(build_category_month_cube(sample_data)),
+        consolidated=True)
+    assert created_reports == {'consolidated_report': True}
+    assert os.listdir(tmp_path) == ["financial_report.pdf"]
+    with open(tmp_path / "financial_report.pdf", 'rb') as report_file:
+        assert re.search(rb"/Count (\d+)", report_file.read()).group(1) == b"5" # Expenses, summary, months, recommendations and curve
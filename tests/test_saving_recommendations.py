@@ -5,7 +5,11 @@ from src.saving_recommendations import (
     calculate_reduction_amount,
     apply_reduction,
     reduce_expenses,
+    reduce_expenses_closed_form,
     calculate_savings_reductions,
+    calculate_savings_reductions_batch,
+    calculate_savings_goals_curve,
+    REDUCTION_TOLERANCE,
 )
 
 
@@ -60,3 +64,57 @@ def test_calculate_savings_reductions(sample_data, sample_savings_goal):
     recommendations, reductions = calculate_savings_reductions(sample_data, sample_savings_goal)
     assert isinstance(recommendations, list)
     assert isinstance(reductions, dict)
+
+
+@pytest.mark.parametrize("goal", [-10.0, 0.0, 1.0, 645.5, 5000.0, 20000.0, 64589.0, 100000.0, 1e12])
+def test_reduce_expenses_closed_form_matches_iterative(sample_data, goal):
+    categories = ['Entertainment', 'Dining', 'Rent', 'Missing']
+    expected_percentages, expected_remaining = reduce_expenses(sample_data, categories, goal)
+    reduction_percentages, remaining_goal = reduce_expenses_closed_form(sample_data, categories, goal)
+    assert reduction_percentages.keys() == expected_percentages.keys()
+    for category, percentage in expected_percentages.items():
+        assert reduction_percentages[category] == pytest.approx(percentage, abs=REDUCTION_TOLERANCE)
+    assert remaining_goal == pytest.approx(expected_remaining)
+
+
+@pytest.mark.parametrize("passes, categories_in_last_pass", [(16, 1), (9, 2), (10, 0)])
+def test_reduce_expenses_closed_form_matches_iterative_at_pass_boundaries(passes, categories_in_last_pass):
+    amounts = pandas.Series({'Dining': 275.25, 'Entertainment': 14.75, 'Transport': 377.0})
+    categories = list(amounts.index)
+    # A goal met exactly by the end of a pass, up to the float noise of the sums
+    goal = (amounts * 2 * passes / 100).sum() + (amounts.iloc[:categories_in_last_pass] * 2 / 100).sum()
+    expected_percentages, expected_remaining = reduce_expenses(amounts.copy(), categories, goal)
+    reduction_percentages, remaining_goal = reduce_expenses_closed_form(amounts, categories, goal)
+    for category, percentage in expected_percentages.items():
+        assert reduction_percentages[category] == pytest.approx(percentage, abs=REDUCTION_TOLERANCE)
+    assert remaining_goal == pytest.approx(expected_remaining, abs=1e-6)
+
+
+def test_calculate_savings_reductions_methods_agree(sample_data, sample_savings_goal):
+    expected = calculate_savings_reductions(sample_data, sample_savings_goal, method='iterative')
+    assert calculate_savings_reductions(sample_data, sample_savings_goal, method='closed_form') == expected
+
+
+def test_calculate_savings_reductions_batch_matches_single_goal(sample_data):
+    goals = [-10.0, 0.0, 1000.0, 64589.5, 64590.5, 200000.0, 1e9]
+    reductions, remaining_goals = calculate_savings_reductions_batch(sample_data, goals)
+    assert reductions.shape == (len(goals), 7)
+    for goal, remaining_goal in zip(goals, remaining_goals):
+        _, expected_reductions = calculate_savings_reductions(sample_data, goal, method='iterative')
+        for category in reductions.columns:
+            assert reductions.loc[goal, category] == pytest.approx(expected_reductions.get(category, 0), abs=REDUCTION_TOLERANCE)
+
+
+def test_calculate_savings_reductions_batch_non_essential_first(sample_data):
+    reductions, remaining_goals = calculate_savings_reductions_batch(sample_data, [10000.0])
+    assert reductions.loc[10000.0, 'Rent'] == 0, "Essential categories should not be reduced for a small goal."
+    assert reductions.loc[10000.0, 'Dining'] > 0
+    assert remaining_goals[0] <= 0
+
+
+def test_calculate_savings_goals_curve(sample_data):
+    curve = calculate_savings_goals_curve(sample_data, 500000.0, points=11)
+    assert list(curve.columns) == ['Goal', 'Savings', 'Remaining Goal']
+    assert len(curve) == 11
+    assert curve['Savings'].is_monotonic_increasing
+    assert curve['Remaining Goal'].iloc[-1] == pytest.approx(500000.0 - sample_data.sum())
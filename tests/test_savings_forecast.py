@@ -0,0 +1,46 @@
+import time
+import numpy
+import pandas
+import pytest
+from src.category_month_cube import build_category_month_cube
+from src.savings_forecast import forecast_savings, get_monthly_nets, simulate_savings, WITH_REDUCTIONS, WITHOUT_REDUCTIONS
+
+
+@pytest.fixture
+def cube():
+    return build_category_month_cube(pandas.DataFrame({
+        'Date': ['2024-01-01', '2024-01-05', '2024-01-20', '2024-02-01', '2024-02-03', '2024-02-10'],
+        'Category': ['Salary', 'Dining', 'Rent', 'Salary', 'Dining', 'Rent'],
+        'Amount': [5000, -1000, -3000, 5000, -2000, -3000]
+    }))
+
+
+def test_monthly_nets_with_reductions(cube):
+    nets = get_monthly_nets(cube, {'Dining': 50})
+    assert nets.tolist() == [[1000, 0], [1500, 1000]]
+
+
+def test_forecast_savings_probabilities(cube):
+    forecast = forecast_savings(cube, 800, {'Dining': 50}, simulations=2000, months=12)
+    assert list(forecast.index) == [WITHOUT_REDUCTIONS, WITH_REDUCTIONS]
+    assert (forecast['Goal'] == 800 * 12).all()
+    assert 0 < forecast.loc[WITHOUT_REDUCTIONS, 'Probability'] < 0.5, "The history saves 500 a month on average."
+    assert forecast.loc[WITH_REDUCTIONS, 'Probability'] == 1, "Every month saves at least 1000 with the reductions."
+    assert forecast.loc[WITH_REDUCTIONS, 'Savings Median'] > forecast.loc[WITHOUT_REDUCTIONS, 'Savings Median']
+
+
+def test_forecast_savings_is_seeded(cube):
+    pandas.testing.assert_frame_equal(forecast_savings(cube, 500, seed=7), forecast_savings(cube, 500, seed=7))
+
+
+def test_forecast_savings_without_months():
+    cube = build_category_month_cube(pandas.DataFrame({'Date': [None], 'Category': ['Rent'], 'Amount': [-100]}))
+    assert forecast_savings(cube, 100) is None
+
+
+def test_simulate_savings_is_fast():
+    monthly_nets = numpy.random.default_rng(0).normal(500, 300, size=(2, 36))
+    start = time.perf_counter()
+    savings = simulate_savings(monthly_nets, simulations=10_000, months=12)
+    assert time.perf_counter() - start < 1
+    assert savings.shape == (2, 10_000)
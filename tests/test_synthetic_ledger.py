@@ -0,0 +1,26 @@
+from benchmarks.synthetic_ledger import generate_ledger, parse_size
+from src.data_loader import check_transactions_file, read_transactions_csv
+
+
+def test_parse_size():
+    assert parse_size("10k") == 10_000
+    assert parse_size("1M") == 1_000_000
+    assert parse_size("2500") == 2500
+
+
+def test_generate_ledger_is_deterministic():
+    assert generate_ledger(1000, seed=3).equals(generate_ledger(1000, seed=3))
+    assert not generate_ledger(1000, seed=3).equals(generate_ledger(1000, seed=4))
+
+
+def test_generate_ledger_dirty_rows_are_rejected():
+    ledger = generate_ledger(10_000, dirty_fraction=0.05)
+    assert len(ledger) == 10_000
+    assert len(check_transactions_file(ledger)) == 9_500
+    assert len(check_transactions_file(generate_ledger(1000, dirty_fraction=0))) == 1000
+
+
+def test_generate_ledger_dirty_rows_are_rejected_after_csv_round_trip(tmp_path):
+    ledger_path = tmp_path / "ledger.csv"
+    generate_ledger(10_000, dirty_fraction=0.05).to_csv(ledger_path, index=False)
+    assert len(check_transactions_file(read_transactions_csv(ledger_path))) == 9_500
@@ -0,0 +1,70 @@
+import os
+import pandas
+import pytest
+from src.data_loader import load_transactions_data
+from src.transactions_cache import (
+    get_cache_key,
+    load_cached_transactions,
+    save_cached_transactions,
+    evict_cached_transactions,
+)
+
+
+@pytest.fixture
+def transactions_file(tmp_path):
+    data = pandas.DataFrame({
+        'Date': ['2024-01-01', '2024-01-05', 'Invalid Date', '2024-02-01'],
+        'Category': ['Salary', 'Groceries', 'Rent', 'Rent'],
+        'Amount': [5000, -200, -1500, -1500]
+    })
+    file_path = tmp_path / "transactions.csv"
+    data.to_csv(file_path, index=False)
+    return str(file_path)
+
+
+def test_save_and_load_cached_transactions(tmp_path, transactions_file):
+    cache_directory = str(tmp_path / "cache")
+    validated = load_transactions_data(transactions_file)
+    saved = save_cached_transactions(transactions_file, validated, cache_directory)
+    cached = load_cached_transactions(transactions_file, cache_directory)
+    assert cached is not None, "Cached data should be found."
+    assert saved.equals(cached), "Cached data should match the saved data."
+    assert list(cached.index) == [0, 1, 3]
+    assert cached['Amount'].tolist() == [5000, -200, -1500]
+    assert cached['Category'].tolist() == ['Salary', 'Groceries', 'Rent']
+    assert str(cached['Date'].dtype) == 'datetime64[ns]'
+
+
+def test_cache_key_changes_with_file(transactions_file):
+    key = get_cache_key(transactions_file)
+    with open(transactions_file, 'a') as file:
+        file.write("2024-03-01,Dining,-50\n")
+    assert get_cache_key(transactions_file) != key
+
+
+def test_load_cached_transactions_missing(tmp_path, transactions_file):
+    assert load_cached_transactions(transactions_file, str(tmp_path / "cache")) is None
+
+
+def test_save_cached_transactions_twice_keeps_one_entry(tmp_path, transactions_file):
+    cache_directory = str(tmp_path / "cache")
+    validated = load_transactions_data(transactions_file)
+    save_cached_transactions(transactions_file, validated, cache_directory)
+    save_cached_transactions(transactions_file, validated, cache_directory)
+    assert os.listdir(cache_directory) == [get_cache_key(transactions_file)], "Temporary directories should be removed."
+
+
+def test_evict_cached_transactions(tmp_path, transactions_file):
+    cache_directory = str(tmp_path / "cache")
+    validated = load_transactions_data(transactions_file)
+    save_cached_transactions(transactions_file, validated, cache_directory)
+    evict_cached_transactions(cache_directory, max_bytes=0)
+    assert os.listdir(cache_directory) == []
+
+
+def test_load_transactions_data_uses_cache(tmp_path, transactions_file, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first_load = load_transactions_data(transactions_file, use_cache=True)
+    monkeypatch.setattr(pandas, 'read_csv', lambda *args, **kwargs: pytest.fail("CSV should not be parsed again."))
+    second_load = load_transactions_data(transactions_file, use_cache=True)
+    assert first_load.equals(second_load), "Both loads should return the same data."